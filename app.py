@@ -9,13 +9,19 @@ import streamlit as st
 import numpy as np
 from PIL import Image
 import io
+import zipfile
 
 # Import our modules
-from quantum_key_generator import generate_quantum_key
+from quantum_key_generator import default_circuit_cache, generate_quantum_seeds
+from key_format import create_key, encode_key, load_key
 from image_encryptor import (
-    ImageEncryptor, 
     load_image_as_grayscale, 
-    array_to_image_bytes
+    array_to_image_bytes,
+    check_image_for_key,
+    create_encryptor,
+    load_ciphertext,
+    load_preview,
+    probe_image
 )
 from image_analysis import (
     analyze_image,
@@ -25,6 +31,12 @@ from image_analysis import (
 )
 
 
+@st.cache_resource
+def warm_up_quantum_backend():
+    """Create the simulator and transpile the key circuit once per server process."""
+    default_circuit_cache.warm_up()
+
+
 def main():
     """Main Streamlit application."""
     
@@ -34,6 +46,7 @@ def main():
         page_icon="🔐",
         layout="wide"
     )
+    warm_up_quantum_backend()
     
     # Title and description
     st.title("🔐 Quantum-Seed ImageShield")
@@ -75,27 +88,29 @@ def main():
             st.header("2. Quantum Key Generation & Encryption")
             if st.button("🔑 Generate Quantum Keys & Encrypt", type="primary", key="encrypt_btn"):
                 with st.spinner("Generating quantum keys using Qiskit..."):
-                    image_size = original_array.size
-                    keystream, permutation_seed = generate_quantum_key(
-                        image_size,
+                    keystream_seed, permutation_seed = generate_quantum_seeds(
                         seed=seed_value if use_seed and seed_value is not None else None
                     )
-                    st.session_state.keystream = keystream
-                    st.session_state.permutation_seed = permutation_seed
+                    key = create_key(
+                        original_array.shape,
+                        permutation_seed,
+                        keystream_seed=keystream_seed,
+                        dtype=original_array.dtype,
+                        options={'permutation_rng': 'pcg64'}
+                    )
+                    st.session_state.key = key
                     st.success("✅ Quantum keys generated successfully!")
-                    st.write(f"Keystream length: {len(keystream)} bytes")
+                    st.write(f"Keystream length: {original_array.size} bytes (expanded from a 256-bit quantum seed)")
                     st.write(f"Permutation seed: {permutation_seed}")
 
                 with st.spinner("Encrypting image..."):
-                    encryptor = ImageEncryptor(keystream, permutation_seed)
+                    encryptor = create_encryptor(key)
                     encrypted_array = encryptor.encrypt_image(original_array)
                     st.session_state.encrypted_array = encrypted_array
                     st.session_state.original_array = original_array
                     st.success("✅ Image encrypted successfully!")
 
             if 'encrypted_array' in st.session_state:
-                import tempfile
-                import base64
                 # Download encrypted image
                 with col2:
                     st.subheader("Encrypted Image")
@@ -105,38 +120,28 @@ def main():
                         use_column_width=True
                     )
                     # Prepare encrypted image bytes
-                    encrypted_img_bytes = array_to_image_bytes(st.session_state.encrypted_array)
+                    encrypted_img_bytes = array_to_image_bytes(
+                        st.session_state.encrypted_array, role='ciphertext'
+                    )
                     st.download_button(
                         label="Download Encrypted Image (PNG)",
                         data=encrypted_img_bytes,
                         file_name="encrypted_image.png",
                         mime="image/png"
                     )
-                    # Prepare .npz key file
-                    with tempfile.NamedTemporaryFile(suffix=".npz", delete=False) as tmpkey:
-                        np.savez_compressed(
-                            tmpkey,
-                            xor_key=st.session_state.keystream,
-                            permutation_key=st.session_state.permutation_seed,
-                            shape=np.array(st.session_state.encrypted_array.shape)
-                        )
-                        tmpkey.flush()
-                        tmpkey.seek(0)
-                        key_bytes = tmpkey.read()
+                    # Prepare compact key file (seeds and shape only)
+                    key_bytes = encode_key(st.session_state.key)
                     st.download_button(
-                        label="Download Key File (.npz)",
+                        label="Download Key File (.qkey)",
                         data=key_bytes,
-                        file_name="encryption_keys.npz",
+                        file_name="encryption_keys.qkey",
                         mime="application/octet-stream"
                     )
 
                 st.header("3. Decryption (Session)")
                 if st.button("🔓 Decrypt Image", key="decrypt_btn_session"):
                     with st.spinner("Decrypting image..."):
-                        encryptor = ImageEncryptor(
-                            st.session_state.keystream,
-                            st.session_state.permutation_seed
-                        )
+                        encryptor = create_encryptor(st.session_state.key)
                         decrypted_array = encryptor.decrypt_image(
                             st.session_state.encrypted_array
                         )
@@ -264,33 +269,42 @@ def main():
     with tab_decrypt:
         st.header("1. Upload Encrypted Image & Key File")
         encrypted_file = st.file_uploader(
-            "Upload encrypted image",
-            type=['png', 'jpg', 'jpeg', 'bmp', 'tiff'],
+            "Upload encrypted image (or .qsc ciphertext container)",
+            type=['png', 'jpg', 'jpeg', 'bmp', 'tiff', 'qsc'],
             key="decrypt_img_uploader"
         )
         key_file = st.file_uploader(
-            "Upload key file (.npz)",
-            type=['npz'],
+            "Upload key file (.qkey, or legacy .npz)",
+            type=['qkey', 'npz'],
             key="decrypt_key_uploader"
         )
 
         if encrypted_file is not None and key_file is not None:
-            encrypted_bytes = encrypted_file.read()
-            encrypted_array = load_image_as_grayscale(encrypted_bytes)
-            key_data = np.load(key_file)
-            keystream = key_data['xor_key']
-            permutation_key = key_data['permutation_key']
-            shape = tuple(key_data['shape'])
-            # Reshape encrypted array if needed
-            if encrypted_array.shape != shape:
-                encrypted_array = encrypted_array.reshape(shape)
+            encrypted_bytes = encrypted_file.getvalue()
+            
+            # Validate against the key from the image header alone, so a
+            # mismatched upload is rejected without decoding its pixels
+            try:
+                key = load_key(key_file.read())
+                info = probe_image(encrypted_bytes)
+                check_image_for_key(info, key)
+            except (ValueError, KeyError, OSError, zipfile.BadZipFile) as error:
+                st.error(f"❌ This image cannot be decrypted with this key: {error}")
+                st.stop()
+            st.caption(
+                f"{info['format']} · {info['width']}x{info['height']} · "
+                f"{info['bit_depth']}-bit · key shape {tuple(key['shape'])}"
+            )
 
-            st.subheader("Encrypted Image Preview")
-            st.image(encrypted_array, caption="Encrypted Image", use_column_width=True)
+            if info['format'] != 'QISC':
+                st.subheader("Encrypted Image Preview")
+                st.image(load_preview(encrypted_bytes), caption="Encrypted Image", use_column_width=True)
 
             if st.button("🔓 Decrypt Uploaded Image", key="decrypt_btn_uploaded"):
                 with st.spinner("Decrypting uploaded image..."):
-                    encryptor = ImageEncryptor(keystream, permutation_key)
+                    # Pixels are only decoded once decryption is requested
+                    encrypted_array = load_ciphertext(encrypted_bytes, key)
+                    encryptor = create_encryptor(key)
                     decrypted_array = encryptor.decrypt_image(encrypted_array)
                     st.session_state.decrypted_uploaded_array = decrypted_array
                     st.success("✅ Uploaded image decrypted!")
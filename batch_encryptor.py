@@ -0,0 +1,171 @@
+"""
+Batch Encryption Module
+
+This module encrypts stacks of same-sized images in one call. Keys for
+every image are drawn from a single quantum harvest, and XOR and
+permutation are applied to the whole (N, H, W) stack with vectorized
+NumPy operations. Each image still gets an independent key, and every
+row of the returned key table can decrypt its image on its own.
+"""
+
+import numpy as np
+from quantum_key_generator import (
+    KEYSTREAM_SEED_BITS,
+    QuantumKeyGenerator,
+    bits_to_bytes,
+    expand_keystream
+)
+from image_encryptor import generate_permutation
+from key_format import create_key
+
+
+# One row per image: 256-bit keystream seed (big-endian bytes) and
+# 32-bit permutation seed
+KEY_TABLE_DTYPE = np.dtype([
+    ('keystream_seed', np.uint8, (KEYSTREAM_SEED_BITS // 8,)),
+    ('permutation_seed', '<u4'),
+])
+
+
+def generate_key_table(count, seed=None, generator=None):
+    """
+    Generate independent keys for a batch of images from one quantum harvest.
+    
+    Args:
+        count: Number of images
+        seed: Optional seed for reproducibility
+        generator: Optional existing key source to draw from instead of
+            creating a new one; ``seed`` is ignored when it is given
+            
+    Returns:
+        numpy structured array of KEY_TABLE_DTYPE with ``count`` rows
+    """
+    if generator is None:
+        generator = QuantumKeyGenerator(seed=seed)
+    
+    bytes_per_key = KEY_TABLE_DTYPE.itemsize
+    bits = generator.generate_random_bits(count * bytes_per_key * 8)
+    packed = bits_to_bytes(bits).reshape(count, bytes_per_key)
+    
+    key_table = np.zeros(count, dtype=KEY_TABLE_DTYPE)
+    seed_bytes = KEYSTREAM_SEED_BITS // 8
+    key_table['keystream_seed'] = packed[:, :seed_bytes]
+    # Permutation seeds are read MSB first, like generate_permutation_seed()
+    key_table['permutation_seed'] = packed[:, seed_bytes:].copy().view('>u4').ravel()
+    return key_table
+
+
+def keystream_seed_from_row(row):
+    """Integer keystream seed stored in a key table row."""
+    return int.from_bytes(row['keystream_seed'].tobytes(), 'big')
+
+
+def key_from_table(key_table, index, shape, permutation_rng='pcg64', dtype=np.uint8):
+    """
+    Build a standalone key dictionary for one image of a batch.
+    
+    Args:
+        key_table: Key table from generate_key_table/encrypt_batch
+        index: Index of the image in the batch
+        shape: Shape of a single image
+        permutation_rng: Permutation RNG used for the batch
+        dtype: Pixel dtype of the batch
+        
+    Returns:
+        dict: Key dictionary (see key_format.create_key)
+    """
+    row = key_table[index]
+    return create_key(
+        shape,
+        int(row['permutation_seed']),
+        keystream_seed=keystream_seed_from_row(row),
+        dtype=dtype,
+        options={'permutation_rng': permutation_rng}
+    )
+
+
+def _batch_material(key_table, num_bytes, permutation_rng):
+    """Expand keystreams and permutations for every row of a key table."""
+    keystreams = np.empty((len(key_table), num_bytes), dtype=np.uint8)
+    permutations = np.empty((len(key_table), num_bytes), dtype=np.intp)
+    for index, row in enumerate(key_table):
+        keystreams[index] = expand_keystream(keystream_seed_from_row(row), num_bytes)
+        permutations[index] = generate_permutation(int(row['permutation_seed']), num_bytes, permutation_rng)
+    return keystreams, permutations
+
+
+def _batch_bytes(images):
+    """View a stack of images as one row of raw bytes per image."""
+    images = np.ascontiguousarray(images)
+    # The row length is explicit so that empty stacks (N = 0) reshape too
+    return images.reshape(images.shape[0], int(np.prod(images.shape[1:]))).view(np.uint8)
+
+
+def encrypt_batch(images, key_table=None, seed=None, generator=None, permutation_rng='pcg64'):
+    """
+    Encrypt a stack of same-sized images.
+    
+    Image i is encrypted exactly as ImageEncryptor.from_key(
+    key_from_table(key_table, i, shape, dtype=images.dtype)) would
+    encrypt it.
+    
+    Args:
+        images: numpy array of shape (N, H, W) (or (N, ...)) of pixel
+            values of any fixed-size dtype; an empty stack (N = 0) gives
+            an empty result and key table
+        key_table: Optional existing key table; generated if omitted
+        seed: Optional seed for reproducible key generation
+        generator: Optional existing key source for key generation
+        permutation_rng: Permutation RNG, 'pcg64' or 'legacy'
+        
+    Returns:
+        tuple: (encrypted images with the same shape, key table)
+    """
+    images = np.asarray(images)
+    count = images.shape[0]
+    flat_images = _batch_bytes(images)
+    
+    if key_table is None:
+        key_table = generate_key_table(count, seed=seed, generator=generator)
+    if len(key_table) != count:
+        raise ValueError(f"Key table has {len(key_table)} rows, expected {count}")
+    
+    keystreams, permutations = _batch_material(key_table, flat_images.shape[1], permutation_rng)
+    
+    # Step 1: XOR every image with its keystream
+    xored = np.bitwise_xor(flat_images, keystreams)
+    
+    # Step 2: Permute pixels of every image
+    encrypted = np.take_along_axis(xored, permutations, axis=1)
+    
+    return encrypted.view(images.dtype).reshape(images.shape), key_table
+
+
+def decrypt_batch(encrypted_images, key_table, permutation_rng='pcg64'):
+    """
+    Decrypt a stack of images encrypted with encrypt_batch.
+    
+    Args:
+        encrypted_images: numpy array of shape (N, H, W) of encrypted pixels
+        key_table: Key table returned by encrypt_batch
+        permutation_rng: Permutation RNG used for encryption
+        
+    Returns:
+        numpy array of decrypted images with the same shape
+    """
+    encrypted_images = np.asarray(encrypted_images)
+    count = encrypted_images.shape[0]
+    flat_encrypted = _batch_bytes(encrypted_images)
+    if len(key_table) != count:
+        raise ValueError(f"Key table has {len(key_table)} rows, expected {count}")
+    
+    keystreams, permutations = _batch_material(key_table, flat_encrypted.shape[1], permutation_rng)
+    
+    # Step 1: Reverse permutation by scattering pixels back per image
+    decrypted = np.empty_like(flat_encrypted)
+    np.put_along_axis(decrypted, permutations, flat_encrypted, axis=1)
+    
+    # Step 2: XOR with keystreams (XOR is self-inverse)
+    np.bitwise_xor(decrypted, keystreams, out=decrypted)
+    
+    return decrypted.view(encrypted_images.dtype).reshape(encrypted_images.shape)
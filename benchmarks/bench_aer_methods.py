@@ -0,0 +1,67 @@
+"""
+Benchmark: harvest throughput of Aer simulation methods by circuit width.
+
+Draws the same number of bits from AerEntropySource for each simulation
+method and circuit width and reports bits per second and the number of
+simulator jobs. Combinations a method cannot run (statevector beyond the
+simulator's qubit limit, extended_stabilizer beyond 63 qubits) are
+skipped.
+
+Usage:
+    python benchmarks/bench_aer_methods.py [--megabits 1] [--widths 20,63,256,1024] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add parent directory to path to import from root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from entropy_sources import AerEntropySource
+
+METHODS = ['automatic', 'statevector', 'stabilizer', 'extended_stabilizer']
+
+
+def best_time(func, *args, repeat=3):
+    """Return the best wall-clock time of several runs in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--megabits', type=float, default=1)
+    parser.add_argument('--widths', default='20,63,256,1024')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    num_bits = int(args.megabits * 1e6)
+    widths = [int(width) for width in args.widths.split(',')]
+    
+    print("=" * 60)
+    print(f"Aer method benchmark ({args.megabits:g} Mbit per draw)")
+    print("=" * 60)
+    print(f"{'method':<20} {'qubits':>6} {'jobs':>5} {'time (s)':>9} {'Mbit/s':>8}")
+    
+    for method in METHODS:
+        for width in widths:
+            try:
+                source = AerEntropySource(method=method, num_qubits=width)
+                source.random_bits(width)  # simulator start-up and transpilation
+            except Exception as exc:
+                print(f"{method:<20} {width:>6}  skipped ({type(exc).__name__})")
+                continue
+            jobs_before = source._jobs_run
+            elapsed = best_time(source.random_bits, num_bits, repeat=args.repeat)
+            jobs = (source._jobs_run - jobs_before) // args.repeat
+            print(f"{method:<20} {width:>6} {jobs:>5} {elapsed:>9.3f} {num_bits / elapsed / 1e6:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
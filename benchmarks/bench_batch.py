@@ -0,0 +1,71 @@
+"""
+Benchmark: batch encryption vs a Python loop of per-image calls.
+
+The loop baseline is what the ingest pipeline does today for every
+thumbnail: generate_quantum_key() followed by
+ImageEncryptor(...).encrypt_image(). The batch path is encrypt_batch().
+
+Usage:
+    python benchmarks/bench_batch.py [--count 1000] [--size 64 64]
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+# Add parent directory to path to import from root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_encryptor import decrypt_batch, encrypt_batch
+from image_encryptor import ImageEncryptor, PermutationCache
+from quantum_key_generator import generate_quantum_key
+
+
+def encrypt_loop(images):
+    """Encrypt each image with a fresh quantum key, one call at a time."""
+    encrypted = []
+    for image in images:
+        keystream, permutation_seed = generate_quantum_key(image.size)
+        encryptor = ImageEncryptor(keystream, permutation_seed, permutation_cache=PermutationCache(0))
+        encrypted.append(encryptor.encrypt_image(image))
+    return encrypted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--size', type=int, nargs=2, default=[64, 64], metavar=('H', 'W'))
+    parser.add_argument('--loop-sample', type=int, default=50,
+                        help="Number of images timed for the (slow) loop baseline")
+    args = parser.parse_args()
+    
+    images = np.random.randint(0, 256, (args.count, *args.size), dtype=np.uint8)
+    
+    print("=" * 60)
+    print(f"Batch encryption benchmark ({args.count} x {args.size[0]}x{args.size[1]})")
+    print("=" * 60)
+    
+    sample = min(args.loop_sample, args.count)
+    start = time.perf_counter()
+    encrypt_loop(images[:sample])
+    loop_rate = sample / (time.perf_counter() - start)
+    print(f"Python loop:    {loop_rate:>10.1f} images/s (timed on {sample} images)")
+    
+    start = time.perf_counter()
+    encrypted, key_table = encrypt_batch(images)
+    batch_rate = args.count / (time.perf_counter() - start)
+    print(f"encrypt_batch:  {batch_rate:>10.1f} images/s")
+    
+    start = time.perf_counter()
+    decrypted = decrypt_batch(encrypted, key_table)
+    print(f"decrypt_batch:  {args.count / (time.perf_counter() - start):>10.1f} images/s")
+    np.testing.assert_array_equal(decrypted, images)
+    
+    print(f"Speedup:        {batch_rate / loop_rate:>10.1f}x")
+    print(f"Key table size: {key_table.nbytes} bytes ({key_table.itemsize} bytes/image)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: PNG vs raw container for ciphertext storage.
+
+Times writing an encrypted image with save_image_array (PNG, zlib
+compression of incompressible noise) against write_container, and
+reading it back with load_image against a zero-copy np.memmap of the
+container, including a full decryption from the mapped file.
+
+Usage:
+    python benchmarks/bench_container.py [--megapixels 16] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+# Add parent directory to path to import from root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ciphertext_container import open_container, write_container
+from image_encryptor import ImageEncryptor, load_image, save_image_array
+
+
+def best_time(func, *args, repeat=3):
+    """Return the best wall-clock time of several runs in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def read_png_and_decrypt(encryptor, path):
+    return encryptor.decrypt_image(load_image(path))
+
+
+def map_container_and_decrypt(encryptor, path):
+    encrypted, _ = open_container(path)
+    return encryptor.decrypt_image(encrypted)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--megapixels', type=float, default=16)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    side = int((args.megapixels * 1_000_000) ** 0.5)
+    image = np.random.randint(0, 256, (side, side), dtype=np.uint8)
+    encryptor = ImageEncryptor(np.random.randint(0, 256, image.size, dtype=np.uint8), 42)
+    encrypted = encryptor.encrypt_image(image)
+    
+    print("=" * 60)
+    print(f"Ciphertext storage benchmark ({side}x{side}, {image.nbytes / 1e6:.1f} MB)")
+    print("=" * 60)
+    print(f"{'format':>10} {'write (s)':>10} {'read+decrypt (s)':>17} {'size (MB)':>10}")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        png_path = os.path.join(temp_dir, 'image.enc.png')
+        raw_path = os.path.join(temp_dir, 'image.enc.qsc')
+        
+        t_png_write = best_time(save_image_array, encrypted, png_path, repeat=args.repeat)
+        t_raw_write = best_time(write_container, raw_path, encrypted, repeat=args.repeat)
+        t_png_read = best_time(read_png_and_decrypt, encryptor, png_path, repeat=args.repeat)
+        t_raw_read = best_time(map_container_and_decrypt, encryptor, raw_path, repeat=args.repeat)
+        
+        np.testing.assert_array_equal(map_container_and_decrypt(encryptor, raw_path), image)
+        
+        for name, t_write, t_read, path in [('png', t_png_write, t_png_read, png_path),
+                                            ('container', t_raw_write, t_raw_read, raw_path)]:
+            print(f"{name:>10} {t_write:>10.4f} {t_read:>17.4f} {os.path.getsize(path) / 1e6:>10.2f}")
+    
+    print(f"Write speedup: {t_png_write / t_raw_write:.1f}x, "
+          f"read+decrypt speedup: {t_png_read / t_raw_read:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: argsort-based vs scatter-based depermutation.
+
+Compares the original decryption step (invert the permutation with
+np.argsort, then gather) against scattering the encrypted pixels straight
+back to their original positions.
+
+Usage:
+    python benchmarks/bench_depermutation.py [--sizes 1 4 16 50] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+# Add parent directory to path to import from root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_encryptor import generate_permutation
+
+
+def depermute_argsort(flat_encrypted, permutation):
+    """Original approach: O(n log n) inverse permutation, then gather."""
+    inverse_permutation = np.argsort(permutation)
+    return flat_encrypted[inverse_permutation]
+
+
+def depermute_scatter(flat_encrypted, permutation):
+    """Current approach: O(n) scatter into the output."""
+    depermuted = np.empty_like(flat_encrypted)
+    depermuted[permutation] = flat_encrypted
+    return depermuted
+
+
+def best_time(func, *args, repeat=3):
+    """Return the best wall-clock time of several runs in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=float, nargs='+', default=[0.25, 1, 4, 16, 50],
+                        help="Image sizes in megapixels")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    print("=" * 60)
+    print("Depermutation benchmark (decrypt step 1)")
+    print("=" * 60)
+    print(f"{'MPix':>8} {'argsort (s)':>14} {'scatter (s)':>14} {'speedup':>10}")
+    
+    for megapixels in args.sizes:
+        num_pixels = int(megapixels * 1_000_000)
+        flat_encrypted = np.random.randint(0, 256, num_pixels, dtype=np.uint8)
+        permutation = generate_permutation(42, num_pixels)
+        
+        np.testing.assert_array_equal(
+            depermute_argsort(flat_encrypted, permutation),
+            depermute_scatter(flat_encrypted, permutation)
+        )
+        
+        t_argsort = best_time(depermute_argsort, flat_encrypted, permutation, repeat=args.repeat)
+        t_scatter = best_time(depermute_scatter, flat_encrypted, permutation, repeat=args.repeat)
+        print(f"{megapixels:>8g} {t_argsort:>14.4f} {t_scatter:>14.4f} {t_argsort / t_scatter:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
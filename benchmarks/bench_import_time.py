@@ -0,0 +1,83 @@
+"""
+Benchmark: cold-start import time and memory of the entry points.
+
+Runs each entry point in a fresh interpreter with ``python -X importtime``
+and reports wall-clock time, the cumulative import time of the statement,
+peak RSS and whether Qiskit, matplotlib or SciPy were loaded. Decrypt-only
+and analysis-only workers should not pay for the quantum simulator.
+
+Usage:
+    python benchmarks/bench_import_time.py [--repeat 5]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('qiskit', 'qiskit_aer', 'matplotlib', 'scipy')
+
+ENTRY_POINTS = {
+    'decrypt-only': "import image_encryptor, key_format",
+    'stream/tiled': "import stream_encryptor, tiled_encryptor",
+    'qshield CLI': "import qshield",
+    'analysis-only': "import image_analysis",
+    'key generation': "import quantum_key_generator; quantum_key_generator.QuantumKeyGenerator()",
+}
+
+# Printed by the child after the statement runs
+_REPORT = (
+    "import resource, sys; "
+    "print('LOADED', ' '.join(m for m in {heavy!r} if m in sys.modules)); "
+    "print('MAXRSS', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+)
+
+
+def run_entry_point(statement):
+    """Run ``statement`` in a fresh interpreter and return its measurements."""
+    code = statement + "\n" + _REPORT.format(heavy=HEAVY_MODULES)
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    wall = time.perf_counter() - start
+    
+    # importtime lines: "import time: self [us] | cumulative | imported package";
+    # top-level imports are the ones without indentation before the name
+    cumulative = 0
+    for line in process.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \| (\s*)\S', line)
+        if match and not match.group(2):
+            cumulative += int(match.group(1))
+    
+    loaded = re.search(r'^LOADED ?(.*)$', process.stdout, re.M).group(1).split()
+    max_rss_kb = int(re.search(r'^MAXRSS (\d+)$', process.stdout, re.M).group(1))
+    return wall, cumulative / 1e6, max_rss_kb / 1024, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    print("=" * 60)
+    print(f"Import time benchmark (best of {args.repeat} cold starts)")
+    print("=" * 60)
+    print(f"{'entry point':<16} {'wall (s)':>9} {'imports (s)':>12} {'RSS (MB)':>9}  heavy modules")
+    
+    for name, statement in ENTRY_POINTS.items():
+        runs = [run_entry_point(statement) for _ in range(args.repeat)]
+        wall = min(run[0] for run in runs)
+        imports = min(run[1] for run in runs)
+        rss = min(run[2] for run in runs)
+        loaded = ', '.join(runs[0][3]) or '-'
+        print(f"{name:<16} {wall:>9.3f} {imports:>12.3f} {rss:>9.1f}  {loaded}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark: coalesced key service vs one simulator job per request.
+
+Issues many concurrent keystream requests and compares serving each with
+its own QuantumKeyGenerator call (one simulator job per request) against
+KeyService, which combines the requests that queue up during a harvest
+into one larger job.
+
+Usage:
+    python benchmarks/bench_key_service.py [--clients 256] [--bytes 36]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add parent directory to path to import from root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from key_service import KeyService
+from quantum_key_generator import QuantumKeyGenerator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=256)
+    parser.add_argument('--bytes', type=int, default=36,
+                        help="Bytes per request (36 = one keystream seed plus one permutation seed)")
+    args = parser.parse_args()
+    
+    generator = QuantumKeyGenerator()
+    generator.generate_keystream(1)  # transpile the harvest circuit once
+    
+    print("=" * 60)
+    print(f"Key service benchmark ({args.clients} clients x {args.bytes} bytes)")
+    print("=" * 60)
+    
+    start = time.perf_counter()
+    for _ in range(args.clients):
+        generator.generate_keystream(args.bytes)
+    t_direct = time.perf_counter() - start
+    
+    async def coalesced():
+        async with KeyService(generator) as service:
+            await asyncio.gather(*[service.generate_keystream(args.bytes) for _ in range(args.clients)])
+            return service.stats()
+    
+    start = time.perf_counter()
+    stats = asyncio.run(coalesced())
+    t_service = time.perf_counter() - start
+    
+    print(f"one job per request: {t_direct:8.3f} s  ({args.clients} jobs)")
+    print(f"KeyService:          {t_service:8.3f} s  ({stats['harvests']} jobs)")
+    print(f"speedup:             {t_direct / t_service:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
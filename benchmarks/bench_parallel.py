@@ -0,0 +1,74 @@
+"""
+Benchmark: multi-threaded ImageEncryptor scaling.
+
+Encrypts and decrypts a large random image with 1, 2, 4, 8 and 16 worker
+threads and reports throughput relative to the serial path. The
+permutation is generated (and cached) once up front so only the XOR and
+gather/scatter work is timed. Every parallel result is checked for
+bit-identical output against the serial path.
+
+Usage:
+    python benchmarks/bench_parallel.py [--megapixels 50] [--threads 1 2 4 8 16]
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+# Add parent directory to path to import from root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_encryptor import ImageEncryptor, PermutationCache
+
+
+def best_time(func, *args, repeat=3):
+    """Return the best wall-clock time of several runs in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--megapixels', type=float, default=50)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    num_pixels = int(args.megapixels * 1_000_000)
+    image = np.random.randint(0, 256, num_pixels, dtype=np.uint8)
+    keystream = np.random.randint(0, 256, num_pixels, dtype=np.uint8)
+    cache = PermutationCache(max_bytes=1 << 40)
+    
+    serial = ImageEncryptor(keystream, 42, permutation_cache=cache)
+    expected = serial.encrypt_image(image)  # warms the permutation cache
+    encrypted = np.empty_like(image)
+    decrypted = np.empty_like(image)
+    
+    print("=" * 60)
+    print(f"Parallel encryption benchmark ({args.megapixels:g} MPix, {os.cpu_count()} CPUs)")
+    print("=" * 60)
+    print(f"{'threads':>8} {'encrypt (s)':>12} {'decrypt (s)':>12} {'MB/s enc':>10} {'speedup':>9}")
+    
+    baseline = None
+    for workers in args.threads:
+        encryptor = ImageEncryptor(keystream, 42, permutation_cache=cache, workers=workers)
+        t_encrypt = best_time(encryptor.encrypt_into, image, encrypted, repeat=args.repeat)
+        t_decrypt = best_time(encryptor.decrypt_into, encrypted, decrypted, repeat=args.repeat)
+        
+        np.testing.assert_array_equal(encrypted, expected)
+        np.testing.assert_array_equal(decrypted, image)
+        
+        if baseline is None:
+            baseline = t_encrypt
+        throughput = num_pixels / t_encrypt / 1e6
+        print(f"{workers:>8} {t_encrypt:>12.4f} {t_decrypt:>12.4f} {throughput:>10.1f} {baseline / t_encrypt:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
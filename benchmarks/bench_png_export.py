@@ -0,0 +1,74 @@
+"""
+Benchmark: encode time per megapixel of ciphertext and plaintext images.
+
+Compares Pillow's default PNG settings (the previous behaviour of
+array_to_image_bytes) with the 'ciphertext' output policy (stored PNG),
+Pillow with compress_level=0, and uncompressed TIFF/BMP. A smooth
+plaintext image is encoded with the default 'plaintext' policy for
+reference.
+
+Usage:
+    python benchmarks/bench_png_export.py [--megapixels 4] [--repeat 3]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+import numpy as np
+from PIL import Image
+
+# Add parent directory to path to import from root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_encryptor import array_to_image_bytes
+
+
+def best_time(func, *args, repeat=3):
+    """Return the best wall-clock time of several runs in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def pillow_png(array, **options):
+    buf = io.BytesIO()
+    Image.fromarray(array).save(buf, format='PNG', **options)
+    return buf.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--megapixels', type=float, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    side = int((args.megapixels * 1_000_000) ** 0.5)
+    megapixels = side * side / 1e6
+    ciphertext = np.random.randint(0, 256, (side, side), dtype=np.uint8)
+    plaintext = np.add.outer(np.arange(side), np.arange(side)).astype(np.uint8)
+    
+    cases = [
+        ("ciphertext, Pillow PNG default", pillow_png, ciphertext),
+        ("ciphertext, Pillow PNG level 0", lambda a: pillow_png(a, compress_level=0), ciphertext),
+        ("ciphertext, policy (stored PNG)", lambda a: array_to_image_bytes(a, role='ciphertext'), ciphertext),
+        ("ciphertext, TIFF", lambda a: array_to_image_bytes(a, role='ciphertext', image_format='TIFF'), ciphertext),
+        ("ciphertext, BMP", lambda a: array_to_image_bytes(a, role='ciphertext', image_format='BMP'), ciphertext),
+        ("plaintext, policy (PNG default)", array_to_image_bytes, plaintext),
+    ]
+    
+    print("=" * 60)
+    print(f"Image export benchmark ({side}x{side})")
+    print("=" * 60)
+    print(f"{'case':<34} {'ms/MPix':>9} {'size (MB)':>10}")
+    for name, func, array in cases:
+        seconds, data = best_time(func, array, repeat=args.repeat)
+        print(f"{name:<34} {seconds * 1000 / megapixels:>9.1f} {len(data) / 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
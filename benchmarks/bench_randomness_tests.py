@@ -0,0 +1,81 @@
+"""
+Benchmark: throughput of the streaming randomness test suite.
+
+Streams a sample of random bits through RandomnessTestSuite in chunks of
+several sizes, as unpacked bits (generate_random_bits output) and as packed
+bytes (recorded entropy files), and compares the rate with harvesting the
+same number of bits from the default Aer source. The suite has to keep up
+with the harvest to run as a continuous health check.
+
+Usage:
+    python benchmarks/bench_randomness_tests.py [--megabits 64] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+# Add parent directory to path to import from root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from entropy_sources import AerEntropySource
+from randomness_tests import RandomnessTestSuite
+
+
+def best_time(func, *args, repeat=3):
+    """Return the best wall-clock time of several runs in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def stream_bits(bits, chunk_bits):
+    suite = RandomnessTestSuite()
+    for start in range(0, len(bits), chunk_bits):
+        suite.update(bits[start:start + chunk_bits])
+    return suite.results()
+
+
+def stream_bytes(data, chunk_bytes):
+    suite = RandomnessTestSuite()
+    for start in range(0, len(data), chunk_bytes):
+        suite.update_bytes(data[start:start + chunk_bytes])
+    return suite.results()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--megabits', type=float, default=64)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    num_bits = int(args.megabits * 1e6) // 8 * 8
+    bits = np.random.default_rng(0).integers(0, 2, num_bits, dtype=np.uint8)
+    data = np.packbits(bits)
+    
+    print("=" * 60)
+    print(f"Randomness test suite benchmark ({args.megabits:g} Mbit sample)")
+    print("=" * 60)
+    print(f"{'input':<24} {'time (s)':>9} {'Mbit/s':>9}")
+    
+    for chunk_bits in [1 << 16, 1 << 20, 1 << 24]:
+        elapsed = best_time(stream_bits, bits, chunk_bits, repeat=args.repeat)
+        print(f"{f'bits, {chunk_bits >> 10} Kibit chunks':<24} {elapsed:>9.3f} {num_bits / elapsed / 1e6:>9.1f}")
+    elapsed = best_time(stream_bytes, data, 1 << 20, repeat=args.repeat)
+    print(f"{'bytes, 1 MiB chunks':<24} {elapsed:>9.3f} {num_bits / elapsed / 1e6:>9.1f}")
+    
+    # Harvest rate of the default source, for comparison
+    source = AerEntropySource()
+    source.random_bits(1 << 20)  # simulator start-up and transpilation
+    harvest_bits = 1 << 22
+    elapsed = best_time(source.random_bits, harvest_bits, repeat=1)
+    print(f"{'Aer harvest (default)':<24} {'':>9} {harvest_bits / elapsed / 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark: streaming encryption throughput and memory.
+
+Pipes a large random byte stream through StreamEncryptor.encrypt_stream
+from one file object to a null sink and reports throughput and the peak
+of Python-tracked allocations (tracemalloc), which should stay at a few
+blocks regardless of the stream size. The whole-buffer ImageEncryptor
+path is timed for comparison.
+
+Usage:
+    python benchmarks/bench_stream.py [--megabytes 256] [--block-size 1048576]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+# Add parent directory to path to import from root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_encryptor import ImageEncryptor
+from quantum_key_generator import expand_keystream
+from stream_encryptor import StreamEncryptor
+
+
+class NullSink:
+    """Writable file object that discards data."""
+    
+    def write(self, data):
+        return len(data)
+
+
+class RandomSource:
+    """Readable file object producing ``size`` pseudo-random bytes."""
+    
+    def __init__(self, size, chunk):
+        self.remaining = size
+        self.chunk = chunk
+    
+    def read(self, n):
+        n = min(n, self.remaining, len(self.chunk))
+        self.remaining -= n
+        return self.chunk[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--megabytes', type=float, default=256)
+    parser.add_argument('--block-size', type=int, default=1 << 20)
+    parser.add_argument('--chunk-size', type=int, default=64 * 1024)
+    args = parser.parse_args()
+    
+    num_bytes = int(args.megabytes * 1_000_000)
+    chunk = np.random.randint(0, 256, args.chunk_size, dtype=np.uint8).tobytes()
+    encryptor = StreamEncryptor(2 ** 255 + 1, 42, block_size=args.block_size)
+    
+    print("=" * 60)
+    print(f"Streaming encryption benchmark ({args.megabytes:g} MB, "
+          f"{args.block_size} B blocks, {args.chunk_size} B reads)")
+    print("=" * 60)
+    
+    tracemalloc.start()
+    start = time.perf_counter()
+    written = encryptor.encrypt_stream(RandomSource(num_bytes, chunk), NullSink(), args.chunk_size)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert written == num_bytes
+    print(f"stream:       {elapsed:8.3f} s  {num_bytes / elapsed / 1e6:8.1f} MB/s  "
+          f"peak {peak / 1e6:8.1f} MB")
+    
+    data = np.frombuffer(chunk * (num_bytes // len(chunk) + 1), dtype=np.uint8)[:num_bytes]
+    whole = ImageEncryptor(expand_keystream(2 ** 255 + 1, num_bytes), 42, permutation_rng='pcg64')
+    tracemalloc.start()
+    start = time.perf_counter()
+    whole.encrypt_image(data)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"whole buffer: {elapsed:8.3f} s  {num_bytes / elapsed / 1e6:8.1f} MB/s  "
+          f"peak {peak / 1e6:8.1f} MB")
+    
+    # Sanity check: a round trip through a small stream
+    sample = io.BytesIO()
+    encryptor.encrypt_stream(io.BytesIO(chunk), sample)
+    restored = io.BytesIO()
+    encryptor.decrypt_stream(io.BytesIO(sample.getvalue()), restored)
+    assert restored.getvalue() == chunk
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Ciphertext Container Module
+
+This module stores encrypted images in a raw container instead of PNG.
+Encrypted pixels are incompressible noise, so zlib-compressing them on
+every save only costs time. A container is a small header followed by
+the encrypted array bytes, which can be written with a single write and
+opened with np.memmap for zero-copy decryption and region reads.
+
+Layout (little-endian):
+
+    magic            4 bytes   b'QISC'
+    version          uint8
+    ndim             uint8
+    dtype            uint8 length + ASCII NumPy dtype string (e.g. '|u1')
+    key id           16 bytes  key_format.key_id() of the key (zero if unknown)
+    shape            ndim x uint64
+    padding          zero bytes up to a multiple of DATA_ALIGNMENT
+    data             C-order array bytes
+"""
+
+import os
+import struct
+import numpy as np
+from key_format import KEY_ID_BYTES, key_id as compute_key_id
+
+
+CONTAINER_MAGIC = b'QISC'
+CONTAINER_VERSION = 1
+
+# Offset of the array data is a multiple of this, so memory-mapped arrays
+# are aligned for every dtype and for SIMD loads
+DATA_ALIGNMENT = 64
+
+_PREFIX = struct.Struct('<4sBBB')
+
+# Upper bound on the header size (255-byte dtype string, 255 dimensions)
+_MAX_HEADER_SIZE = _PREFIX.size + 255 + KEY_ID_BYTES + 8 * 255 + DATA_ALIGNMENT
+
+
+def encode_header(shape, dtype, key_id=None):
+    """
+    Build the header of a container, including alignment padding.
+    
+    Args:
+        shape: Shape of the encrypted array
+        dtype: dtype of the encrypted array
+        key_id: Optional key identifier (see key_format.key_id)
+        
+    Returns:
+        bytes object whose length is the data offset
+    """
+    shape = tuple(int(dim) for dim in shape)
+    dtype_str = np.dtype(dtype).str.encode('ascii')
+    key_id = bytes(key_id or b'')
+    if len(key_id) not in (0, KEY_ID_BYTES):
+        raise ValueError(f"key_id must be {KEY_ID_BYTES} bytes")
+    
+    header = b''.join([
+        _PREFIX.pack(CONTAINER_MAGIC, CONTAINER_VERSION, len(shape), len(dtype_str)),
+        dtype_str,
+        key_id.ljust(KEY_ID_BYTES, b'\0'),
+        struct.pack(f'<{len(shape)}Q', *shape),
+    ])
+    return header + b'\0' * (-len(header) % DATA_ALIGNMENT)
+
+
+def decode_header(data):
+    """
+    Parse a container header.
+    
+    Args:
+        data: bytes-like object starting with the container header
+        
+    Returns:
+        dict: 'shape', 'dtype', 'key_id' (None if not recorded) and
+        'offset' (position of the array data)
+    """
+    view = memoryview(data)
+    if len(view) < _PREFIX.size or bytes(view[:4]) != CONTAINER_MAGIC:
+        raise ValueError("Not a ciphertext container")
+    try:
+        _, version, ndim, dtype_len = _PREFIX.unpack_from(view, 0)
+        if version > CONTAINER_VERSION:
+            raise ValueError(f"Unsupported container version: {version}")
+        offset = _PREFIX.size
+        
+        dtype = np.dtype(bytes(view[offset:offset + dtype_len]).decode('ascii'))
+        offset += dtype_len
+        
+        key_id = bytes(view[offset:offset + KEY_ID_BYTES])
+        offset += KEY_ID_BYTES
+        
+        shape = struct.unpack_from(f'<{ndim}Q', view, offset)
+        offset += 8 * ndim
+    except struct.error as error:
+        raise ValueError("Container header is truncated") from error
+    
+    return {
+        'shape': shape,
+        'dtype': dtype,
+        'key_id': None if key_id == b'\0' * KEY_ID_BYTES else key_id,
+        'offset': offset + (-offset % DATA_ALIGNMENT),
+    }
+
+
+def read_header(file):
+    """
+    Read the header of a container file without reading its data.
+    
+    Args:
+        file: File path or readable binary file object
+        
+    Returns:
+        dict: Header fields (see decode_header)
+    """
+    if hasattr(file, 'read'):
+        start = file.tell()
+        data = file.read(_MAX_HEADER_SIZE)
+        file.seek(start)
+    else:
+        with open(file, 'rb') as f:
+            data = f.read(_MAX_HEADER_SIZE)
+    return decode_header(data)
+
+
+def _key_id_of(key):
+    """Key identifier for a key dictionary, or None."""
+    return None if key is None else compute_key_id(key)
+
+
+def allocate_container(shape, dtype, key=None):
+    """
+    Allocate an in-memory container and a writable view of its data.
+    
+    Encrypting straight into the returned array (e.g. with
+    ImageEncryptor.encrypt_into) fills the container without any copy;
+    the whole buffer can then be written with one write call.
+    
+    Args:
+        shape: Shape of the encrypted array
+        dtype: dtype of the encrypted array
+        key: Optional key dictionary whose key_id is recorded
+        
+    Returns:
+        tuple: (bytearray holding the whole container, numpy array view
+        of its data section)
+    """
+    header = encode_header(shape, dtype, _key_id_of(key))
+    dtype = np.dtype(dtype)
+    buffer = bytearray(len(header) + int(np.prod(shape, dtype=np.int64)) * dtype.itemsize)
+    buffer[:len(header)] = header
+    data = np.frombuffer(buffer, dtype=dtype, offset=len(header)).reshape(shape)
+    return buffer, data
+
+
+def write_container(file, array, key=None):
+    """
+    Write an encrypted array as a container.
+    
+    For file paths the header and data are written with a single
+    os.writev() call where available, without concatenating them first.
+    
+    Args:
+        file: File path or writable binary file object
+        array: Encrypted numpy array
+        key: Optional key dictionary whose key_id is recorded
+    """
+    array = np.ascontiguousarray(array)
+    header = encode_header(array.shape, array.dtype, _key_id_of(key))
+    data = memoryview(array.reshape(-1).view(np.uint8))
+    
+    if hasattr(file, 'write'):
+        file.write(header)
+        file.write(data)
+        return
+    with open(file, 'wb') as f:
+        if hasattr(os, 'writev'):
+            written = os.writev(f.fileno(), [header, data])
+            # Short writes are possible for very large arrays
+            if written < len(header):
+                f.write(header[written:])
+                written = len(header)
+            f.write(data[written - len(header):])
+        else:
+            f.write(header)
+            f.write(data)
+
+
+def open_container(file, mode='r'):
+    """
+    Memory-map a container file.
+    
+    Nothing is read until the array is accessed, so decryption can stream
+    from disk and slices only touch the pages they cover.
+    
+    Args:
+        file: File path
+        mode: np.memmap mode ('r' read-only, 'r+' read-write, 'c' copy-on-write)
+        
+    Returns:
+        tuple: (np.memmap with the stored shape and dtype, header dict)
+    """
+    header = read_header(file)
+    array = np.memmap(file, dtype=header['dtype'], mode=mode,
+                      offset=header['offset'], shape=header['shape'])
+    return array, header
+
+
+def load_container(data):
+    """
+    View an in-memory container (e.g. an upload) as an array without copying.
+    
+    Args:
+        data: bytes-like object holding a whole container
+        
+    Returns:
+        tuple: (read-only numpy array, header dict)
+    """
+    header = decode_header(data)
+    count = int(np.prod(header['shape'], dtype=np.int64))
+    if len(data) < header['offset'] + count * header['dtype'].itemsize:
+        raise ValueError("Container data is truncated")
+    array = np.frombuffer(data, dtype=header['dtype'], count=count, offset=header['offset'])
+    return array.reshape(header['shape']), header
+
+
+def check_key(header, key):
+    """
+    Raise ValueError if a key does not belong to a container.
+    
+    Containers without a recorded key id accept any key whose shape and
+    dtype match.
+    
+    Args:
+        header: Container header dict
+        key: Key dictionary (see key_format.create_key)
+    """
+    if tuple(header['shape']) != tuple(key['shape']) or header['dtype'] != np.dtype(key['dtype']):
+        raise ValueError(
+            f"Container {header['shape']} {header['dtype']} does not match key "
+            f"{key['shape']} {key['dtype']}"
+        )
+    if header['key_id'] is not None and header['key_id'] != compute_key_id(key):
+        raise ValueError("Container was encrypted with a different key")
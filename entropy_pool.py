@@ -0,0 +1,240 @@
+"""
+Entropy Pool Module
+
+This module keeps a bounded buffer of pre-harvested quantum random bytes
+that is refilled on a background thread, so keystream requests can be
+served by copying out of the buffer instead of running the simulator on
+the request path.
+"""
+
+import threading
+
+import numpy as np
+
+from quantum_key_generator import (
+    KEYSTREAM_SEED_BITS,
+    QuantumKeyGenerator,
+    bits_to_int
+)
+
+
+class EntropyPool:
+    """
+    Ring buffer of quantum random bytes with background refill.
+    
+    A worker thread harvests bytes from a QuantumKeyGenerator in fixed-size
+    chunks whenever the fill level drops to the low-water mark, and keeps
+    harvesting until the buffer is full. Consumers take bytes from the
+    front of the buffer in FIFO order.
+    
+    The pool can be passed anywhere a QuantumKeyGenerator is used for
+    keystreams, e.g. ``generate_quantum_key(size, generator=pool)``.
+    """
+    
+    def __init__(self, generator=None, capacity=1 << 20, low_water=None,
+                 refill_chunk=None, start=True):
+        """
+        Initialize the entropy pool.
+        
+        Args:
+            generator: QuantumKeyGenerator used to harvest bytes
+                (a new unseeded generator by default)
+            capacity: Maximum number of bytes held in the buffer
+            low_water: Fill level (in bytes) at or below which the
+                background thread starts refilling (default: capacity // 4)
+            refill_chunk: Number of bytes harvested per generator call
+                (default: capacity // 4)
+            start: Whether to start the background refill thread immediately
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if low_water is None:
+            low_water = capacity // 4
+        if refill_chunk is None:
+            refill_chunk = max(1, capacity // 4)
+        if not 0 <= low_water < capacity:
+            raise ValueError("low_water must be in [0, capacity)")
+        if not 0 < refill_chunk <= capacity:
+            raise ValueError("refill_chunk must be in (0, capacity]")
+        if low_water + refill_chunk > capacity:
+            raise ValueError("low_water + refill_chunk must not exceed capacity")
+        
+        self.generator = generator if generator is not None else QuantumKeyGenerator()
+        self.capacity = capacity
+        self.low_water = low_water
+        self.refill_chunk = refill_chunk
+        
+        self._buffer = np.zeros(capacity, dtype=np.uint8)
+        self._head = 0  # index of the oldest available byte
+        self._size = 0  # number of available bytes
+        self._condition = threading.Condition()
+        self._closed = False
+        self._error = None
+        self._thread = None
+        
+        self.bytes_harvested = 0
+        self.bytes_served = 0
+        
+        if start:
+            self.start()
+    
+    def start(self):
+        """Start the background refill thread if it is not running."""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("EntropyPool is closed")
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._refill_loop,
+                name="EntropyPoolRefill",
+                daemon=True
+            )
+            self._thread.start()
+    
+    def close(self):
+        """Stop the background refill thread and wake any waiting consumers."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    @property
+    def level(self):
+        """Number of bytes currently available in the pool."""
+        with self._condition:
+            return self._size
+    
+    def _refill_loop(self):
+        """Harvest chunks into the buffer whenever it is at the low-water mark."""
+        try:
+            while True:
+                with self._condition:
+                    while not self._closed and self._size > self.low_water:
+                        self._condition.wait()
+                    if self._closed:
+                        return
+                
+                # Fill until another whole chunk no longer fits
+                while True:
+                    with self._condition:
+                        if self._closed or self._size + self.refill_chunk > self.capacity:
+                            break
+                    # Harvest outside the lock so consumers are never blocked
+                    # on the simulator
+                    chunk = self.generator.generate_keystream(self.refill_chunk)
+                    with self._condition:
+                        self._write(chunk)
+                        self.bytes_harvested += len(chunk)
+                        self._condition.notify_all()
+        except Exception as error:
+            with self._condition:
+                self._error = error
+                self._closed = True
+                self._condition.notify_all()
+    
+    def _write(self, chunk):
+        """Append bytes at the tail of the ring buffer (lock must be held)."""
+        tail = (self._head + self._size) % self.capacity
+        first = min(len(chunk), self.capacity - tail)
+        self._buffer[tail:tail + first] = chunk[:first]
+        self._buffer[:len(chunk) - first] = chunk[first:]
+        self._size += len(chunk)
+    
+    def _read_into(self, out):
+        """Move up to len(out) bytes from the head of the buffer (lock must be held)."""
+        count = min(len(out), self._size)
+        first = min(count, self.capacity - self._head)
+        out[:first] = self._buffer[self._head:self._head + first]
+        out[first:count] = self._buffer[:count - first]
+        self._head = (self._head + count) % self.capacity
+        self._size -= count
+        return count
+    
+    def generate_keystream(self, length):
+        """
+        Take a keystream of specified length from the pool.
+        
+        Blocks until enough bytes have been harvested. Requests larger than
+        the pool capacity are served incrementally as the buffer refills.
+        
+        Args:
+            length: Length of keystream in bytes
+            
+        Returns:
+            numpy array of random bytes (0-255)
+        """
+        keystream = np.empty(length, dtype=np.uint8)
+        filled = 0
+        with self._condition:
+            while filled < length:
+                if self._error is not None:
+                    raise RuntimeError("EntropyPool refill failed") from self._error
+                if self._closed and self._size == 0:
+                    raise RuntimeError("EntropyPool is closed")
+                if self._size == 0:
+                    if self._thread is None:
+                        raise RuntimeError("EntropyPool has not been started")
+                    self._condition.wait()
+                    continue
+                filled += self._read_into(keystream[filled:])
+                self._condition.notify_all()
+            self.bytes_served += length
+        return keystream
+    
+    def generate_random_bits(self, num_bits):
+        """
+        Take random bits from the pool.
+        
+        Args:
+            num_bits: Number of random bits to return
+            
+        Returns:
+            numpy array of random bits (0s and 1s)
+        """
+        keystream = self.generate_keystream((num_bits + 7) // 8)
+        return np.unpackbits(keystream)[:num_bits]
+    
+    def generate_permutation_seed(self):
+        """
+        Take a 32-bit permutation seed from the pool.
+        
+        Returns:
+            Integer seed derived from quantum randomness
+        """
+        return int.from_bytes(self.generate_keystream(4).tobytes(), 'big')
+    
+    def generate_keystream_seed(self, num_bits=KEYSTREAM_SEED_BITS):
+        """
+        Take a quantum seed for keystream expansion from the pool.
+        
+        Args:
+            num_bits: Number of quantum random bits in the seed
+            
+        Returns:
+            Integer seed to pass to expand_keystream()
+        """
+        return bits_to_int(self.generate_random_bits(num_bits))
+    
+    def stats(self):
+        """
+        Report pool counters.
+        
+        Returns:
+            dict: Current level, capacity and harvested/served byte counts
+        """
+        with self._condition:
+            return {
+                'level': self._size,
+                'capacity': self.capacity,
+                'low_water': self.low_water,
+                'bytes_harvested': self.bytes_harvested,
+                'bytes_served': self.bytes_served,
+            }
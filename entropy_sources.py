@@ -0,0 +1,314 @@
+"""
+Entropy Sources Module
+
+This module provides the random bit sources behind QuantumKeyGenerator.
+A deployment can pick a source to fit its latency budget:
+
+    AerEntropySource     Hadamard+measure circuits on AerSimulator
+                         (default, statevector, stabilizer or
+                         extended_stabilizer method, configurable width)
+    ReplayEntropySource  quantum bits recorded beforehand (e.g. from a real
+                         device), read from a memory-mapped file
+    OSEntropySource      os.urandom(); fast, but not quantum randomness
+
+Any object implementing EntropySource can be passed as
+``QuantumKeyGenerator(source=...)``.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+from quantum_key_generator import QuantumKeyGenerator, bits_to_bytes, default_circuit_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows: the offset file is only guarded within a process
+    fcntl = None
+
+
+class EntropySource:
+    """
+    Interface of a random bit source.
+    
+    Subclasses implement random_bits() or random_bytes() (or both, when
+    one can be produced more cheaply than by converting the other). Bytes
+    and bits are related as by bits_to_bytes(): the first bit of each byte
+    is its most significant bit.
+    """
+    
+    # Short identifier used in reports and create_entropy_source() specs
+    name = None
+    
+    def random_bits(self, num_bits):
+        """
+        Draw random bits.
+        
+        Args:
+            num_bits: Number of bits
+            
+        Returns:
+            numpy array of random bits (0s and 1s)
+        """
+        return np.unpackbits(self.random_bytes((num_bits + 7) // 8))[:num_bits]
+    
+    def random_bytes(self, num_bytes):
+        """
+        Draw random bytes.
+        
+        Args:
+            num_bytes: Number of bytes
+            
+        Returns:
+            numpy array of random bytes (0-255)
+        """
+        return bits_to_bytes(self.random_bits(num_bytes * 8))
+
+
+class AerEntropySource(EntropySource):
+    """
+    Random bits from the per-shot memory of Hadamard+measure circuits.
+    
+    One circuit of ``num_qubits`` qubits is reused for every job; every
+    shot contributes a full circuit width of bits. The circuit is pure
+    Clifford, so the 'stabilizer' method runs it at any width and
+    'extended_stabilizer' (exact for Clifford circuits) up to 63 qubits;
+    'statevector' is limited by memory to a few dozen qubits.
+    """
+    
+    name = 'aer'
+    
+    def __init__(self, seed=None, method=None, num_qubits=None, circuit_cache=None,
+                 backend_options=None):
+        """
+        Initialize the source.
+        
+        Args:
+            seed: Optional seed for reproducibility in testing
+            method: Optional AerSimulator method (e.g. 'statevector',
+                'stabilizer' or 'extended_stabilizer'); the simulator
+                chooses when omitted
+            num_qubits: Circuit width (default:
+                QuantumKeyGenerator.max_qubits_per_circuit)
+            circuit_cache: CircuitCache providing the simulator and
+                transpiled circuits (default: the process-wide cache)
+            backend_options: Optional dict of further AerSimulator options
+        """
+        if num_qubits is None:
+            num_qubits = QuantumKeyGenerator.max_qubits_per_circuit
+        if num_qubits <= 0:
+            raise ValueError("num_qubits must be positive")
+        self.seed = seed
+        self.num_qubits = num_qubits
+        self.circuit_cache = circuit_cache if circuit_cache is not None else default_circuit_cache
+        self.backend_options = dict(backend_options or {})
+        if method is not None:
+            self.backend_options['method'] = method
+        self.simulator = self.circuit_cache.get_simulator(self.backend_options)
+        self._jobs_run = 0
+    
+    def random_bits(self, num_bits):
+        """
+        Draw random bits by running as many jobs as needed.
+        
+        Each job runs up to QuantumKeyGenerator.max_shots_per_job shots of
+        one circuit; bits of the last shot beyond ``num_bits`` are
+        discarded.
+        
+        Args:
+            num_bits: Number of bits
+            
+        Returns:
+            numpy array of random bits (0s and 1s)
+        """
+        num_qubits = max(1, min(num_bits, self.num_qubits))
+        circuit = self.circuit_cache.get_harvest_circuit(num_qubits, self.backend_options)
+        chunks = []
+        
+        remaining_bits = num_bits
+        while remaining_bits > 0:
+            shots = min(QuantumKeyGenerator.max_shots_per_job, -(-remaining_bits // num_qubits))
+            
+            # Offset the seed per job so seeded sources do not repeat the
+            # same measurements across jobs or calls
+            job_seed = None if self.seed is None else self.seed + self._jobs_run
+            self._jobs_run += 1
+            
+            job = self.simulator.run(circuit, shots=shots, memory=True, seed_simulator=job_seed)
+            chunks.append(_memory_to_bits(job.result().data(0)['memory'], num_qubits))
+            remaining_bits -= shots * num_qubits
+        
+        if not chunks:
+            return np.zeros(0, dtype=np.uint8)
+        return np.concatenate(chunks)[:num_bits].astype(np.uint8, copy=False)
+
+
+def _memory_to_bits(memory, num_qubits):
+    """
+    Decode Aer per-shot memory into bits, qubit 0 first within each shot.
+    
+    Aer returns each shot as a hex string of the classical register, bit i
+    holding qubit i. Decoding these directly is several times faster than
+    formatting and parsing the bitstrings of Result.get_memory().
+    """
+    num_bytes = (num_qubits + 7) // 8
+    packed = b''.join(int(shot, 16).to_bytes(num_bytes, 'little') for shot in memory)
+    shots = np.frombuffer(packed, dtype=np.uint8).reshape(len(memory), num_bytes)
+    return np.unpackbits(shots, axis=1, bitorder='little')[:, :num_qubits].ravel()
+
+
+class ReplayEntropySource(EntropySource):
+    """
+    Pre-harvested random bytes read sequentially from a file.
+    
+    The file holds packed bits, most significant bit first (as written by
+    record_entropy() or bits_to_bytes()). It is memory-mapped, so only the
+    pages that are consumed are read. random_bits() consumes whole bytes.
+    
+    Every byte is handed out once, also across restarts and processes: the
+    offset of the first unused byte is kept in a sidecar file
+    (``<path>.offset``), which is advanced and flushed to disk under an
+    exclusive lock before any bytes are returned. Reusing keystream bytes
+    would break the XOR cipher, so a source never starts below the
+    recorded offset.
+    """
+    
+    name = 'replay'
+    
+    def __init__(self, path, offset=0):
+        """
+        Initialize the source.
+        
+        Args:
+            path: Path of the recorded entropy file
+            offset: Byte offset to start from; bytes before the offset
+                recorded in the sidecar file are never used again
+        """
+        self.path = path
+        self.offset_path = path + '.offset'
+        # np.memmap cannot map an empty file
+        if os.path.getsize(path):
+            self._data = np.memmap(path, dtype=np.uint8, mode='r')
+        else:
+            self._data = np.zeros(0, dtype=np.uint8)
+        self._lock = threading.Lock()
+        with self._lock, self._offset_file() as f:
+            self.position = max(offset, self._read_offset(f))
+            self._write_offset(f, self.position)
+    
+    @contextmanager
+    def _offset_file(self):
+        """Open the sidecar offset file, locked against other processes."""
+        fd = os.open(self.offset_path, os.O_RDWR | os.O_CREAT, 0o600)
+        with os.fdopen(fd, 'r+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield f
+    
+    @staticmethod
+    def _read_offset(f):
+        f.seek(0)
+        text = f.read().strip()
+        return int(text) if text else 0
+    
+    @staticmethod
+    def _write_offset(f, offset):
+        f.seek(0)
+        f.write(b'%d\n' % offset)
+        f.truncate()
+        f.flush()
+        os.fsync(f.fileno())
+    
+    @property
+    def remaining(self):
+        """Number of unused bytes left in the file."""
+        with self._lock, self._offset_file() as f:
+            return len(self._data) - max(self.position, self._read_offset(f))
+    
+    def random_bytes(self, num_bytes):
+        """
+        Read the next unused bytes of the file and advance the offset.
+        
+        Args:
+            num_bytes: Number of bytes
+            
+        Returns:
+            numpy array of random bytes (0-255)
+            
+        Raises:
+            RuntimeError: If fewer than ``num_bytes`` unused bytes are left;
+                nothing is consumed in that case
+        """
+        with self._lock, self._offset_file() as f:
+            # Another process may have consumed bytes since the last call
+            start = max(self.position, self._read_offset(f))
+            if num_bytes > len(self._data) - start:
+                raise RuntimeError(
+                    f"Entropy file {self.path} is exhausted: {num_bytes} bytes requested, "
+                    f"{len(self._data) - start} left"
+                )
+            # Persist the new offset before handing out the bytes
+            self._write_offset(f, start + num_bytes)
+            self.position = start + num_bytes
+        return np.array(self._data[start:start + num_bytes])
+
+
+class OSEntropySource(EntropySource):
+    """Random bytes from the operating system (os.urandom)."""
+    
+    name = 'os'
+    
+    def random_bytes(self, num_bytes):
+        """
+        Draw random bytes from os.urandom.
+        
+        Args:
+            num_bytes: Number of bytes
+            
+        Returns:
+            Read-only numpy array of random bytes (0-255)
+        """
+        return np.frombuffer(os.urandom(num_bytes), dtype=np.uint8)
+
+
+def record_entropy(source, path, num_bytes, chunk_bytes=1 << 20):
+    """
+    Harvest bytes from a source into a file for ReplayEntropySource.
+    
+    Args:
+        source: EntropySource (or QuantumKeyGenerator) to harvest from
+        path: Output file path; existing files are appended to
+        num_bytes: Number of bytes to record
+        chunk_bytes: Bytes harvested per call
+    """
+    draw = source.random_bytes if hasattr(source, 'random_bytes') else source.generate_keystream
+    with open(path, 'ab') as f:
+        remaining = num_bytes
+        while remaining > 0:
+            count = min(chunk_bytes, remaining)
+            f.write(np.ascontiguousarray(draw(count), dtype=np.uint8).tobytes())
+            remaining -= count
+
+
+def create_entropy_source(spec, seed=None):
+    """
+    Create a source from a short specification string.
+    
+    Args:
+        spec: 'aer', 'aer:<method>' (e.g. 'aer:stabilizer'),
+            'aer:<method>:<num_qubits>' (e.g. 'aer:extended_stabilizer:63'),
+            'replay:<path>' or 'os'
+        seed: Optional seed for Aer sources
+        
+    Returns:
+        EntropySource instance
+    """
+    kind, _, argument = spec.partition(':')
+    if kind == 'aer':
+        method, _, width = argument.partition(':')
+        return AerEntropySource(seed=seed, method=method or None, num_qubits=int(width) if width else None)
+    if kind == 'replay' and argument:
+        return ReplayEntropySource(argument)
+    if kind == 'os' and not argument:
+        return OSEntropySource()
+    raise ValueError(f"Unknown entropy source: {spec!r}")
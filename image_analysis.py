@@ -7,10 +7,12 @@ and PSNR (Peak Signal-to-Noise Ratio).
 """
 
 import numpy as np
-from scipy.stats import entropy as scipy_entropy
-import matplotlib.pyplot as plt
 import io
 
+# SciPy and matplotlib are imported inside the functions that use them:
+# together they take over a second to import, and the numeric metrics are
+# also used by workers that never draw a plot.
+
 
 def calculate_entropy(image_array):
     """
@@ -37,6 +39,7 @@ def calculate_entropy(image_array):
     probabilities = probabilities[probabilities > 0]
     
     # Calculate entropy using base 2 logarithm
+    from scipy.stats import entropy as scipy_entropy
     entropy_value = scipy_entropy(probabilities, base=2)
     
     return entropy_value
@@ -147,6 +150,8 @@ def generate_histogram_plot(image_array, title="Histogram"):
     Returns:
         bytes: PNG image data of the histogram
     """
+    import matplotlib.pyplot as plt
+    
     plt.figure(figsize=(10, 4))
     plt.hist(image_array.flatten(), bins=256, range=(0, 256), color='blue', alpha=0.7)
     plt.title(title)
@@ -176,6 +181,8 @@ def generate_correlation_plot(image_array, direction='horizontal', title="Correl
     Returns:
         bytes: PNG image data of the plot
     """
+    import matplotlib.pyplot as plt
+    
     if direction == 'horizontal':
         x = image_array[:, :-1].flatten()
         y = image_array[:, 1:].flatten()
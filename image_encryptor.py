@@ -8,81 +8,548 @@ XOR operations with quantum-generated keystreams and pixel permutations.
 import numpy as np
 from PIL import Image
 import io
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from ciphertext_container import (
+    CONTAINER_MAGIC,
+    check_key,
+    decode_header,
+    load_container,
+    open_container,
+    read_header
+)
+from key_format import load_key
+from quantum_key_generator import expand_keystream
+from tiled_encryptor import TiledImageEncryptor
+
+
+class PermutationCache:
+    """
+    LRU cache of pixel permutations keyed by (seed, length, rng).
+    
+    The permutation RNG is part of the key: the legacy and pcg64 RNGs
+    give different permutations for the same seed. Each entry holds the
+    forward permutation and, once a decryption has asked for it, the
+    inverse permutation. The cache is bounded by the total size of the
+    stored index arrays rather than by entry count. Cached arrays are
+    read-only and shared between callers.
+    
+    Index arrays are int64: a cached permutation costs 8 bytes per
+    permuted element, 16 once its inverse is cached as well, so the
+    default budget holds 32M elements of forward permutations. int32
+    indices would halve this but made gathers and scatters ~1.7x slower.
+    """
+    
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_bytes: Maximum total size of cached index arrays in bytes
+                (0 disables caching)
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get_permutation(self, seed, length, rng='legacy'):
+        """
+        Get the forward permutation for a seed and length.
+        
+        Args:
+            seed: Permutation seed
+            length: Number of elements to permute
+            rng: Permutation RNG, one of PERMUTATION_RNGS
+            
+        Returns:
+            Read-only numpy array of permutation indices
+        """
+        return self._get(seed, length, rng, 0)
+    
+    def get_inverse_permutation(self, seed, length, rng='legacy'):
+        """
+        Get the inverse of the permutation for a seed and length.
+        
+        Args:
+            seed: Permutation seed
+            length: Number of elements to permute
+            rng: Permutation RNG, one of PERMUTATION_RNGS
+            
+        Returns:
+            Read-only numpy array of inverse permutation indices
+        """
+        return self._get(seed, length, rng, 1)
+    
+    def _get(self, seed, length, rng, which):
+        """Look up (or compute and store) the forward (0) or inverse (1) array."""
+        key = (seed, length, rng)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[which] is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[which]
+            self.misses += 1
+            forward = entry[0] if entry is not None else None
+        
+        # Compute outside the lock so other lookups are not blocked
+        if forward is None:
+            forward = generate_permutation(seed, length, rng)
+            forward.flags.writeable = False
+        if which == 0:
+            result = forward
+        else:
+            result = invert_permutation(forward)
+            result.flags.writeable = False
+        
+        # Arrays that could never fit in the budget are not cached at all
+        if forward.nbytes + (result.nbytes if which == 1 else 0) > self.max_bytes:
+            return result
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = [None, None]
+                self._entries[key] = entry
+            if entry[0] is None:
+                entry[0] = forward
+                self.current_bytes += forward.nbytes
+            if which == 1 and entry[1] is None:
+                entry[1] = result
+                self.current_bytes += result.nbytes
+            self._entries.move_to_end(key)
+            self._evict()
+        return result
+    
+    def _evict(self):
+        """Drop least recently used entries until within budget (lock held)."""
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self.current_bytes -= sum(array.nbytes for array in entry if array is not None)
+            self.evictions += 1
+    
+    def clear(self):
+        """Remove all cached permutations."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+    
+    def stats(self):
+        """
+        Report cache counters.
+        
+        Returns:
+            dict: Hits, misses, evictions, entry count and byte usage
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'current_bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+def invert_permutation(permutation):
+    """
+    Compute the inverse of a permutation in O(n) by scattering.
+    
+    Args:
+        permutation: 1D numpy array containing each index 0..n-1 once
+        
+    Returns:
+        numpy array ``inverse`` with ``inverse[permutation[i]] == i``
+    """
+    inverse = np.empty_like(permutation)
+    inverse[permutation] = np.arange(len(permutation), dtype=inverse.dtype)
+    return inverse
+
+
+# Supported permutation RNGs: 'legacy' reproduces the sequence of the
+# global np.random.seed()/np.random.permutation() calls used by earlier
+# versions, 'pcg64' uses NumPy's default Generator
+PERMUTATION_RNGS = ('legacy', 'pcg64')
+
+
+def generate_permutation(seed, length, rng='legacy'):
+    """
+    Generate the pixel permutation for a seed and length.
+    
+    A private RNG instance is created for every call, so the global NumPy
+    random state is never touched and concurrent calls cannot interfere.
+    
+    Args:
+        seed: Permutation seed
+        length: Number of elements to permute
+        rng: 'legacy' (RandomState, matches existing ciphertexts) or
+            'pcg64' (np.random.Generator)
+            
+    Returns:
+        numpy array of permutation indices
+    """
+    if rng == 'legacy':
+        return np.random.RandomState(seed).permutation(length)
+    if rng == 'pcg64':
+        return np.random.default_rng(seed).permutation(length)
+    raise ValueError(f"Unknown permutation RNG: {rng!r}")
+
+
+# Process-wide cache shared by ImageEncryptor instances by default
+default_permutation_cache = PermutationCache()
+
+
+# Units moved by the permutation: 'byte' permutes every array element
+# independently (channels of a pixel are scattered), 'pixel' moves all
+# channels of a pixel together
+PERMUTE_UNITS = ('byte', 'pixel')
 
 
 class ImageEncryptor:
     """
-    Handles encryption and decryption of grayscale images using
-    quantum-generated keys and classical encryption techniques.
+    Handles encryption and decryption of grayscale and multichannel
+    (H x W x C) images using quantum-generated keys and classical
+    encryption techniques.
+    
+    Images of any fixed-size dtype (uint8, uint16, uint32, float32, ...)
+    are encrypted through their raw byte view, so a single keystream
+    covers every byte of the image and the exact dtype round-trips. The
+    permutation moves either individual bytes or whole pixels (see
+    PERMUTE_UNITS).
     """
     
-    def __init__(self, keystream, permutation_seed):
+    # Number of units (bytes or pixels) XORed and scattered per step
+    chunk_size = 1 << 16
+    
+    def __init__(self, keystream, permutation_seed, permutation_cache=None,
+                 permutation_rng='legacy', workers=1, permute_unit='byte'):
         """
         Initialize the encryptor with keys.
         
         Args:
-            keystream: numpy array of random bytes for XOR operation
+            keystream: numpy array of random bytes for XOR operation, one
+                byte per byte of image data
             permutation_seed: seed for pixel permutation
+            permutation_cache: PermutationCache to use (defaults to the
+                module-level cache shared by all encryptors)
+            permutation_rng: 'legacy' to reproduce permutations of existing
+                ciphertexts, or 'pcg64' for np.random.Generator
+            workers: Number of threads used for XOR and scatter; NumPy
+                releases the GIL for these operations, so values above 1
+                use multiple cores. Output is identical for any value.
+            permute_unit: 'byte' to permute every byte of the image data, or
+                'pixel' to keep the bytes of each pixel (all channels)
+                together
         """
+        if permutation_rng not in PERMUTATION_RNGS:
+            raise ValueError(f"Unknown permutation RNG: {permutation_rng!r}")
+        if permute_unit not in PERMUTE_UNITS:
+            raise ValueError(f"Unknown permute unit: {permute_unit!r}")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.workers = workers
         self.keystream = keystream
         self.permutation_seed = permutation_seed
+        self.permutation_rng = permutation_rng
+        self.permute_unit = permute_unit
+        if permutation_cache is None:
+            permutation_cache = default_permutation_cache
+        self.permutation_cache = permutation_cache
+    
+    @classmethod
+    def from_key(cls, key, workers=1):
+        """
+        Create an encryptor from a key dictionary.
+        
+        Seed-expanded keys are expanded to the keystream length needed for
+        the image shape and dtype recorded in the key.
+        
+        Args:
+            key: Key dictionary (see key_format.create_key)
+            workers: Number of threads used for encryption/decryption
+            
+        Returns:
+            ImageEncryptor instance
+        """
+        if key['options'].get('mode', 'whole') != 'whole':
+            raise ValueError("Key is not for whole-image encryption; use create_encryptor()")
+        if key['keystream'] is not None:
+            keystream = key['keystream']
+        else:
+            num_bytes = int(np.prod(key['shape'])) * np.dtype(key['dtype']).itemsize
+            keystream = expand_keystream(key['keystream_seed'], num_bytes)
+        return cls(
+            keystream,
+            key['permutation_seed'],
+            permutation_rng=key['options'].get('permutation_rng', 'legacy'),
+            workers=workers,
+            permute_unit=key['options'].get('permute_unit', 'byte')
+        )
+    
+    @classmethod
+    def from_key_file(cls, file, workers=1):
+        """
+        Create an encryptor from a compact or legacy .npz key file.
+        
+        Args:
+            file: File path, bytes object or readable binary file object
+            workers: Number of threads used for encryption/decryption
+            
+        Returns:
+            ImageEncryptor instance
+        """
+        return cls.from_key(load_key(file), workers=workers)
     
     def encrypt_image(self, image_array):
         """
         Encrypt an image using XOR and permutation.
         
         Args:
-            image_array: 2D numpy array of pixel values
+            image_array: numpy array of pixel values, H x W or H x W x C
             
         Returns:
-            2D numpy array of encrypted pixel values
+            numpy array of encrypted pixel values with the same shape
+        """
+        image_array = np.asarray(image_array)
+        encrypted_image = np.empty(image_array.shape, dtype=image_array.dtype)
+        return self.encrypt_into(image_array, encrypted_image)
+    
+    def decrypt_image(self, encrypted_array):
         """
-        # Flatten image to 1D array
-        original_shape = image_array.shape
-        flat_image = image_array.flatten()
+        Decrypt an image by reversing the encryption process.
         
-        # Step 1: XOR with quantum keystream
-        encrypted = np.bitwise_xor(flat_image, self.keystream)
+        Args:
+            encrypted_array: numpy array of encrypted pixel values, H x W or
+                H x W x C
+                
+        Returns:
+            numpy array of decrypted pixel values with the same shape
+        """
+        encrypted_array = np.asarray(encrypted_array)
+        decrypted_image = np.empty(encrypted_array.shape, dtype=encrypted_array.dtype)
+        return self.decrypt_into(encrypted_array, decrypted_image)
+    
+    def encrypt_into(self, src, out):
+        """
+        Encrypt an image into a caller-owned output buffer.
         
-        # Step 2: Permute pixels
-        np.random.seed(self.permutation_seed)
-        permutation_indices = np.random.permutation(len(encrypted))
-        encrypted_permuted = encrypted[permutation_indices]
+        ``out`` is filled in chunks of ``chunk_size`` units, in output
+        order: each chunk gathers its source units and keystream units
+        through the forward permutation and XORs them straight into
+        ``out``. Apart from the input and output buffers only chunk-sized
+        temporaries are allocated, so peak memory is ~2x the image size
+        plus the forward permutation held by the cache (8 bytes per unit).
         
-        # Reshape back to original dimensions
-        encrypted_image = encrypted_permuted.reshape(original_shape)
+        Args:
+            src: Array-like of pixel values (ndarray, np.memmap, memoryview)
+            out: Writable C-contiguous buffer with the same number of
+                elements and the same dtype (ndarray, np.memmap or
+                writable memoryview); must not overlap ``src``
+                
+        Returns:
+            ``out`` as a numpy array with the shape of ``src``
+        """
+        flat_src, flat_out, result = self._prepare_buffers(src, out)
+        keystream = self._keystream_units(flat_src)
+        permutation_indices = self.permutation_cache.get_permutation(
+            self.permutation_seed, len(flat_src), self.permutation_rng
+        )
         
-        return encrypted_image
+        def encrypt_chunk(start, stop):
+            # Output position i holds pixel permutation[i], XORed with the
+            # keystream at that pixel's original position
+            source_index = permutation_indices[start:stop]
+            np.bitwise_xor(
+                flat_src[source_index].view(np.uint8),
+                keystream[source_index].view(np.uint8),
+                out=flat_out[start:stop].view(np.uint8)
+            )
+        
+        self._run_chunks(encrypt_chunk, len(flat_src))
+        return result
     
-    def decrypt_image(self, encrypted_array):
+    def decrypt_into(self, src, out):
         """
-        Decrypt an image by reversing the encryption process.
+        Decrypt an image into a caller-owned output buffer.
+        
+        Encrypted pixels are scattered straight back to their original
+        positions in ``out`` and then XORed with the keystream in place, so
+        no temporaries are allocated. Peak memory is ~2x the image size plus
+        the forward permutation held by the cache (8 bytes per unit).
+        
+        Args:
+            src: Array-like of encrypted pixel values (ndarray, np.memmap,
+                memoryview)
+            out: Writable C-contiguous buffer with the same number of
+                elements and the same dtype (ndarray, np.memmap or
+                writable memoryview); must not overlap ``src``
+                
+        Returns:
+            ``out`` as a numpy array with the shape of ``src``
+        """
+        flat_src, flat_out, result = self._prepare_buffers(src, out)
+        keystream = self._keystream_units(flat_src)
+        permutation_indices = self.permutation_cache.get_permutation(
+            self.permutation_seed, len(flat_src), self.permutation_rng
+        )
+        
+        def depermute_chunk(start, stop):
+            # Step 1: Reverse permutation by scattering each pixel back to its
+            # original position (O(n), no inverse permutation array needed)
+            flat_out[permutation_indices[start:stop]] = flat_src[start:stop]
+        
+        def xor_chunk(start, stop):
+            # Step 2: XOR with quantum keystream (XOR is self-inverse)
+            chunk = flat_out[start:stop].view(np.uint8)
+            np.bitwise_xor(chunk, keystream[start:stop].view(np.uint8), out=chunk)
+        
+        # Every scatter must finish before any XOR reads its output
+        self._run_chunks(depermute_chunk, len(flat_src))
+        self._run_chunks(xor_chunk, len(flat_src))
+        return result
+    
+    def decrypt_region(self, src, rows=slice(None), cols=slice(None)):
+        """
+        Decrypt a rectangular region of an encrypted image.
+        
+        Only the ciphertext positions that hold the region's pixels are
+        gathered, so with a memory-mapped ``src`` (see
+        ciphertext_container.open_container) only the pages containing
+        them are read. Apart from the cached permutation, the cost is
+        proportional to the region size.
         
         Args:
-            encrypted_array: 2D numpy array of encrypted pixel values
+            src: Encrypted image of shape H x W or H x W x C (ndarray or
+                np.memmap)
+            rows: Slice of rows to decrypt
+            cols: Slice of columns to decrypt
             
         Returns:
-            2D numpy array of decrypted pixel values
+            numpy array of decrypted pixel values for the region
         """
-        # Flatten image to 1D array
-        original_shape = encrypted_array.shape
-        flat_encrypted = encrypted_array.flatten()
+        src = np.asarray(src)
+        if src.ndim < 2:
+            raise ValueError("decrypt_region needs an image with at least 2 dimensions")
+        if len(self.keystream) != src.nbytes:
+            raise ValueError(
+                f"Keystream length {len(self.keystream)} does not match image size {src.nbytes} bytes"
+            )
+        height, width = src.shape[:2]
+        row_index = np.arange(height)[rows]
+        col_index = np.arange(width)[cols]
         
-        # Step 1: Reverse permutation
-        np.random.seed(self.permutation_seed)
-        permutation_indices = np.random.permutation(len(flat_encrypted))
+        units = self._units(src)
+        keystream = self._keystream_units(units)
+        units_per_pixel = len(units) // (height * width) if units.size else 1
+        pixel_index = (row_index[:, None] * width + col_index[None, :]).reshape(-1)
+        unit_index = (pixel_index[:, None] * units_per_pixel + np.arange(units_per_pixel)).reshape(-1)
         
-        # Create inverse permutation
-        inverse_permutation = np.argsort(permutation_indices)
-        depermuted = flat_encrypted[inverse_permutation]
+        inverse_permutation = self.permutation_cache.get_inverse_permutation(
+            self.permutation_seed, len(units), self.permutation_rng
+        )
+        # Gather each unit from its permuted position, then XOR
+        decrypted = np.bitwise_xor(
+            units[inverse_permutation[unit_index]].view(np.uint8),
+            keystream[unit_index].view(np.uint8)
+        )
+        return decrypted.view(src.dtype).reshape((len(row_index), len(col_index)) + src.shape[2:])
+    
+    def _run_chunks(self, func, length):
+        """
+        Call ``func(start, stop)`` over consecutive chunks of ``range(length)``.
         
-        # Step 2: XOR with quantum keystream (XOR is self-inverse)
-        decrypted = np.bitwise_xor(depermuted, self.keystream)
+        Chunks cover disjoint input ranges and (through the permutation)
+        disjoint output positions, so they can run on a thread pool in any
+        order without changing the result.
+        """
+        if self.workers == 1 or length <= self.chunk_size:
+            for start in range(0, length, self.chunk_size):
+                func(start, min(start + self.chunk_size, length))
+            return
         
-        # Reshape back to original dimensions
-        decrypted_image = decrypted.reshape(original_shape)
+        # A few chunks per worker balances load without per-task overhead
+        chunk_size = max(self.chunk_size, -(-length // (4 * self.workers)))
+        bounds = [(start, min(start + chunk_size, length)) for start in range(0, length, chunk_size)]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for future in [executor.submit(func, start, stop) for start, stop in bounds]:
+                future.result()
+    
+    def _prepare_buffers(self, src, out):
+        """
+        Validate src/out and return their flat byte views plus ``out``
+        shaped like ``src``.
         
-        return decrypted_image
+        With permute_unit='pixel' the views have one opaque ``V<n>``
+        element per pixel, so the permutation scatters whole pixels with a
+        1D index (several times faster than indexing rows of a 2D array).
+        """
+        src = np.asarray(src)
+        out_array = np.asarray(out)
+        
+        if len(self.keystream) != src.nbytes:
+            raise ValueError(
+                f"Keystream length {len(self.keystream)} does not match image size {src.nbytes} bytes"
+            )
+        if out_array.size != src.size:
+            raise ValueError(f"Output buffer has {out_array.size} elements, expected {src.size}")
+        if out_array.dtype != src.dtype:
+            raise ValueError(f"Output buffer dtype must be {src.dtype}, got {out_array.dtype}")
+        if not out_array.flags.c_contiguous or not out_array.flags.writeable:
+            raise ValueError("Output buffer must be writable and C-contiguous")
+        if np.may_share_memory(src, out_array):
+            raise ValueError("Output buffer must not overlap the input")
+        
+        return self._units(src), self._units(out_array.reshape(src.shape)), out_array.reshape(src.shape)
+    
+    def _units(self, array):
+        """Zero-copy flat view of an array's bytes in permutation units."""
+        # Strided inputs are copied once
+        flat = np.ascontiguousarray(array).reshape(-1).view(np.uint8)
+        num_pixels = array.shape[0] * array.shape[1] if array.ndim >= 2 else array.size
+        if self.permute_unit == 'pixel' and num_pixels and array.nbytes > num_pixels:
+            return flat.view(np.dtype(('V', array.nbytes // num_pixels)))
+        return flat
+    
+    def _keystream_units(self, flat_src):
+        """Keystream viewed in the units of the flattened buffers."""
+        keystream = np.asarray(self.keystream, dtype=np.uint8)
+        if flat_src.dtype != np.uint8:
+            return np.ascontiguousarray(keystream).view(flat_src.dtype)
+        return keystream
+
+
+# Encryption modes selectable through the 'mode' key option: 'whole'
+# permutes the entire image at once, 'tiled' works block by block with
+# memory bounded by the block size
+ENCRYPTION_MODES = ('whole', 'tiled')
+
+
+def create_encryptor(key, workers=1):
+    """
+    Create the encryptor matching the mode recorded in a key.
+    
+    Args:
+        key: Key dictionary (see key_format.create_key)
+        workers: Number of threads used by whole-image encryption
+        
+    Returns:
+        ImageEncryptor or TiledImageEncryptor instance
+    """
+    mode = key['options'].get('mode', 'whole')
+    if mode == 'whole':
+        return ImageEncryptor.from_key(key, workers=workers)
+    if mode == 'tiled':
+        return TiledImageEncryptor.from_key(key)
+    raise ValueError(f"Unknown encryption mode: {mode!r}")
 
 
 def load_image_as_grayscale(image_path_or_bytes):
@@ -109,29 +576,376 @@ def load_image_as_grayscale(image_path_or_bytes):
     return image_array
 
 
-def save_image_array(image_array, output_path):
+def _open_image(image_path_or_bytes):
+    """Open an image lazily; Pillow only reads the header at this point."""
+    if isinstance(image_path_or_bytes, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(image_path_or_bytes))
+    return Image.open(image_path_or_bytes)
+
+
+def _load_mode(image):
+    """PIL mode load_image() converts an image to, or None to keep it as is."""
+    if image.mode in _NATIVE_MODES or image.mode.startswith('I;16'):
+        return None
+    if image.mode in _CHANNEL_MODES.values():
+        return None
+    if image.mode == '1':
+        return 'L'
+    if image.mode in ('P', 'PA'):
+        has_alpha = image.mode == 'PA' or 'transparency' in image.info
+        return 'RGBA' if has_alpha else 'RGB'
+    return 'RGBA' if 'A' in image.getbands() else 'RGB'
+
+
+def load_image(image_path_or_bytes):
+    """
+    Load an image as a numpy array, keeping its color channels.
+    
+    Grayscale images give an H x W array; images with color or alpha give
+    H x W x C arrays with the channels of 'LA', 'RGB' or 'RGBA'. Palette
+    and other color modes are expanded to RGB(A). 16-bit grayscale images
+    are returned as uint16, 32-bit integer and float images (e.g. TIFF) as
+    int32 and float32, without any conversion of values; big-endian files
+    are returned in native byte order.
+    
+    Args:
+        image_path_or_bytes: File path string or bytes object
+        
+    Returns:
+        numpy array of pixel values (uint8 unless the image is 16/32-bit)
+    """
+    image = _open_image(image_path_or_bytes)
+    mode = _load_mode(image)
+    if mode is None:
+        # Keys record the dtype of this array, so it must not depend on the
+        # byte order of the file ('I;16B')
+        array = np.array(image)
+        return array if array.dtype.isnative else array.astype(array.dtype.newbyteorder('='))
+    return np.array(image.convert(mode), dtype=np.uint8)
+
+
+def probe_image(image_path_or_bytes):
+    """
+    Read the size, mode and bit depth of an image without decoding pixels.
+    
+    Only the file header is parsed (Pillow decodes lazily), so probing a
+    large upload costs microseconds. Ciphertext containers are recognized
+    too.
+    
+    Args:
+        image_path_or_bytes: File path string, bytes object or container
+        
+    Returns:
+        dict: 'format', 'mode', 'width', 'height', 'bit_depth', and the
+        'shape' and 'dtype' that load_image() would return
+    """
+    if isinstance(image_path_or_bytes, (bytes, bytearray, memoryview)):
+        head = bytes(image_path_or_bytes[:len(CONTAINER_MAGIC)])
+    else:
+        with open(image_path_or_bytes, 'rb') as f:
+            head = f.read(len(CONTAINER_MAGIC))
+    if head == CONTAINER_MAGIC:
+        header = (decode_header(image_path_or_bytes)
+                  if isinstance(image_path_or_bytes, (bytes, bytearray, memoryview))
+                  else read_header(image_path_or_bytes))
+        shape = tuple(header['shape'])
+        return {
+            'format': 'QISC',
+            'mode': None,
+            'width': shape[1] if len(shape) > 1 else shape[0],
+            'height': shape[0] if len(shape) > 1 else 1,
+            'bit_depth': 8 * header['dtype'].itemsize,
+            'shape': shape,
+            'dtype': header['dtype'],
+        }
+    
+    with _open_image(image_path_or_bytes) as image:
+        mode = _load_mode(image) or image.mode
+        if mode.startswith('I;16'):
+            dtype, bit_depth = np.dtype(np.uint16), 16
+        elif mode in _NATIVE_MODES:
+            dtype, bit_depth = np.dtype(np.int32 if mode == 'I' else np.float32), 32
+        else:
+            dtype, bit_depth = np.dtype(np.uint8), 1 if image.mode == '1' else 8
+        channels = Image.getmodebands(mode)
+        shape = (image.height, image.width) + ((channels,) if channels > 1 else ())
+        return {
+            'format': image.format,
+            'mode': image.mode,
+            'width': image.width,
+            'height': image.height,
+            'bit_depth': bit_depth,
+            'shape': shape,
+            'dtype': dtype,
+        }
+
+
+def check_image_for_key(info, key):
+    """
+    Check a probed ciphertext against the image metadata stored in a key.
+    
+    Args:
+        info: Result of probe_image()
+        key: Key dictionary (see key_format.create_key)
+        
+    Returns:
+        str: How the ciphertext must be loaded: 'exact' (load_image as
+        is) or 'grayscale' (legacy grayscale conversion)
+        
+    Raises:
+        ValueError: If the ciphertext cannot belong to the key
+    """
+    shape = tuple(key['shape'])
+    dtype = np.dtype(key['dtype'])
+    if info['shape'] == shape and info['dtype'].itemsize == dtype.itemsize:
+        return 'exact'
+    if dtype == np.uint8 and shape == (info['height'], info['width']) and info['bit_depth'] <= 8:
+        return 'grayscale'
+    raise ValueError(
+        f"Encrypted image is {info['width']}x{info['height']} {info['mode'] or ''} "
+        f"({info['bit_depth']}-bit), but the key is for shape {shape} {dtype}"
+    )
+
+
+def load_ciphertext(image_path_or_bytes, key):
+    """
+    Validate a ciphertext against a key from its header, then decode it.
+    
+    Mismatched uploads are rejected before any pixel data is decoded.
+    Ciphertext containers are viewed without copying.
+    
+    Args:
+        image_path_or_bytes: Encrypted image or container (path or bytes)
+        key: Key dictionary (see key_format.create_key)
+        
+    Returns:
+        numpy array with the shape and dtype recorded in the key
+    """
+    info = probe_image(image_path_or_bytes)
+    how = check_image_for_key(info, key)
+    
+    if info['format'] == 'QISC':
+        if isinstance(image_path_or_bytes, (bytes, bytearray, memoryview)):
+            array, header = load_container(image_path_or_bytes)
+        else:
+            array, header = open_container(image_path_or_bytes)
+        check_key(header, key)
+    elif how == 'grayscale':
+        array = load_image_as_grayscale(image_path_or_bytes)
+    else:
+        array = load_image(image_path_or_bytes)
+    dtype = np.dtype(key['dtype'])
+    if array.dtype.newbyteorder('=') == dtype.newbyteorder('='):
+        # Image files store values, so a key recorded for a non-native byte
+        # order (e.g. '>u2') needs the values converted, not reinterpreted
+        array = array.astype(dtype, copy=False)
+    else:
+        # Formats without the exact dtype (e.g. uint32 stored as int32) keep its bits
+        array = array.view(dtype)
+    return array.reshape(key['shape'])
+
+
+def load_preview(image_path_or_bytes, max_size=(512, 512)):
+    """
+    Load a downscaled preview of an image.
+    
+    For JPEG files Pillow's draft mode decodes directly at a reduced
+    scale, so only a fraction of the pixels is ever decoded; other
+    formats are decoded and then downscaled.
+    
+    Args:
+        image_path_or_bytes: File path string or bytes object
+        max_size: Maximum (width, height) of the preview
+        
+    Returns:
+        PIL Image no larger than ``max_size``
+    """
+    image = _open_image(image_path_or_bytes)
+    image.draft(_load_mode(image) or image.mode, max_size)
+    image.thumbnail(max_size)
+    return image
+
+
+# PIL mode for each number of channels of an H x W x C array
+_CHANNEL_MODES = {1: 'L', 2: 'LA', 3: 'RGB', 4: 'RGBA'}
+
+# Single-channel PIL modes loaded without conversion (besides 'I;16*'),
+# and the PIL mode used to save each non-uint8 dtype; uint32 is stored
+# bit-for-bit as int32
+_NATIVE_MODES = ('I', 'F')
+_DTYPE_MODES = {
+    np.dtype('<u2'): ('I;16', '<u2'),
+    np.dtype('>u2'): ('I;16', '<u2'),
+    np.dtype('<i4'): ('I', '<i4'),
+    np.dtype('<u4'): ('I', '<i4'),
+    np.dtype('<f4'): ('F', '<f4'),
+}
+
+
+def _pil_mode(shape, dtype):
+    """
+    PIL mode and storage dtype that hold an array of this shape and dtype
+    exactly; single-channel H x W x 1 arrays count as H x W.
+    """
+    shape = tuple(shape)
+    dtype = np.dtype(dtype)
+    channels = shape[2] if len(shape) == 3 else 1
+    if len(shape) not in (2, 3) or channels not in _CHANNEL_MODES:
+        raise ValueError(f"Cannot save an array of shape {shape} as an image")
+    if dtype in (np.dtype(np.uint8), np.dtype(np.bool_)):
+        return _CHANNEL_MODES[channels], np.uint8
+    if dtype in _DTYPE_MODES:
+        if channels != 1:
+            raise ValueError(
+                f"{dtype} images with {channels} channels cannot be stored exactly as "
+                f"image files; use the raw ciphertext container"
+            )
+        return _DTYPE_MODES[dtype]
+    raise ValueError(f"Cannot save {dtype} arrays as images without losing values")
+
+
+def check_image_format(shape, dtype, image_format):
+    """
+    Check that an array can be saved exactly in an image format.
+    
+    Lets callers reject an unsupported shape/dtype before doing any work
+    (e.g. before encrypting), instead of failing when saving.
+    
+    Args:
+        shape: Array shape, H x W or H x W x C
+        dtype: Array dtype
+        image_format: Pillow format name, e.g. 'PNG' or 'TIFF'
+        
+    Raises:
+        ValueError: If the array cannot be stored without loss
+    """
+    mode, _ = _pil_mode(shape, dtype)
+    if mode in ('I', 'F') and image_format != 'TIFF':
+        raise ValueError(f"{np.dtype(dtype)} images must be saved as TIFF, got {image_format}")
+
+
+def _array_to_pil(image_array):
+    """Convert an H x W or H x W x C array to a PIL image."""
+    image_array = np.asarray(image_array)
+    mode, dtype = _pil_mode(image_array.shape, image_array.dtype)
+    if image_array.ndim == 3 and image_array.shape[2] == 1:
+        image_array = image_array[:, :, 0]
+    # Same-size integer views keep the exact bits (uint32 -> int32); a
+    # byte order change ('>u2' -> '<u2') keeps the values
+    if np.dtype(dtype).kind == image_array.dtype.kind or image_array.dtype == np.bool_:
+        image_array = image_array.astype(dtype, copy=False)
+    else:
+        image_array = image_array.view(dtype)
+    return Image.fromarray(np.ascontiguousarray(image_array), mode=mode)
+
+
+# Roles of saved images: ciphertext is incompressible noise, so PNG
+# ciphertext is written without deflate; plaintext (decrypted images and
+# previews) keeps Pillow's compressed defaults. TIFF and BMP are always
+# written uncompressed.
+IMAGE_ROLES = ('plaintext', 'ciphertext')
+
+# PNG color type and bytes per sample for modes _encode_stored_png writes
+_PNG_COLOR_TYPES = {'L': (0, 1), 'LA': (4, 1), 'RGB': (2, 1), 'RGBA': (6, 1), 'I;16': (0, 2)}
+
+# Maximum IDAT chunk length written by _encode_stored_png
+_PNG_MAX_CHUNK = 1 << 30
+
+
+def _png_chunk(tag, data):
+    """Encode one PNG chunk (length, tag, data, CRC)."""
+    crc = zlib.crc32(data, zlib.crc32(tag))
+    return b''.join([struct.pack('>I', len(data)), tag, data, struct.pack('>I', crc)])
+
+
+def _encode_stored_png(image):
+    """
+    Encode a PIL image as PNG with unfiltered rows and stored deflate blocks.
+    
+    Pillow spends most of its time choosing row filters, even with
+    compress_level=0, which is wasted on incompressible ciphertext.
+    """
+    color_type, sample_bytes = _PNG_COLOR_TYPES[image.mode]
+    pixels = np.asarray(image)
+    if sample_bytes == 2:
+        pixels = pixels.astype('>u2')
+    
+    # Every scanline starts with filter type 0 (None)
+    rows = pixels.reshape(image.height, -1).view(np.uint8)
+    scanlines = np.zeros((image.height, rows.shape[1] + 1), dtype=np.uint8)
+    scanlines[:, 1:] = rows
+    compressed = memoryview(zlib.compress(scanlines, 0))
+    
+    header = struct.pack('>IIBBBBB', image.width, image.height, 8 * sample_bytes, color_type, 0, 0, 0)
+    parts = [b'\x89PNG\r\n\x1a\n', _png_chunk(b'IHDR', header)]
+    for start in range(0, len(compressed), _PNG_MAX_CHUNK):
+        parts.append(_png_chunk(b'IDAT', compressed[start:start + _PNG_MAX_CHUNK]))
+    parts.append(_png_chunk(b'IEND', b''))
+    return b''.join(parts)
+
+
+def _save_pil_image(image, file, image_format, role, compress_level):
+    """Save a PIL image following the output policy of its role."""
+    if role not in IMAGE_ROLES:
+        raise ValueError(f"Unknown image role: {role!r}")
+    if compress_level is None and role == 'ciphertext':
+        compress_level = 0
+    
+    if image_format == 'PNG' and compress_level is not None:
+        if compress_level == 0 and image.mode in _PNG_COLOR_TYPES:
+            data = _encode_stored_png(image)
+            if hasattr(file, 'write'):
+                file.write(data)
+            else:
+                with open(file, 'wb') as f:
+                    f.write(data)
+            return
+        image.save(file, format='PNG', compress_level=compress_level)
+        return
+    image.save(file, format=image_format)
+
+
+def save_image_array(image_array, output_path, role='plaintext', compress_level=None):
     """
     Save a numpy array as an image file.
     
+    uint16 images are saved as 16-bit (PNG or TIFF). int32, uint32 and
+    float32 images are only stored exactly by TIFF, so other formats are
+    rejected for them; uint32 images read back as int32 with the same bits.
+    Other dtypes, and multichannel images that are not uint8, raise
+    ValueError (see check_image_format) rather than being truncated.
+    
     Args:
-        image_array: 2D numpy array of pixel values
+        image_array: H x W (grayscale) or H x W x C (LA, RGB, RGBA) numpy
+            array of pixel values
         output_path: Path to save the image
+        role: 'plaintext' (compressed PNG) or 'ciphertext' (PNG without
+            compression); see IMAGE_ROLES
+        compress_level: Optional PNG compression level 0-9 overriding the
+            role's default
     """
-    image = Image.fromarray(image_array.astype(np.uint8), mode='L')
-    image.save(output_path)
+    extension = os.path.splitext(str(output_path))[1].lower()
+    image_format = Image.registered_extensions().get(extension)
+    check_image_format(np.shape(image_array), np.asarray(image_array).dtype, image_format)
+    image = _array_to_pil(image_array)
+    _save_pil_image(image, output_path, image_format, role, compress_level)
 
 
-def array_to_image_bytes(image_array):
+def array_to_image_bytes(image_array, role='plaintext', compress_level=None, image_format='PNG'):
     """
     Convert numpy array to image bytes (for Streamlit display).
     
     Args:
-        image_array: 2D numpy array of pixel values
+        image_array: H x W or H x W x C numpy array of pixel values
+        role: 'plaintext' or 'ciphertext' (see save_image_array)
+        compress_level: Optional PNG compression level overriding the role
+        image_format: Pillow format name, e.g. 'PNG', 'TIFF' or 'BMP'
         
     Returns:
-        bytes object containing PNG image data
+        bytes object containing the encoded image data
     """
-    image = Image.fromarray(image_array.astype(np.uint8), mode='L')
+    check_image_format(np.shape(image_array), np.asarray(image_array).dtype, image_format)
+    image = _array_to_pil(image_array)
     buf = io.BytesIO()
-    image.save(buf, format='PNG')
+    _save_pil_image(image, buf, image_format, role, compress_level)
     return buf.getvalue()
@@ -0,0 +1,256 @@
+"""
+Key File Format Module
+
+This module reads and writes encryption key files. The compact format
+stores the quantum seeds and image metadata instead of a full XOR
+keystream, so a key file is a few dozen bytes regardless of image size.
+Legacy ``.npz`` key files written by earlier versions are still readable.
+
+Compact layout (little-endian):
+
+    magic            4 bytes   b'QISK'
+    version          uint8
+    algorithm        uint8     ALGORITHM_RAW_KEYSTREAM or ALGORITHM_SEED_EXPANDED
+    channels         uint8
+    ndim             uint8
+    permutation_seed uint64
+    keystream_seed   32 bytes  big-endian integer (zero for raw keystreams)
+    dtype            uint8 length + ASCII NumPy dtype string (e.g. '|u1')
+    shape            ndim x uint64
+    options          uint32 length + UTF-8 JSON object
+    payload          uint64 length + keystream bytes (raw keystreams only)
+"""
+
+import hashlib
+import io
+import json
+import struct
+import numpy as np
+
+
+KEY_MAGIC = b'QISK'
+KEY_VERSION = 1
+
+ALGORITHM_RAW_KEYSTREAM = 0
+ALGORITHM_SEED_EXPANDED = 1
+
+ALGORITHM_NAMES = {
+    ALGORITHM_RAW_KEYSTREAM: 'raw',
+    ALGORITHM_SEED_EXPANDED: 'seed-expanded',
+}
+
+_HEADER = struct.Struct('<4sBBBBQ32s')
+_KEYSTREAM_SEED_BYTES = 32
+
+# Length of the key identifiers returned by key_id()
+KEY_ID_BYTES = 16
+
+
+def create_key(shape, permutation_seed, keystream_seed=None, keystream=None,
+               dtype=np.uint8, options=None):
+    """
+    Build a key dictionary for an image.
+    
+    Exactly one of ``keystream_seed`` (compact, seed-expanded key) or
+    ``keystream`` (full XOR keystream) must be given.
+    
+    Args:
+        shape: Shape of the image array
+        permutation_seed: Seed for pixel permutation
+        keystream_seed: Integer seed for expand_keystream()
+        keystream: numpy array of random bytes for XOR operation
+        dtype: Pixel dtype of the image
+        options: Optional dict of extra encryption parameters
+        
+    Returns:
+        dict: Key with 'algorithm', 'keystream_seed', 'keystream',
+        'permutation_seed', 'shape', 'dtype', 'channels' and 'options'
+    """
+    if (keystream_seed is None) == (keystream is None):
+        raise ValueError("Exactly one of keystream_seed or keystream must be given")
+    
+    shape = tuple(int(dim) for dim in shape)
+    return {
+        'algorithm': 'raw' if keystream is not None else 'seed-expanded',
+        'keystream_seed': None if keystream_seed is None else int(keystream_seed),
+        'keystream': None if keystream is None else np.asarray(keystream, dtype=np.uint8),
+        'permutation_seed': int(permutation_seed),
+        'shape': shape,
+        'dtype': np.dtype(dtype),
+        'channels': shape[2] if len(shape) == 3 else 1,
+        'options': dict(options or {}),
+    }
+
+
+def encode_key(key):
+    """
+    Serialize a key dictionary to the compact binary format.
+    
+    Args:
+        key: Key dictionary (see create_key)
+        
+    Returns:
+        bytes object containing the key file
+    """
+    if key['algorithm'] == 'raw':
+        algorithm = ALGORITHM_RAW_KEYSTREAM
+        keystream_seed = 0
+        payload = np.ascontiguousarray(key['keystream'], dtype=np.uint8).tobytes()
+    elif key['algorithm'] == 'seed-expanded':
+        algorithm = ALGORITHM_SEED_EXPANDED
+        keystream_seed = key['keystream_seed']
+        payload = b''
+    else:
+        raise ValueError(f"Unknown key algorithm: {key['algorithm']!r}")
+    
+    shape = tuple(key['shape'])
+    dtype_str = np.dtype(key['dtype']).str.encode('ascii')
+    options = json.dumps(key.get('options') or {}, sort_keys=True).encode('utf-8')
+    
+    parts = [
+        _HEADER.pack(
+            KEY_MAGIC,
+            KEY_VERSION,
+            algorithm,
+            key['channels'],
+            len(shape),
+            key['permutation_seed'],
+            keystream_seed.to_bytes(_KEYSTREAM_SEED_BYTES, 'big')
+        ),
+        struct.pack('<B', len(dtype_str)),
+        dtype_str,
+        struct.pack(f'<{len(shape)}Q', *shape),
+        struct.pack('<I', len(options)),
+        options,
+        struct.pack('<Q', len(payload)),
+        payload,
+    ]
+    return b''.join(parts)
+
+
+def decode_key(data):
+    """
+    Parse a key file in the compact binary format.
+    
+    Args:
+        data: bytes object containing the key file
+        
+    Returns:
+        dict: Key dictionary (see create_key)
+    """
+    view = memoryview(data)
+    if len(view) < _HEADER.size or bytes(view[:4]) != KEY_MAGIC:
+        raise ValueError("Not a compact key file")
+    
+    try:
+        (_, version, algorithm, channels, ndim,
+         permutation_seed, keystream_seed) = _HEADER.unpack_from(view, 0)
+        if version > KEY_VERSION:
+            raise ValueError(f"Unsupported key file version: {version}")
+        if algorithm not in ALGORITHM_NAMES:
+            raise ValueError(f"Unknown key algorithm id: {algorithm}")
+        offset = _HEADER.size
+        
+        (dtype_len,) = struct.unpack_from('<B', view, offset)
+        offset += 1
+        dtype = np.dtype(bytes(view[offset:offset + dtype_len]).decode('ascii'))
+        offset += dtype_len
+        
+        shape = struct.unpack_from(f'<{ndim}Q', view, offset)
+        offset += 8 * ndim
+        
+        (options_len,) = struct.unpack_from('<I', view, offset)
+        offset += 4
+        options = json.loads(bytes(view[offset:offset + options_len]).decode('utf-8'))
+        offset += options_len
+        
+        (payload_len,) = struct.unpack_from('<Q', view, offset)
+        offset += 8
+        if offset + payload_len > len(view):
+            raise ValueError("Key file is truncated")
+        payload = view[offset:offset + payload_len]
+    except struct.error as error:
+        raise ValueError("Key file is truncated") from error
+    
+    if algorithm == ALGORITHM_RAW_KEYSTREAM:
+        key = create_key(
+            shape, permutation_seed,
+            keystream=np.frombuffer(payload, dtype=np.uint8).copy(),
+            dtype=dtype, options=options
+        )
+    else:
+        key = create_key(
+            shape, permutation_seed,
+            keystream_seed=int.from_bytes(keystream_seed, 'big'),
+            dtype=dtype, options=options
+        )
+    key['channels'] = channels
+    return key
+
+
+def key_id(key):
+    """
+    Compute a short identifier of a key.
+    
+    The identifier is a truncated SHA-256 of the compact encoding, so it
+    can be stored next to a ciphertext to detect a mismatched key without
+    revealing the key.
+    
+    Args:
+        key: Key dictionary (see create_key)
+        
+    Returns:
+        bytes: KEY_ID_BYTES-byte identifier
+    """
+    return hashlib.sha256(encode_key(key)).digest()[:KEY_ID_BYTES]
+
+
+def _decode_legacy_npz(data):
+    """Read a legacy .npz key file holding the full XOR keystream."""
+    with np.load(io.BytesIO(data)) as key_data:
+        return create_key(
+            tuple(key_data['shape']),
+            int(key_data['permutation_key']),
+            keystream=key_data['xor_key']
+        )
+
+
+def save_key(key, file):
+    """
+    Write a key in the compact format.
+    
+    Args:
+        key: Key dictionary (see create_key)
+        file: File path or writable binary file object
+    """
+    data = encode_key(key)
+    if hasattr(file, 'write'):
+        file.write(data)
+    else:
+        with open(file, 'wb') as f:
+            f.write(data)
+
+
+def load_key(file):
+    """
+    Read a key file, detecting compact and legacy .npz formats.
+    
+    Args:
+        file: File path, bytes object or readable binary file object
+        
+    Returns:
+        dict: Key dictionary (see create_key)
+    """
+    if isinstance(file, (bytes, bytearray, memoryview)):
+        data = bytes(file)
+    elif hasattr(file, 'read'):
+        data = file.read()
+    else:
+        with open(file, 'rb') as f:
+            data = f.read()
+    
+    if data[:4] == KEY_MAGIC:
+        return decode_key(data)
+    if data[:2] == b'PK':
+        return _decode_legacy_npz(data)
+    raise ValueError("Unrecognized key file format")
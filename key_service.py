@@ -0,0 +1,522 @@
+"""
+Key Service Module
+
+This module serves quantum key material to many concurrent clients from a
+single simulator. KeyService is an asyncio front end to a key source
+(QuantumKeyGenerator or EntropyPool): keystream requests that arrive while
+a harvest is running are queued and then served together by one large
+harvest, whose bytes are split among the waiters. The queue is bounded, so
+overload is reported instead of growing without limit.
+
+A small HTTP server exposes the service over TCP or a Unix socket, and
+KeyServiceClient fetches keys from it. Qiskit is only loaded by the
+process that runs the simulator, so encrypt workers using the client
+start quickly:
+
+    python key_service.py --port 8765
+    python key_service.py --unix /tmp/qshield-keys.sock
+"""
+
+import argparse
+import asyncio
+import collections
+import http.client
+import json
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+from entropy_sources import AerEntropySource, create_entropy_source
+from quantum_key_generator import KEYSTREAM_SEED_BITS, QuantumKeyGenerator
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+
+class KeyServiceBusy(RuntimeError):
+    """Raised when the key service queue is full."""
+
+
+def _bytes_to_seed(data, num_bits):
+    """Integer from the first ``num_bits`` bits of ``data``, MSB first (like bits_to_int)."""
+    return int.from_bytes(bytes(data), 'big') >> (-num_bits % 8)
+
+
+class KeyService:
+    """
+    Coalesces concurrent keystream requests into shared harvests.
+    
+    A single harvest runs at a time on a dedicated thread. Requests that
+    arrive meanwhile wait in a FIFO queue; when the harvest finishes, as
+    many queued requests as fit in ``max_batch_bytes`` are served by the
+    next one. A request larger than ``max_batch_bytes`` is harvested on
+    its own.
+    """
+    
+    def __init__(self, generator=None, max_batch_bytes=1 << 20, max_pending=1024,
+                 max_request_bytes=1 << 26, batch_window=0.0):
+        """
+        Initialize the key service.
+        
+        Args:
+            generator: Key source with generate_keystream(length)
+                (a new unseeded QuantumKeyGenerator by default)
+            max_batch_bytes: Largest harvest that combines several requests
+            max_pending: Maximum number of queued requests; further
+                requests raise KeyServiceBusy
+            max_request_bytes: Largest single request; larger requests
+                raise ValueError
+            batch_window: Seconds to wait before each harvest so that more
+                requests can join it
+        """
+        if generator is None:
+            generator = QuantumKeyGenerator()
+        if max_batch_bytes <= 0 or max_pending <= 0 or max_request_bytes <= 0:
+            raise ValueError("max_batch_bytes, max_pending and max_request_bytes must be positive")
+        
+        self.generator = generator
+        self.max_batch_bytes = max_batch_bytes
+        self.max_pending = max_pending
+        self.max_request_bytes = max_request_bytes
+        self.batch_window = batch_window
+        
+        self._queue = collections.deque()
+        self._wakeup = None
+        self._task = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='KeyService')
+        self._closed = False
+        
+        self.requests_served = 0
+        self.requests_rejected = 0
+        self.harvests = 0
+        self.bytes_harvested = 0
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+    
+    async def close(self):
+        """Stop the harvest loop and fail queued requests."""
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        while self._queue:
+            _, future = self._queue.popleft()
+            if not future.done():
+                future.set_exception(RuntimeError("KeyService is closed"))
+        self._executor.shutdown(wait=False)
+    
+    @property
+    def pending(self):
+        """Number of queued requests."""
+        return len(self._queue)
+    
+    async def generate_keystream(self, length):
+        """
+        Get a keystream of specified length.
+        
+        Args:
+            length: Length of keystream in bytes
+            
+        Returns:
+            numpy array of random bytes (0-255)
+        """
+        length = int(length)
+        if length < 0 or length > self.max_request_bytes:
+            raise ValueError(f"length must be in [0, {self.max_request_bytes}]")
+        if self._closed:
+            raise RuntimeError("KeyService is closed")
+        if len(self._queue) >= self.max_pending:
+            self.requests_rejected += 1
+            raise KeyServiceBusy(f"{len(self._queue)} requests already queued")
+        
+        loop = asyncio.get_running_loop()
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._harvest_loop())
+        
+        future = loop.create_future()
+        self._queue.append((length, future))
+        self._wakeup.set()
+        return await future
+    
+    async def generate_permutation_seed(self):
+        """
+        Get a 32-bit permutation seed (same encoding as EntropyPool).
+        
+        Returns:
+            Integer seed derived from quantum randomness
+        """
+        return _bytes_to_seed(await self.generate_keystream(4), 32)
+    
+    async def generate_keystream_seed(self, num_bits=KEYSTREAM_SEED_BITS):
+        """
+        Get a quantum seed for keystream expansion.
+        
+        Args:
+            num_bits: Number of quantum random bits in the seed
+            
+        Returns:
+            Integer seed to pass to expand_keystream()
+        """
+        return _bytes_to_seed(await self.generate_keystream((num_bits + 7) // 8), num_bits)
+    
+    def _take_batch(self):
+        """Pop the queued requests served by the next harvest."""
+        batch = []
+        total = 0
+        while self._queue:
+            length, future = self._queue[0]
+            if future.cancelled():
+                self._queue.popleft()
+                continue
+            if batch and total + length > self.max_batch_bytes:
+                break
+            self._queue.popleft()
+            batch.append((length, future))
+            total += length
+        return batch, total
+    
+    async def _harvest_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            if self.batch_window:
+                await asyncio.sleep(self.batch_window)
+            batch, total = self._take_batch()
+            if not self._queue:
+                self._wakeup.clear()
+            if not batch:
+                continue
+            
+            try:
+                keystream = await loop.run_in_executor(
+                    self._executor, self.generator.generate_keystream, total
+                )
+            except Exception as error:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            
+            self.harvests += 1
+            self.bytes_harvested += total
+            offset = 0
+            for length, future in batch:
+                if not future.done():
+                    future.set_result(keystream[offset:offset + length])
+                    self.requests_served += 1
+                offset += length
+    
+    def stats(self):
+        """
+        Report service counters.
+        
+        Returns:
+            dict: Queued, served and rejected requests, harvests and bytes
+        """
+        return {
+            'pending': len(self._queue),
+            'max_pending': self.max_pending,
+            'requests_served': self.requests_served,
+            'requests_rejected': self.requests_rejected,
+            'harvests': self.harvests,
+            'bytes_harvested': self.bytes_harvested,
+        }
+
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+async def _handle_connection(service, reader, writer):
+    """Serve HTTP/1.1 requests on one connection until it is closed."""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            
+            try:
+                method, target, _ = request_line.decode('latin-1').split()
+            except ValueError:
+                method, target = '', ''
+            status, content_type, body = await _route(service, method, target)
+            
+            head = [
+                f"HTTP/1.1 {status} {_REASONS[status]}",
+                f"Content-Type: {content_type}",
+                f"Content-Length: {len(body)}",
+            ]
+            if status == 503:
+                head.append("Retry-After: 1")
+            writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+            writer.write(body)
+            await writer.drain()
+            if headers.get('connection', '').lower() == 'close':
+                return
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _route(service, method, target):
+    """Return (status, content type, body) for one request."""
+    if method != 'GET':
+        return 405, 'text/plain', b'Only GET is supported\n'
+    url = urlsplit(target)
+    query = parse_qs(url.query)
+    try:
+        if url.path == '/keystream':
+            keystream = await service.generate_keystream(int(query['length'][0]))
+            return 200, 'application/octet-stream', memoryview(np.ascontiguousarray(keystream))
+        if url.path == '/seeds':
+            num_bits = int(query.get('bits', [KEYSTREAM_SEED_BITS])[0])
+            seeds = {
+                'keystream_seed': await service.generate_keystream_seed(num_bits),
+                'permutation_seed': await service.generate_permutation_seed(),
+            }
+            return 200, 'application/json', json.dumps(seeds).encode('utf-8')
+        if url.path == '/stats':
+            return 200, 'application/json', json.dumps(service.stats()).encode('utf-8')
+    except KeyServiceBusy as error:
+        return 503, 'text/plain', f"{error}\n".encode('utf-8')
+    except (KeyError, ValueError) as error:
+        return 400, 'text/plain', f"Invalid request: {error}\n".encode('utf-8')
+    except Exception as error:
+        # A failed harvest must still get an answer, not a dropped connection
+        return 500, 'text/plain', f"Key generation failed: {error}\n".encode('utf-8')
+    return 404, 'text/plain', b'Not found\n'
+
+
+async def start_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+    """
+    Serve a KeyService over HTTP.
+    
+    Endpoints: ``GET /keystream?length=N`` (raw bytes), ``GET /seeds``
+    (JSON keystream and permutation seeds) and ``GET /stats`` (JSON).
+    A full queue is answered with 503 and ``Retry-After``.
+    
+    Args:
+        service: KeyService instance
+        host: TCP host to bind (ignored when ``path`` is given)
+        port: TCP port to bind (0 picks a free port)
+        path: Unix socket path to bind instead of TCP
+        
+    Returns:
+        asyncio.Server (already serving)
+    """
+    def handler(reader, writer):
+        return _handle_connection(service, reader, writer)
+    
+    if path is not None:
+        return await asyncio.start_unix_server(handler, path=path)
+    return await asyncio.start_server(handler, host=host, port=port)
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix domain socket."""
+    
+    def __init__(self, path, timeout):
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+    
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class KeyServiceClient:
+    """
+    Blocking client for a key service started with start_server().
+    
+    The client can be passed anywhere a QuantumKeyGenerator is used for
+    keystreams and seeds, e.g. ``generate_quantum_seeds(generator=client)``.
+    A connection is kept open and reused; a client instance must not be
+    shared between threads.
+    """
+    
+    def __init__(self, url=f'http://{DEFAULT_HOST}:{DEFAULT_PORT}', timeout=60, retries=5):
+        """
+        Initialize the client.
+        
+        Args:
+            url: ``http://host:port`` or ``unix:///path/to/socket``
+            timeout: Socket timeout in seconds
+            retries: Number of retries when the service is busy
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'unix'):
+            raise ValueError(f"Unsupported key service URL: {url!r}")
+        self.url = url
+        self.timeout = timeout
+        self.retries = retries
+        self._parts = parts
+        self._connection = None
+    
+    def _connect(self):
+        if self._parts.scheme == 'unix':
+            return _UnixHTTPConnection(self._parts.path, self.timeout)
+        return http.client.HTTPConnection(
+            self._parts.hostname, self._parts.port or DEFAULT_PORT, timeout=self.timeout
+        )
+    
+    def close(self):
+        """Close the connection to the service."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _get(self, target):
+        """
+        GET ``target`` and return the response body, retrying while busy.
+        
+        Any other error status, including 500 for a failed harvest, raises
+        RuntimeError immediately.
+        """
+        for attempt in range(self.retries + 1):
+            if self._connection is None:
+                self._connection = self._connect()
+            try:
+                self._connection.request('GET', target)
+                response = self._connection.getresponse()
+                body = response.read()
+            except (ConnectionError, http.client.HTTPException):
+                # The server may have dropped an idle keep-alive connection
+                self.close()
+                if attempt == self.retries:
+                    raise
+                continue
+            
+            if response.status == 503:
+                if attempt < self.retries:
+                    time.sleep(float(response.getheader('Retry-After', 1)))
+                    continue
+                raise KeyServiceBusy(body.decode('utf-8', 'replace').strip())
+            if response.status != 200:
+                raise RuntimeError(
+                    f"Key service error {response.status}: {body.decode('utf-8', 'replace').strip()}"
+                )
+            return body
+    
+    def generate_keystream(self, length):
+        """
+        Fetch a keystream of specified length.
+        
+        Args:
+            length: Length of keystream in bytes
+            
+        Returns:
+            numpy array of random bytes (0-255)
+        """
+        body = self._get(f'/keystream?length={int(length)}')
+        if len(body) != length:
+            raise RuntimeError(f"Key service returned {len(body)} bytes, expected {length}")
+        return np.frombuffer(body, dtype=np.uint8)
+    
+    def generate_random_bits(self, num_bits):
+        """
+        Fetch random bits.
+        
+        Args:
+            num_bits: Number of random bits to return
+            
+        Returns:
+            numpy array of random bits (0s and 1s)
+        """
+        return np.unpackbits(self.generate_keystream((num_bits + 7) // 8))[:num_bits]
+    
+    def generate_permutation_seed(self):
+        """
+        Fetch a 32-bit permutation seed.
+        
+        Returns:
+            Integer seed derived from quantum randomness
+        """
+        return _bytes_to_seed(self.generate_keystream(4), 32)
+    
+    def generate_keystream_seed(self, num_bits=KEYSTREAM_SEED_BITS):
+        """
+        Fetch a quantum seed for keystream expansion.
+        
+        Args:
+            num_bits: Number of quantum random bits in the seed
+            
+        Returns:
+            Integer seed to pass to expand_keystream()
+        """
+        return _bytes_to_seed(self.generate_keystream((num_bits + 7) // 8), num_bits)
+    
+    def stats(self):
+        """
+        Fetch the service counters.
+        
+        Returns:
+            dict: See KeyService.stats
+        """
+        return json.loads(self._get('/stats'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quantum key service")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', default=None, help="Serve on a Unix socket instead of TCP")
+    parser.add_argument('--max-batch-bytes', type=int, default=1 << 20)
+    parser.add_argument('--max-pending', type=int, default=1024)
+    parser.add_argument('--entropy', default='aer',
+                        help="Entropy source: aer, aer:<method>[:<num_qubits>], replay:<path> or os")
+    parser.add_argument('--seed', type=int, default=None, help="Simulator seed (testing only)")
+    args = parser.parse_args(argv)
+    
+    async def serve():
+        source = create_entropy_source(args.entropy, seed=args.seed)
+        if isinstance(source, AerEntropySource):
+            # Transpile before accepting connections so the first request is fast
+            source.circuit_cache.warm_up(
+                widths=[source.num_qubits], backend_options=source.backend_options
+            )
+        service = KeyService(
+            QuantumKeyGenerator(source=source),
+            max_batch_bytes=args.max_batch_bytes,
+            max_pending=args.max_pending
+        )
+        async with service:
+            server = await start_server(service, host=args.host, port=args.port, path=args.unix)
+            where = args.unix or f"http://{args.host}:{args.port}"
+            print(f"Serving quantum keys on {where}")
+            async with server:
+                await server.serve_forever()
+    
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,480 @@
+"""
+Quantum-Seed ImageShield command line interface.
+
+Encrypts or decrypts every image in a directory tree using a pool of
+worker processes:
+
+    python qshield.py encrypt <input_dir> <output_dir> [--workers N]
+    python qshield.py decrypt <input_dir> <output_dir> [--workers N]
+
+Encryption writes the ciphertext ``<name>.enc.qsc`` (a raw container, see
+ciphertext_container; ``--format png`` writes ``<name>.enc.png``) and its
+key ``<name>.qkey`` next to each other in the output tree; decryption
+reads those pairs back. Every
+completed file is appended to ``manifest.jsonl`` in the output directory,
+so an interrupted run can simply be restarted and will skip work that is
+already done.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image
+from ciphertext_container import allocate_container
+from image_encryptor import (
+    ENCRYPTION_MODES,
+    check_image_format,
+    create_encryptor,
+    load_ciphertext,
+    load_image,
+    save_image_array
+)
+from key_format import create_key, load_key, save_key
+from key_service import KeyServiceClient
+from quantum_key_generator import QuantumKeyGenerator, generate_quantum_seeds
+from tiled_encryptor import DEFAULT_BLOCK_SIZE
+
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff', '.webp')
+# Ciphertext file suffix for each output format
+CIPHERTEXT_SUFFIXES = {'raw': '.enc.qsc', 'png': '.enc.png'}
+OUTPUT_FORMATS = tuple(CIPHERTEXT_SUFFIXES)
+KEY_SUFFIX = '.qkey'
+MANIFEST_NAME = 'manifest.jsonl'
+
+# Key sources of the current worker process by key service URL (None for
+# the local simulator), created on first use
+_generators = {}
+
+
+def _get_generator(key_service=None):
+    """Return the key source of this process, creating it on first use."""
+    generator = _generators.get(key_service)
+    if generator is None:
+        generator = KeyServiceClient(key_service) if key_service else QuantumKeyGenerator()
+        _generators[key_service] = generator
+    return generator
+
+
+def find_images(input_dir, exclude_dir=None):
+    """
+    Find image files below a directory.
+    
+    Args:
+        input_dir: Directory to search
+        exclude_dir: Optional directory to skip (e.g. an output directory
+            nested inside the input directory)
+            
+    Returns:
+        list: Sorted paths of images relative to ``input_dir``
+    """
+    return _find_files(input_dir, exclude_dir, lambda name: name.lower().endswith(IMAGE_EXTENSIONS)
+                       and not name.endswith(tuple(CIPHERTEXT_SUFFIXES.values())))
+
+
+def find_encrypted(input_dir, exclude_dir=None):
+    """
+    Find ciphertext/key pairs written by encrypt_directory.
+    
+    Args:
+        input_dir: Directory to search
+        exclude_dir: Optional directory to skip
+        
+    Returns:
+        list: Sorted relative paths of the original images, i.e. the key
+        paths without the ``.qkey`` suffix
+    """
+    keys = _find_files(input_dir, exclude_dir, lambda name: name.endswith(KEY_SUFFIX))
+    return [
+        rel[:-len(KEY_SUFFIX)] for rel in keys
+        if ciphertext_path(input_dir, rel[:-len(KEY_SUFFIX)]) is not None
+    ]
+
+
+def ciphertext_path(input_dir, rel):
+    """Path of the ciphertext written for ``rel`` in any format, or None."""
+    for suffix in CIPHERTEXT_SUFFIXES.values():
+        path = os.path.join(input_dir, rel + suffix)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _find_files(input_dir, exclude_dir, predicate):
+    """Walk ``input_dir`` and return relative paths of matching files."""
+    exclude_dir = os.path.realpath(exclude_dir) if exclude_dir else None
+    found = []
+    for root, dirs, files in os.walk(input_dir):
+        dirs[:] = sorted(
+            d for d in dirs
+            if os.path.realpath(os.path.join(root, d)) != exclude_dir
+        )
+        for name in files:
+            if predicate(name):
+                found.append(os.path.relpath(os.path.join(root, name), input_dir))
+    return sorted(found)
+
+
+def read_manifest(output_dir):
+    """
+    Read the set of files already completed in an output directory.
+    
+    A truncated last line (from a run that was killed mid-write) is
+    ignored, so that file is processed again.
+    
+    Args:
+        output_dir: Output directory of a previous run
+        
+    Returns:
+        set: Relative source paths recorded in the manifest
+    """
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)['source'])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+def _ensure_parent(path):
+    """Create the parent directory of a file if needed."""
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+
+
+def encrypt_file(src_path, cipher_path, key_path, mode='whole', block_size=DEFAULT_BLOCK_SIZE,
+                 output_format='raw', key_service=None):
+    """
+    Encrypt one image file with fresh quantum seeds.
+    
+    Args:
+        src_path: Path of the image to encrypt
+        cipher_path: Path of the ciphertext to write
+        key_path: Path of the key file to write
+        mode: Encryption mode, 'whole' or 'tiled'
+        block_size: Bytes per block in tiled mode
+        output_format: 'raw' for a ciphertext container, 'png' for a PNG
+        key_service: Optional key service URL (see key_service) to fetch
+            seeds from instead of running a local simulator
+            
+    Returns:
+        dict: Bytes read, bytes written and number of pixels
+    """
+    image = load_image(src_path)
+    # Fail before drawing seeds or writing the key; raw ciphertexts only
+    # need to decrypt to an image file, which may be TIFF
+    check_image_format(image.shape, image.dtype, 'PNG' if output_format == 'png' else 'TIFF')
+    keystream_seed, permutation_seed = generate_quantum_seeds(generator=_get_generator(key_service))
+    options = {'permutation_rng': 'pcg64', 'mode': mode}
+    if mode == 'tiled':
+        options['block_size'] = block_size
+    key = create_key(
+        image.shape, permutation_seed, keystream_seed=keystream_seed,
+        dtype=image.dtype, options=options
+    )
+    
+    encryptor = create_encryptor(key)
+    
+    _ensure_parent(cipher_path)
+    # The key is written first: a ciphertext without its key is useless
+    save_key(key, key_path)
+    if output_format == 'raw':
+        # Encrypt straight into the container buffer and write it at once
+        container, data = allocate_container(image.shape, image.dtype, key)
+        encryptor.encrypt_into(image, data)
+        with open(cipher_path, 'wb') as f:
+            f.write(container)
+    elif output_format == 'png':
+        save_image_array(encryptor.encrypt_image(image), cipher_path, role='ciphertext')
+    else:
+        raise ValueError(f"Unknown output format: {output_format!r}")
+    return {
+        'bytes_in': os.path.getsize(src_path),
+        'bytes_out': os.path.getsize(cipher_path) + os.path.getsize(key_path),
+        'pixels': int(image.size),
+    }
+
+
+def decrypt_file(cipher_path, key_path, out_path):
+    """
+    Decrypt one ciphertext/key pair written by encrypt_file.
+    
+    Args:
+        cipher_path: Path of the ciphertext container or encrypted PNG
+        key_path: Path of its key file
+        out_path: Path of the decrypted image to write; int32, uint32 and
+            float32 images need a TIFF path (see decrypted_name)
+            
+    Returns:
+        dict: Bytes read, bytes written and number of pixels
+    """
+    key = load_key(key_path)
+    extension = os.path.splitext(out_path)[1].lower()
+    check_image_format(key['shape'], key['dtype'], Image.registered_extensions().get(extension))
+    # Checked against the key from the header before any pixel is decoded;
+    # containers are memory-mapped
+    encrypted = load_ciphertext(cipher_path, key)
+    decrypted = create_encryptor(key).decrypt_image(encrypted)
+    del encrypted
+    
+    _ensure_parent(out_path)
+    save_image_array(decrypted, out_path)
+    return {
+        'bytes_in': os.path.getsize(cipher_path),
+        'bytes_out': os.path.getsize(out_path),
+        'pixels': int(decrypted.size),
+    }
+
+
+def decrypted_name(rel, key=None):
+    """
+    Output path for a decrypted image.
+    
+    Decrypted images are PNG, except that images PNG cannot hold exactly
+    (int32, uint32 and float32, according to ``key``) are TIFF.
+    """
+    if key is not None:
+        try:
+            check_image_format(key['shape'], key['dtype'], 'PNG')
+        except ValueError:
+            return rel if rel.lower().endswith(('.tif', '.tiff')) else rel + '.tiff'
+    return rel if rel.lower().endswith('.png') else rel + '.png'
+
+
+def _encrypt_task(input_dir, output_dir, mode, block_size, output_format, key_service, rel):
+    """Worker entry point for one file of encrypt_directory."""
+    result = encrypt_file(
+        os.path.join(input_dir, rel),
+        os.path.join(output_dir, rel + CIPHERTEXT_SUFFIXES[output_format]),
+        os.path.join(output_dir, rel + KEY_SUFFIX),
+        mode=mode,
+        block_size=block_size,
+        output_format=output_format,
+        key_service=key_service
+    )
+    result['source'] = rel
+    return result
+
+
+def _decrypt_task(input_dir, output_dir, rel):
+    """Worker entry point for one file of decrypt_directory."""
+    key_path = os.path.join(input_dir, rel + KEY_SUFFIX)
+    result = decrypt_file(
+        ciphertext_path(input_dir, rel),
+        key_path,
+        os.path.join(output_dir, decrypted_name(rel, load_key(key_path)))
+    )
+    result['source'] = rel
+    return result
+
+
+def _run_tasks(task, items, output_dir, workers, extra_args=(), progress=None):
+    """
+    Run ``task`` for every pending item and record completions.
+    
+    Items already listed in the manifest are skipped. At most
+    ``4 * workers`` tasks are in flight at once so that huge directories
+    do not queue millions of futures. Failures are collected rather than
+    aborting the run and are not recorded, so a restart retries them. If
+    a worker process dies, the items it took down with the pool are
+    reported as failed and the remaining items run in a new pool.
+    
+    Returns:
+        dict: Run statistics
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    done = read_manifest(output_dir)
+    pending = [rel for rel in items if rel not in done]
+    stats = {
+        'total': len(items),
+        'skipped': len(items) - len(pending),
+        'processed': 0,
+        'failed': [],
+        'bytes_in': 0,
+        'bytes_out': 0,
+        'seconds': 0.0,
+    }
+    
+    start = time.perf_counter()
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'a+', encoding='utf-8') as manifest:
+        # Terminate a line left truncated by a killed run
+        if manifest.tell() > 0:
+            manifest.seek(manifest.tell() - 1)
+            if manifest.read(1) != '\n':
+                manifest.write('\n')
+        
+        def record(rel, get_result):
+            try:
+                result = get_result()
+            except Exception as exc:
+                stats['failed'].append((rel, str(exc)))
+                return
+            manifest.write(json.dumps(result) + '\n')
+            manifest.flush()
+            stats['processed'] += 1
+            stats['bytes_in'] += result['bytes_in']
+            stats['bytes_out'] += result['bytes_out']
+            if progress is not None:
+                progress(stats, time.perf_counter() - start)
+        
+        if workers == 1:
+            for rel in pending:
+                record(rel, lambda: task(*extra_args, rel))
+        else:
+            # Worker processes are spawned rather than forked: forking a
+            # process whose simulator threads are running can deadlock
+            context = multiprocessing.get_context('spawn')
+            remaining = iter(pending)
+            broken = True
+            while broken:
+                # A worker killed mid-task (e.g. by the OOM killer) breaks the
+                # whole pool: its in-flight items fail and a fresh pool
+                # carries on with the rest
+                broken = False
+                with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                    in_flight = {}
+                    for rel in remaining:
+                        try:
+                            in_flight[executor.submit(task, *extra_args, rel)] = rel
+                        except BrokenProcessPool as exc:
+                            stats['failed'].append((rel, str(exc)))
+                            broken = True
+                            break
+                        if len(in_flight) >= 4 * workers:
+                            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                            for future in finished:
+                                broken |= isinstance(future.exception(), BrokenProcessPool)
+                                record(in_flight.pop(future), future.result)
+                            if broken:
+                                break
+                    for future in list(in_flight):
+                        broken |= isinstance(future.exception(), BrokenProcessPool)
+                        record(in_flight.pop(future), future.result)
+    
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+def encrypt_directory(input_dir, output_dir, workers=None, mode='whole',
+                      block_size=DEFAULT_BLOCK_SIZE, output_format='raw', key_service=None,
+                      progress=None):
+    """
+    Encrypt every image below ``input_dir`` into ``output_dir``.
+    
+    Args:
+        input_dir: Directory tree of plaintext images
+        output_dir: Directory for ciphertexts, keys and the manifest
+        workers: Number of worker processes (default: CPU count); 1 runs
+            everything in the current process
+        mode: Encryption mode, 'whole' or 'tiled'
+        block_size: Bytes per block in tiled mode
+        output_format: 'raw' (ciphertext containers) or 'png'
+        key_service: Optional key service URL shared by all workers, so
+            that keys come from one simulator instead of one per worker
+        progress: Optional callback ``progress(stats, elapsed_seconds)``
+            called after each completed file
+            
+    Returns:
+        dict: Run statistics (total, skipped, processed, failed,
+        bytes_in, bytes_out, seconds)
+    """
+    if mode not in ENCRYPTION_MODES:
+        raise ValueError(f"Unknown encryption mode: {mode!r}")
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format!r}")
+    items = find_images(input_dir, exclude_dir=output_dir)
+    return _run_tasks(
+        _encrypt_task, items, output_dir, workers or os.cpu_count() or 1,
+        extra_args=(input_dir, output_dir, mode, block_size, output_format, key_service),
+        progress=progress
+    )
+
+
+def decrypt_directory(input_dir, output_dir, workers=None, progress=None):
+    """
+    Decrypt every ciphertext/key pair below ``input_dir`` into ``output_dir``.
+    
+    Args:
+        input_dir: Output directory of encrypt_directory
+        output_dir: Directory for decrypted images and the manifest
+        workers: Number of worker processes (default: CPU count)
+        progress: Optional callback ``progress(stats, elapsed_seconds)``
+        
+    Returns:
+        dict: Run statistics (see encrypt_directory)
+    """
+    items = find_encrypted(input_dir, exclude_dir=output_dir)
+    return _run_tasks(
+        _decrypt_task, items, output_dir, workers or os.cpu_count() or 1,
+        extra_args=(input_dir, output_dir), progress=progress
+    )
+
+
+def format_throughput(stats):
+    """Format images/s and MB/s of a run."""
+    seconds = max(stats['seconds'], 1e-9)
+    return (
+        f"{stats['processed'] / seconds:.1f} images/s, "
+        f"{stats['bytes_in'] / seconds / 1e6:.1f} MB/s"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quantum-Seed ImageShield directory encryption")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    encrypt_parser = subparsers.add_parser('encrypt', help="Encrypt all images in a directory")
+    encrypt_parser.add_argument('input_dir')
+    encrypt_parser.add_argument('output_dir')
+    encrypt_parser.add_argument('--workers', type=int, default=None)
+    encrypt_parser.add_argument('--mode', choices=ENCRYPTION_MODES, default='whole')
+    encrypt_parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE)
+    encrypt_parser.add_argument('--format', choices=OUTPUT_FORMATS, default='raw',
+                                help="Ciphertext format: raw container (default) or PNG")
+    encrypt_parser.add_argument('--key-service', default=None, metavar='URL',
+                                help="Fetch keys from a key service (http://host:port or unix:///path)")
+    
+    decrypt_parser = subparsers.add_parser('decrypt', help="Decrypt a directory written by 'encrypt'")
+    decrypt_parser.add_argument('input_dir')
+    decrypt_parser.add_argument('output_dir')
+    decrypt_parser.add_argument('--workers', type=int, default=None)
+    
+    for sub in (encrypt_parser, decrypt_parser):
+        sub.add_argument('--quiet', action='store_true', help="Only print the summary")
+    args = parser.parse_args(argv)
+    
+    def progress(stats, elapsed):
+        if stats['processed'] % 100 == 0:
+            print(f"  {stats['processed']} files, {format_throughput(dict(stats, seconds=elapsed))}")
+    
+    callback = None if args.quiet else progress
+    if args.command == 'encrypt':
+        stats = encrypt_directory(
+            args.input_dir, args.output_dir, workers=args.workers,
+            mode=args.mode, block_size=args.block_size,
+            output_format=args.format, key_service=args.key_service, progress=callback
+        )
+    else:
+        stats = decrypt_directory(args.input_dir, args.output_dir, workers=args.workers, progress=callback)
+    
+    print(f"{args.command}: {stats['processed']} processed, {stats['skipped']} skipped "
+          f"(already done), {len(stats['failed'])} failed in {stats['seconds']:.2f}s")
+    print(f"Throughput: {format_throughput(stats)}")
+    for rel, error in stats['failed']:
+        print(f"  FAILED {rel}: {error}", file=sys.stderr)
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
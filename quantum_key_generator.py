@@ -6,9 +6,171 @@ It leverages Qiskit to simulate quantum randomness through Hadamard gates
 and measurements, producing truly random bit sequences for encryption.
 """
 
+import threading
 import numpy as np
-from qiskit import QuantumCircuit, transpile
-from qiskit_aer import AerSimulator
+
+
+# Size of the quantum seed used for keystream expansion, and the number of
+# keystream bytes produced by each Philox counter block (4 x 64-bit words)
+KEYSTREAM_SEED_BITS = 256
+EXPANSION_BLOCK_BYTES = 32
+
+
+def bits_to_bytes(bits):
+    """
+    Pack an array of bits into bytes, most significant bit first.
+    
+    Matches the byte values produced by ``int(''.join(bits), 2)`` for each
+    group of 8 bits, so keys packed this way are compatible with keys
+    packed one byte at a time.
+    
+    Args:
+        bits: 1D array of 0/1 values
+        
+    Returns:
+        numpy array of bytes (uint8); a trailing partial byte is
+        zero-padded on the right
+    """
+    return np.packbits(np.asarray(bits, dtype=np.uint8))
+
+
+def bits_to_int(bits):
+    """
+    Interpret an array of bits as an unsigned integer, most significant bit first.
+    
+    Args:
+        bits: 1D array of 0/1 values
+        
+    Returns:
+        int: Integer value of the bit string
+    """
+    bits = np.asarray(bits, dtype=np.uint8)
+    padding = (-len(bits)) % 8
+    return int.from_bytes(bits_to_bytes(bits).tobytes(), 'big') >> padding
+
+
+class CircuitCache:
+    """
+    Process-wide simulators and transpiled harvest circuits.
+    
+    Simulators are shared per set of backend options, and the
+    Hadamard+measure circuit of each width is transpiled once per
+    (num_qubits, backend options) and then reused by every generator, so
+    repeated key requests never transpile.
+    """
+    
+    def __init__(self):
+        """Initialize an empty cache."""
+        self.hits = 0
+        self.misses = 0
+        self._simulators = {}
+        self._circuits = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _options_key(backend_options):
+        return tuple(sorted((backend_options or {}).items()))
+    
+    def get_simulator(self, backend_options=None):
+        """
+        Get the shared AerSimulator for a set of backend options.
+        
+        Args:
+            backend_options: Optional dict of AerSimulator options
+            
+        Returns:
+            AerSimulator instance
+        """
+        key = self._options_key(backend_options)
+        with self._lock:
+            simulator = self._simulators.get(key)
+            if simulator is None:
+                # Qiskit and Aer take most of a second to import, so they are
+                # only loaded once a simulator is needed; decrypt-only code
+                # that just uses expand_keystream() never pays for them
+                from qiskit_aer import AerSimulator
+                
+                simulator = AerSimulator(**dict(key))
+                self._simulators[key] = simulator
+            return simulator
+    
+    def get_harvest_circuit(self, num_qubits, backend_options=None):
+        """
+        Get the transpiled Hadamard+measure circuit for a width.
+        
+        Args:
+            num_qubits: Circuit width
+            backend_options: Optional dict of AerSimulator options
+            
+        Returns:
+            Transpiled QuantumCircuit measuring every qubit
+        """
+        key = (num_qubits, self._options_key(backend_options))
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is not None:
+                self.hits += 1
+                return circuit
+            self.misses += 1
+        
+        from qiskit import QuantumCircuit, transpile
+        
+        qc = QuantumCircuit(num_qubits, num_qubits)
+        qc.h(range(num_qubits))
+        qc.measure(range(num_qubits), range(num_qubits))
+        # Transpile outside the lock; a concurrent miss for the same key
+        # produces an identical circuit, and the first one stored wins
+        circuit = transpile(qc, self.get_simulator(backend_options))
+        with self._lock:
+            return self._circuits.setdefault(key, circuit)
+    
+    def warm_up(self, widths=None, backend_options=None):
+        """
+        Create the simulator and transpile circuits ahead of the first request.
+        
+        Args:
+            widths: Circuit widths to prepare (default: the full width used
+                by QuantumKeyGenerator); an empty list only creates the
+                simulator
+            backend_options: Optional dict of AerSimulator options
+        """
+        if widths is None:
+            widths = [QuantumKeyGenerator.max_qubits_per_circuit]
+        simulator = self.get_simulator(backend_options)
+        if not widths:
+            return
+        for num_qubits in widths:
+            circuit = self.get_harvest_circuit(num_qubits, backend_options)
+        # One tiny job initializes the simulator's native library
+        simulator.run(circuit, shots=1).result()
+    
+    def clear(self):
+        """Remove all cached simulators and circuits."""
+        with self._lock:
+            self._simulators.clear()
+            self._circuits.clear()
+    
+    def stats(self):
+        """
+        Report cache counters.
+        
+        Returns:
+            dict: Hits, misses, hit rate and number of cached circuits and
+            simulators
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'circuits': len(self._circuits),
+                'simulators': len(self._simulators),
+            }
+
+
+# Process-wide cache shared by QuantumKeyGenerator instances by default
+default_circuit_cache = CircuitCache()
 
 
 class QuantumKeyGenerator:
@@ -16,18 +178,48 @@ class QuantumKeyGenerator:
     Generates cryptographic keys using quantum circuits.
     
     Uses Hadamard gates to create superposition states and measurements
-    to collapse them into random bit sequences.
+    to collapse them into random bit sequences. The bits are drawn from an
+    entropy source (see entropy_sources), which defaults to simulated
+    circuits on AerSimulator.
     """
     
-    def __init__(self, seed=None):
+    # Width of each Hadamard+measure circuit and the largest number of shots
+    # requested from the simulator in a single bulk job (bounds the size of
+    # the per-shot memory returned by Aer).
+    max_qubits_per_circuit = 20
+    max_shots_per_job = 2 ** 18
+    
+    def __init__(self, seed=None, bulk=True, circuit_cache=None, backend_options=None,
+                 source=None):
         """
         Initialize the quantum key generator.
         
         Args:
             seed: Optional seed for reproducibility in testing
+            bulk: If True (default), harvest bits with a single reusable
+                circuit and per-shot memory. If False, use the legacy
+                chunk-by-chunk harvesting based on measurement counts.
+            circuit_cache: CircuitCache providing the simulator and
+                transpiled circuits (default: the process-wide cache)
+            backend_options: Optional dict of AerSimulator options
+            source: Optional EntropySource to draw bits from instead of
+                the default AerEntropySource; ``seed``, ``circuit_cache``
+                and ``backend_options`` are ignored when it is given
         """
-        self.simulator = AerSimulator()
+        if source is None:
+            # Imported here: entropy_sources itself imports this module
+            from entropy_sources import AerEntropySource
+            source = AerEntropySource(seed=seed, circuit_cache=circuit_cache,
+                                      backend_options=backend_options)
+        elif not bulk:
+            raise ValueError("Legacy harvesting requires the default Aer entropy source")
+        self.source = source
         self.seed = seed
+        self.bulk = bulk
+        # Simulator and circuits of the Aer source, used by legacy harvesting
+        self.circuit_cache = getattr(source, 'circuit_cache', None)
+        self.backend_options = getattr(source, 'backend_options', {})
+        self.simulator = getattr(source, 'simulator', None)
     
     def generate_random_bits(self, num_bits):
         """
@@ -39,9 +231,28 @@ class QuantumKeyGenerator:
         Returns:
             numpy array of random bits (0s and 1s)
         """
+        if self.bulk:
+            return self.source.random_bits(num_bits)
+        return self._generate_random_bits_legacy(num_bits)
+    
+    def _get_harvest_circuit(self, num_qubits):
+        """
+        Return the transpiled Hadamard+measure circuit for a given width.
+        
+        The circuit is transpiled once per width and backend options in the
+        circuit cache and reused by every subsequent job.
+        """
+        return self.circuit_cache.get_harvest_circuit(num_qubits, self.backend_options)
+    
+    def _generate_random_bits_legacy(self, num_bits):
+        """
+        Generate random bits from the measurement counts of one job per chunk.
+        
+        Kept for reproducing keys generated before bulk harvesting existed.
+        """
         # Create quantum circuit with required number of qubits
         # Use multiple shots to generate more bits efficiently
-        max_qubits_per_circuit = 20
+        max_qubits_per_circuit = self.max_qubits_per_circuit
         shots_per_circuit = 100  # Generate multiple measurements per circuit
         bits = []
         
@@ -50,18 +261,9 @@ class QuantumKeyGenerator:
             qubits_needed = min(remaining_bits, max_qubits_per_circuit)
             shots_needed = min(shots_per_circuit, (remaining_bits + qubits_needed - 1) // qubits_needed)
             
-            # Create circuit
-            qc = QuantumCircuit(qubits_needed, qubits_needed)
-            
-            # Apply Hadamard gate to each qubit to create superposition
-            for i in range(qubits_needed):
-                qc.h(i)
-            
-            # Measure all qubits
-            qc.measure(range(qubits_needed), range(qubits_needed))
-            
-            # Transpile and run with multiple shots
-            transpiled_qc = transpile(qc, self.simulator)
+            # Hadamard on each qubit to create superposition, then measure
+            # all qubits; the transpiled circuit comes from the cache
+            transpiled_qc = self._get_harvest_circuit(qubits_needed)
             job = self.simulator.run(transpiled_qc, shots=shots_needed, seed_simulator=self.seed)
             result = job.result()
             counts = result.get_counts()
@@ -87,17 +289,15 @@ class QuantumKeyGenerator:
         Returns:
             numpy array of random bytes (0-255)
         """
+        if self.bulk:
+            return self.source.random_bytes(length)
+        
         # Generate 8 bits for each byte needed
         num_bits = length * 8
         bits = self.generate_random_bits(num_bits)
         
-        # Convert bits to bytes
-        keystream = np.zeros(length, dtype=np.uint8)
-        for i in range(length):
-            byte_bits = bits[i*8:(i+1)*8]
-            keystream[i] = int(''.join(map(str, byte_bits)), 2)
-        
-        return keystream
+        # Convert bits to bytes (first bit of each byte is the MSB)
+        return bits_to_bytes(bits)
     
     def generate_permutation_seed(self):
         """
@@ -108,22 +308,91 @@ class QuantumKeyGenerator:
         """
         # Generate 32 bits for a seed
         bits = self.generate_random_bits(32)
-        seed_value = int(''.join(map(str, bits)), 2)
+        seed_value = bits_to_int(bits)
         return seed_value
+    
+    def generate_keystream_seed(self, num_bits=KEYSTREAM_SEED_BITS):
+        """
+        Generate a short quantum seed for keystream expansion.
+        
+        Args:
+            num_bits: Number of quantum random bits in the seed
+            
+        Returns:
+            Integer seed to pass to expand_keystream()
+        """
+        return bits_to_int(self.generate_random_bits(num_bits))
 
 
-def generate_quantum_key(image_size, seed=None):
+def generate_quantum_key(image_size, seed=None, generator=None, source=None):
     """
     Convenience function to generate quantum key for an image.
     
     Args:
         image_size: Total number of pixels in the image
         seed: Optional seed for reproducibility
+        generator: Optional existing key source (e.g. a QuantumKeyGenerator
+            or an EntropyPool) to draw from instead of creating a new one;
+            ``seed`` is ignored when it is given
+        source: Optional EntropySource for a new generator
         
     Returns:
         tuple: (keystream, permutation_seed)
     """
-    generator = QuantumKeyGenerator(seed=seed)
+    if generator is None:
+        generator = QuantumKeyGenerator(seed=seed, source=source)
     keystream = generator.generate_keystream(image_size)
     permutation_seed = generator.generate_permutation_seed()
     return keystream, permutation_seed
+
+
+def expand_keystream(keystream_seed, length, offset=0):
+    """
+    Expand a quantum seed into a keystream with a counter-mode generator.
+    
+    The seed is hashed into a Philox-4x64 key and the keystream is the
+    little-endian byte sequence of the Philox output for counters 0, 1, 2,
+    ... Because each counter value is independent, any byte range can be
+    produced directly without generating the bytes before it.
+    
+    Args:
+        keystream_seed: Integer seed (e.g. from generate_keystream_seed)
+        length: Number of keystream bytes to produce
+        offset: Byte offset of the first keystream byte
+        
+    Returns:
+        numpy array of random bytes (0-255)
+    """
+    if length < 0 or offset < 0:
+        raise ValueError("length and offset must be non-negative")
+    
+    key = np.random.SeedSequence(keystream_seed).generate_state(2, dtype=np.uint64)
+    first_block, skip = divmod(offset, EXPANSION_BLOCK_BYTES)
+    num_blocks = -(-(skip + length) // EXPANSION_BLOCK_BYTES)
+    
+    bit_generator = np.random.Philox(key=key, counter=first_block)
+    words = bit_generator.random_raw(num_blocks * 4).astype('<u8', copy=False)
+    return words.view(np.uint8)[skip:skip + length]
+
+
+def generate_quantum_seeds(seed=None, generator=None, source=None):
+    """
+    Convenience function to generate the seeds for an expanded key.
+    
+    Only the returned seeds need to be stored; the keystream for an image
+    of any size is regenerated with expand_keystream().
+    
+    Args:
+        seed: Optional seed for reproducibility
+        generator: Optional existing key source to draw from instead of
+            creating a new one; ``seed`` is ignored when it is given
+        source: Optional EntropySource for a new generator
+        
+    Returns:
+        tuple: (keystream_seed, permutation_seed)
+    """
+    if generator is None:
+        generator = QuantumKeyGenerator(seed=seed, source=source)
+    keystream_seed = generator.generate_keystream_seed()
+    permutation_seed = generator.generate_permutation_seed()
+    return keystream_seed, permutation_seed
@@ -0,0 +1,390 @@
+"""
+Randomness Tests Module
+
+This module checks the statistical quality of harvested random bits with a
+subset of the NIST SP 800-22 tests: frequency (monobit), block frequency,
+runs, longest run of ones in a block, serial and approximate entropy.
+
+RandomnessTestSuite consumes bits in chunks and keeps only running counts
+(ones, transitions, per-block histograms and overlapping pattern counts),
+so samples of many gigabits can be streamed through it in bounded memory.
+Each chunk is processed with whole-array numpy operations. The serial and
+approximate entropy tests share one table of overlapping pattern counts,
+from which the shorter pattern counts are derived.
+
+check_entropy_source() runs the suite on fresh bits from a generator, pool
+or entropy source and is cheap enough to run periodically as a health
+check:
+
+    python randomness_tests.py --entropy aer --megabits 4
+    python randomness_tests.py --file entropy.bin
+"""
+
+import argparse
+import math
+import sys
+import numpy as np
+
+# SciPy is only needed for the p-values in results(); it is imported there
+# so that streaming bits through the suite does not pay for it.
+
+
+# Category bounds and probabilities of the longest run of ones in a block,
+# from NIST SP 800-22 section 2.4.4, keyed by block size
+_LONGEST_RUN_TABLES = {
+    8: (1, 4, [0.2148, 0.3672, 0.2305, 0.1875]),
+    128: (4, 9, [0.1174, 0.2430, 0.2493, 0.1752, 0.1027, 0.1124]),
+    10000: (10, 16, [0.0882, 0.2092, 0.2483, 0.1933, 0.1208, 0.0675, 0.0727]),
+}
+
+# Bits processed per internal step; bounds the size of temporary arrays
+_STEP_BITS = 1 << 22
+
+
+class RandomnessTestSuite:
+    """
+    Streaming NIST SP 800-22 test subset.
+    
+    Feed bits with update() or packed bytes with update_bytes(), in any
+    number of chunks of any size, then call results(). The result does not
+    depend on how the sample was split into chunks. Like NIST, the serial
+    and approximate entropy tests treat the sample as cyclic.
+    """
+    
+    def __init__(self, block_size=128, longest_run_block=10000, serial_m=16, apen_m=10, alpha=0.01):
+        """
+        Initialize the test suite.
+        
+        Args:
+            block_size: Block length M of the block frequency test
+            longest_run_block: Block length of the longest run test
+                (8, 128 or 10000, the sizes NIST tabulates)
+            serial_m: Pattern length m of the serial test (at least 2)
+            apen_m: Pattern length m of the approximate entropy test
+                (at least 1)
+            alpha: Significance level; a test passes if all its p-values
+                are at least alpha
+        """
+        if block_size <= 0:
+            raise ValueError("block_size must be positive")
+        if longest_run_block not in _LONGEST_RUN_TABLES:
+            raise ValueError(f"longest_run_block must be one of {sorted(_LONGEST_RUN_TABLES)}")
+        if serial_m < 2:
+            raise ValueError("serial_m must be at least 2")
+        if apen_m < 1:
+            raise ValueError("apen_m must be at least 1")
+        
+        self.block_size = block_size
+        self.longest_run_block = longest_run_block
+        self.serial_m = serial_m
+        self.apen_m = apen_m
+        self.alpha = alpha
+        
+        # Width of the counted patterns; shorter counts are derived from it
+        self._width = max(serial_m, apen_m + 1)
+        if self._width > 25:
+            raise ValueError("serial_m and apen_m + 1 must not exceed 25")
+        
+        self.num_bits = 0
+        self._ones = 0
+        self._transitions = 0
+        self._last_bit = None
+        self._block_carry = np.zeros(0, dtype=np.uint8)
+        self._block_count = 0
+        self._block_chi2_sum = 0
+        self._run_carry = np.zeros(0, dtype=np.uint8)
+        self._run_histogram = np.zeros(len(_LONGEST_RUN_TABLES[longest_run_block][2]), dtype=np.int64)
+        self._pattern_counts = np.zeros(1 << self._width, dtype=np.int64)
+        self._pattern_tail = np.zeros(0, dtype=np.uint8)
+        self._pattern_head = np.zeros(0, dtype=np.uint8)
+    
+    def update(self, bits):
+        """
+        Add bits to the sample.
+        
+        Args:
+            bits: Array-like of bits (0s and 1s)
+        """
+        bits = np.asarray(bits, dtype=np.uint8).ravel()
+        for start in range(0, len(bits), _STEP_BITS):
+            self._update_step(bits[start:start + _STEP_BITS])
+    
+    def update_bytes(self, data):
+        """
+        Add packed bytes to the sample, most significant bit first.
+        
+        Args:
+            data: Bytes-like object or numpy array of bytes
+        """
+        data = np.frombuffer(data, dtype=np.uint8) if isinstance(data, (bytes, bytearray, memoryview)) else data
+        data = np.asarray(data, dtype=np.uint8).ravel()
+        step = _STEP_BITS // 8
+        for start in range(0, len(data), step):
+            self._update_step(np.unpackbits(data[start:start + step]))
+    
+    def _update_step(self, bits):
+        if len(bits) == 0:
+            return
+        self.num_bits += len(bits)
+        self._ones += int(np.count_nonzero(bits))
+        
+        # Runs: a transition is a bit that differs from its predecessor
+        self._transitions += int(np.count_nonzero(bits[1:] != bits[:-1]))
+        if self._last_bit is not None and bits[0] != self._last_bit:
+            self._transitions += 1
+        self._last_bit = bits[-1]
+        
+        self._update_block_frequency(bits)
+        self._update_longest_run(bits)
+        self._update_patterns(bits)
+    
+    def _take_blocks(self, carry, bits, block_size):
+        """Join ``carry`` and ``bits`` into whole blocks; return (blocks, new carry)."""
+        joined = np.concatenate([carry, bits]) if len(carry) else bits
+        num_blocks = len(joined) // block_size
+        blocks = joined[:num_blocks * block_size].reshape(num_blocks, block_size)
+        return blocks, joined[num_blocks * block_size:].copy()
+    
+    def _update_block_frequency(self, bits):
+        blocks, self._block_carry = self._take_blocks(self._block_carry, bits, self.block_size)
+        if len(blocks):
+            # chi2 = 4M sum (ones/M - 1/2)^2 = sum (2 ones - M)^2 / M; keep
+            # the integer numerator so the sum is exact
+            excess = 2 * blocks.sum(axis=1, dtype=np.int64) - self.block_size
+            self._block_chi2_sum += int(np.dot(excess, excess))
+            self._block_count += len(blocks)
+    
+    def _update_longest_run(self, bits):
+        block_size = self.longest_run_block
+        blocks, self._run_carry = self._take_blocks(self._run_carry, bits, block_size)
+        if not len(blocks):
+            return
+        
+        # Only the category of the longest run is needed: after step k,
+        # ``run[:, i]`` says whether bits i..i+k-1 are all ones, so a block
+        # moves up one category for every k above ``low`` it still has a run of
+        low, high, _ = _LONGEST_RUN_TABLES[block_size]
+        ones = blocks.view(bool)
+        run = ones
+        categories = np.zeros(len(blocks), dtype=np.int64)
+        for k in range(2, high + 1):
+            run = run[:, :-1] & ones[:, k - 1:]
+            if k > low:
+                categories += run.any(axis=1)
+        self._run_histogram += np.bincount(categories, minlength=len(self._run_histogram))
+    
+    def _update_patterns(self, bits):
+        width = self._width
+        if len(self._pattern_head) < width - 1:
+            needed = width - 1 - len(self._pattern_head)
+            self._pattern_head = np.concatenate([self._pattern_head, bits[:needed]])
+        
+        joined = np.concatenate([self._pattern_tail, bits])
+        self._pattern_counts += self._count_patterns(joined)
+        self._pattern_tail = joined[-(width - 1):].copy()
+    
+    def _count_patterns(self, bits):
+        """Count every complete ``self._width``-bit window of ``bits``."""
+        width = self._width
+        num_windows = len(bits) - width + 1
+        if num_windows <= 0:
+            return 0
+        
+        # Big-endian 32-bit word starting at every byte; the window at bit
+        # 8k + r is a shifted slice of word k, since width + 7 <= 32
+        packed = np.concatenate([np.packbits(bits), np.zeros(3, dtype=np.uint8)]).astype(np.uint32)
+        words = packed[:-3] << 24
+        words |= packed[1:-2] << 16
+        words |= packed[2:-1] << 8
+        words |= packed[3:]
+        
+        values = np.concatenate([
+            words[:(num_windows - 1 - r) // 8 + 1] >> np.uint32(32 - width - r)
+            for r in range(min(8, num_windows))
+        ])
+        values &= np.uint32((1 << width) - 1)
+        return np.bincount(values, minlength=len(self._pattern_counts))
+    
+    def results(self):
+        """
+        Compute the test statistics and p-values of the sample so far.
+        
+        Tests without enough data (e.g. no complete block yet) are left out.
+        The runs test reports a p-value of 0 when the sample fails its
+        frequency prerequisite, as NIST specifies.
+        
+        Returns:
+            dict: 'num_bits', 'alpha', overall 'passed' and 'tests', which
+            maps each test name to a dict with its 'statistic', 'p_values'
+            and 'passed'
+        """
+        from scipy.special import gammaincc
+        
+        n = self.num_bits
+        if n < self._width:
+            raise ValueError(f"At least {self._width} bits are needed, got {n}")
+        tests = {}
+        
+        s_obs = abs(2 * self._ones - n) / math.sqrt(n)
+        tests['frequency'] = (s_obs, [math.erfc(s_obs / math.sqrt(2))])
+        
+        if self._block_count:
+            chi2 = self._block_chi2_sum / self.block_size
+            tests['block_frequency'] = (chi2, [gammaincc(self._block_count / 2, chi2 / 2)])
+        
+        pi = self._ones / n
+        runs = self._transitions + 1
+        if abs(pi - 0.5) >= 2 / math.sqrt(n):
+            tests['runs'] = (runs, [0.0])
+        else:
+            spread = 2 * math.sqrt(2 * n) * pi * (1 - pi)
+            tests['runs'] = (runs, [math.erfc(abs(runs - 2 * n * pi * (1 - pi)) / spread)])
+        
+        num_blocks = int(self._run_histogram.sum())
+        if num_blocks:
+            probabilities = np.array(_LONGEST_RUN_TABLES[self.longest_run_block][2])
+            expected = num_blocks * probabilities
+            chi2 = float(np.sum((self._run_histogram - expected) ** 2 / expected))
+            tests['longest_run'] = (chi2, [gammaincc((len(probabilities) - 1) / 2, chi2 / 2)])
+        
+        # Close the cycle: the windows that wrap from the end to the start
+        wrapped = np.concatenate([self._pattern_tail, self._pattern_head])
+        counts = self._pattern_counts + self._count_patterns(wrapped)
+        
+        def pattern_counts(length):
+            # Each cyclic length-bit window is the prefix of a counted window
+            return counts.reshape(1 << length, -1).sum(axis=1)
+        
+        def psi_squared(length):
+            if length <= 0:
+                return 0.0
+            # (2^m / n) sum nu^2 - n, written around the mean count to avoid
+            # cancellation between two large terms
+            deviations = pattern_counts(length) - n / (1 << length)
+            return float(np.dot(deviations, deviations)) * (1 << length) / n
+        
+        m = self.serial_m
+        psi_m, psi_m1, psi_m2 = psi_squared(m), psi_squared(m - 1), psi_squared(m - 2)
+        delta = psi_m - psi_m1
+        delta2 = psi_m - 2 * psi_m1 + psi_m2
+        tests['serial'] = (delta, [
+            gammaincc(2 ** (m - 2), delta / 2),
+            gammaincc(2 ** (m - 3), delta2 / 2),
+        ])
+        
+        def phi(length):
+            frequencies = pattern_counts(length) / n
+            frequencies = frequencies[frequencies > 0]
+            return float(np.sum(frequencies * np.log(frequencies)))
+        
+        m = self.apen_m
+        apen = phi(m) - phi(m + 1)
+        chi2 = 2 * n * (math.log(2) - apen)
+        tests['approximate_entropy'] = (chi2, [gammaincc(2 ** (m - 1), chi2 / 2)])
+        
+        report = {}
+        for name, (statistic, p_values) in tests.items():
+            p_values = [float(p) for p in p_values]
+            report[name] = {
+                'statistic': float(statistic),
+                'p_values': p_values,
+                'passed': all(p >= self.alpha for p in p_values),
+            }
+        return {
+            'num_bits': n,
+            'alpha': self.alpha,
+            'passed': all(test['passed'] for test in report.values()),
+            'tests': report,
+        }
+
+
+def run_randomness_tests(bits, **options):
+    """
+    Run the test suite on one sample of bits.
+    
+    Args:
+        bits: Array-like of bits (0s and 1s)
+        **options: Options for RandomnessTestSuite
+        
+    Returns:
+        dict: See RandomnessTestSuite.results
+    """
+    suite = RandomnessTestSuite(**options)
+    suite.update(bits)
+    return suite.results()
+
+
+def check_entropy_source(source, num_bits=1 << 20, chunk_bits=1 << 20, alpha=0.001, **options):
+    """
+    Health check: test fresh bits drawn from a key source.
+    
+    The bits drawn are consumed and should not be used as key material.
+    With several p-values per run, the default alpha is lower than the
+    usual 0.01 so that periodic checks of a healthy source rarely alarm.
+    
+    Args:
+        source: QuantumKeyGenerator, EntropyPool or EntropySource
+        num_bits: Number of bits to test
+        chunk_bits: Number of bits drawn per call
+        alpha: Significance level
+        **options: Further options for RandomnessTestSuite
+        
+    Returns:
+        dict: See RandomnessTestSuite.results
+    """
+    draw = source.generate_random_bits if hasattr(source, 'generate_random_bits') else source.random_bits
+    suite = RandomnessTestSuite(alpha=alpha, **options)
+    remaining = num_bits
+    while remaining > 0:
+        count = min(chunk_bits, remaining)
+        suite.update(draw(count))
+        remaining -= count
+    return suite.results()
+
+
+def format_results(results):
+    """
+    Format test results as a table.
+    
+    Args:
+        results: dict returned by RandomnessTestSuite.results
+        
+    Returns:
+        str: One line per test, followed by the overall verdict
+    """
+    lines = [f"{'test':<20} {'statistic':>14}  p-values"]
+    for name, test in results['tests'].items():
+        p_values = ', '.join(f"{p:.6f}" for p in test['p_values'])
+        verdict = 'pass' if test['passed'] else 'FAIL'
+        lines.append(f"{name:<20} {test['statistic']:>14.4f}  {p_values}  {verdict}")
+    overall = 'PASS' if results['passed'] else 'FAIL'
+    lines.append(f"{results['num_bits']} bits, alpha={results['alpha']:g}: {overall}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="NIST SP 800-22 randomness tests")
+    parser.add_argument('--entropy', default='aer',
+                        help="Entropy source to draw from: aer, aer:<method>[:<qubits>], replay:<path> or os")
+    parser.add_argument('--file', default=None, help="Test a file of packed bits instead (e.g. from record_entropy)")
+    parser.add_argument('--megabits', type=float, default=1)
+    parser.add_argument('--alpha', type=float, default=0.001)
+    args = parser.parse_args(argv)
+    
+    if args.file:
+        suite = RandomnessTestSuite(alpha=args.alpha)
+        with open(args.file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                suite.update_bytes(chunk)
+        results = suite.results()
+    else:
+        from entropy_sources import create_entropy_source
+        source = create_entropy_source(args.entropy)
+        results = check_entropy_source(source, int(args.megabits * 1e6), alpha=args.alpha)
+    
+    print(format_results(results))
+    return 0 if results['passed'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
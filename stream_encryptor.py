@@ -0,0 +1,283 @@
+"""
+Stream Encryption Module
+
+This module encrypts byte streams (uploads, files, sockets) chunk by chunk
+with constant memory. The stream is cut into fixed-size blocks; each block
+is XORed with its slice of the seed-expanded keystream and permuted
+internally, exactly like a block of TiledImageEncryptor. Blocks are emitted
+in stream order (there is no block-level shuffle, which would need the
+whole stream), so only one block is held in memory at a time and the total
+length does not have to be known up front.
+
+Streams are treated as opaque bytes: an uploaded PNG can be piped to
+storage encrypted without decoding it first.
+"""
+
+import asyncio
+import inspect
+import numpy as np
+from tiled_encryptor import TiledImageEncryptor
+
+
+# Default number of bytes per block (1 MiB)
+DEFAULT_STREAM_BLOCK_SIZE = 1 << 20
+
+
+class _BlockAssembler:
+    """
+    Re-chunks arbitrary input chunks into blocks of ``block_size`` bytes.
+    
+    Blocks yielded by feed() may share an internal buffer and must be
+    consumed before the next call.
+    """
+    
+    def __init__(self, block_size):
+        self.block_size = block_size
+        self._buffer = np.empty(block_size, dtype=np.uint8)
+        self._filled = 0
+    
+    def feed(self, chunk):
+        """Yield every block completed by ``chunk``."""
+        data = np.frombuffer(chunk, dtype=np.uint8)
+        while len(data):
+            if self._filled == 0 and len(data) >= self.block_size:
+                # Whole blocks are passed through without copying
+                yield data[:self.block_size]
+                data = data[self.block_size:]
+                continue
+            take = min(self.block_size - self._filled, len(data))
+            self._buffer[self._filled:self._filled + take] = data[:take]
+            self._filled += take
+            data = data[take:]
+            if self._filled == self.block_size:
+                self._filled = 0
+                yield self._buffer
+    
+    def flush(self):
+        """Return the trailing partial block, or None."""
+        if self._filled == 0:
+            return None
+        tail = self._buffer[:self._filled]
+        self._filled = 0
+        return tail
+
+
+class StreamEncryptor:
+    """
+    Encrypts and decrypts byte streams block by block.
+    
+    Block i of the ciphertext is block i of the plaintext, XORed with the
+    keystream at offset ``i * block_size`` and permuted with the in-block
+    permutation of block i. The ciphertext has the same length as the
+    plaintext and does not depend on how the input is chunked; decryption
+    must use the same block size.
+    """
+    
+    def __init__(self, keystream_seed, permutation_seed, block_size=DEFAULT_STREAM_BLOCK_SIZE):
+        """
+        Initialize the encryptor with keys.
+        
+        Args:
+            keystream_seed: Seed for expand_keystream()
+            permutation_seed: Seed for the in-block permutations
+            block_size: Number of bytes per block
+        """
+        self._blocks = TiledImageEncryptor(
+            None, permutation_seed, block_size=block_size, keystream_seed=keystream_seed
+        )
+        self.keystream_seed = keystream_seed
+        self.permutation_seed = permutation_seed
+        self.block_size = block_size
+    
+    @classmethod
+    def from_key(cls, key):
+        """
+        Create an encryptor from a key dictionary.
+        
+        The key's shape and dtype are not used. Only seed-expanded keys can
+        cover a stream of unknown length.
+        
+        Args:
+            key: Key dictionary (see key_format.create_key) whose options
+                may set 'block_size'
+                
+        Returns:
+            StreamEncryptor instance
+        """
+        if key['keystream_seed'] is None:
+            raise ValueError("Stream encryption requires a seed-expanded key")
+        return cls(
+            key['keystream_seed'],
+            key['permutation_seed'],
+            block_size=key['options'].get('block_size', DEFAULT_STREAM_BLOCK_SIZE)
+        )
+    
+    def _transform(self, block, block_index, encrypt):
+        """Encrypt or decrypt one block and return it as a memoryview."""
+        offset = block_index * self.block_size
+        if encrypt:
+            result = self._blocks.encrypt_block(block, block_index, offset)
+        else:
+            result = self._blocks.decrypt_block(block, block_index, offset)
+        return memoryview(result)
+    
+    def _transform_chunks(self, chunks, encrypt):
+        assembler = _BlockAssembler(self.block_size)
+        block_index = 0
+        for chunk in chunks:
+            for block in assembler.feed(chunk):
+                yield self._transform(block, block_index, encrypt)
+                block_index += 1
+        tail = assembler.flush()
+        if tail is not None:
+            yield self._transform(tail, block_index, encrypt)
+    
+    def encrypt_chunks(self, chunks):
+        """
+        Encrypt an iterable of byte chunks.
+        
+        Args:
+            chunks: Iterable of bytes-like objects of any sizes
+            
+        Yields:
+            memoryview of each encrypted block (the last may be shorter)
+        """
+        return self._transform_chunks(chunks, encrypt=True)
+    
+    def decrypt_chunks(self, chunks):
+        """
+        Decrypt an iterable of ciphertext chunks.
+        
+        Args:
+            chunks: Iterable of bytes-like objects of any sizes
+            
+        Yields:
+            memoryview of each decrypted block (the last may be shorter)
+        """
+        return self._transform_chunks(chunks, encrypt=False)
+    
+    def _copy_stream(self, src, dst, encrypt, chunk_size):
+        chunk_size = chunk_size or self.block_size
+        chunks = iter(lambda: src.read(chunk_size), b'')
+        total = 0
+        for block in self._transform_chunks(chunks, encrypt):
+            dst.write(block)
+            total += len(block)
+        return total
+    
+    def encrypt_stream(self, src, dst, chunk_size=None):
+        """
+        Encrypt everything readable from ``src`` into ``dst``.
+        
+        Args:
+            src: Readable binary file object (e.g. an upload, open file or
+                socket.makefile('rb'))
+            dst: Writable binary file object
+            chunk_size: Bytes per read call; defaults to the block size
+            
+        Returns:
+            int: Number of bytes written
+        """
+        return self._copy_stream(src, dst, True, chunk_size)
+    
+    def decrypt_stream(self, src, dst, chunk_size=None):
+        """
+        Decrypt everything readable from ``src`` into ``dst``.
+        
+        Args:
+            src: Readable binary file object
+            dst: Writable binary file object
+            chunk_size: Bytes per read call; defaults to the block size
+            
+        Returns:
+            int: Number of bytes written
+        """
+        return self._copy_stream(src, dst, False, chunk_size)
+    
+    async def _transform_chunks_async(self, chunks, encrypt):
+        assembler = _BlockAssembler(self.block_size)
+        block_index = 0
+        async for chunk in chunks:
+            for block in assembler.feed(chunk):
+                # Block crypto runs in a thread so the event loop stays responsive
+                yield await asyncio.to_thread(self._transform, block, block_index, encrypt)
+                block_index += 1
+        tail = assembler.flush()
+        if tail is not None:
+            yield await asyncio.to_thread(self._transform, tail, block_index, encrypt)
+    
+    def encrypt_chunks_async(self, chunks):
+        """
+        Encrypt an async iterable of byte chunks.
+        
+        Args:
+            chunks: Async iterable of bytes-like objects (e.g. aiohttp's
+                ``request.content.iter_chunked(n)``)
+                
+        Yields:
+            memoryview of each encrypted block (async generator)
+        """
+        return self._transform_chunks_async(chunks, encrypt=True)
+    
+    def decrypt_chunks_async(self, chunks):
+        """
+        Decrypt an async iterable of ciphertext chunks.
+        
+        Args:
+            chunks: Async iterable of bytes-like objects
+            
+        Yields:
+            memoryview of each decrypted block (async generator)
+        """
+        return self._transform_chunks_async(chunks, encrypt=False)
+    
+    async def _copy_stream_async(self, reader, writer, encrypt, chunk_size):
+        chunk_size = chunk_size or self.block_size
+        
+        async def chunks():
+            while True:
+                chunk = await reader.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        
+        total = 0
+        async for block in self._transform_chunks_async(chunks(), encrypt):
+            # asyncio.StreamWriter.write() is synchronous and needs drain();
+            # aiohttp's StreamResponse.write() is a coroutine
+            result = writer.write(block)
+            if inspect.isawaitable(result):
+                await result
+            elif hasattr(writer, 'drain'):
+                await writer.drain()
+            total += len(block)
+        return total
+    
+    async def encrypt_stream_async(self, reader, writer, chunk_size=None):
+        """
+        Encrypt everything readable from an async reader into an async writer.
+        
+        Args:
+            reader: Object with a coroutine ``read(n)`` returning b'' at EOF
+                (asyncio.StreamReader, aiohttp request.content)
+            writer: asyncio.StreamWriter or aiohttp StreamResponse
+            chunk_size: Bytes per read call; defaults to the block size
+            
+        Returns:
+            int: Number of bytes written
+        """
+        return await self._copy_stream_async(reader, writer, True, chunk_size)
+    
+    async def decrypt_stream_async(self, reader, writer, chunk_size=None):
+        """
+        Decrypt everything readable from an async reader into an async writer.
+        
+        Args:
+            reader: Object with a coroutine ``read(n)`` returning b'' at EOF
+            writer: asyncio.StreamWriter or aiohttp StreamResponse
+            chunk_size: Bytes per read call; defaults to the block size
+            
+        Returns:
+            int: Number of bytes written
+        """
+        return await self._copy_stream_async(reader, writer, False, chunk_size)
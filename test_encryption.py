@@ -51,7 +51,7 @@ def test_encryption_decryption():
     print(f"   ✓ Image encrypted successfully")
     
     # Save encrypted image
-    save_image_array(encrypted_image, 'samples/encrypted_image.png')
+    save_image_array(encrypted_image, 'samples/encrypted_image.png', role='ciphertext')
     print(f"   ✓ Encrypted image saved: samples/encrypted_image.png")
     
     # Decrypt image
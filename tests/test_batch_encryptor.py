@@ -0,0 +1,102 @@
+"""
+Tests for Batch Encryption module
+"""
+
+import unittest
+import numpy as np
+import os
+import sys
+
+# Add parent directory to path to import from root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_encryptor import (
+    KEY_TABLE_DTYPE,
+    decrypt_batch,
+    encrypt_batch,
+    generate_key_table,
+    key_from_table
+)
+from image_encryptor import ImageEncryptor
+from key_format import decode_key, encode_key
+
+
+class TestBatchEncryption(unittest.TestCase):
+    """Test cases for batch encryption of image stacks."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.images = np.random.randint(0, 256, (12, 16, 20), dtype=np.uint8)
+    
+    def test_generate_key_table(self):
+        """Test that every image gets its own key from one harvest."""
+        key_table = generate_key_table(12, seed=42)
+        
+        self.assertEqual(key_table.dtype, KEY_TABLE_DTYPE)
+        self.assertEqual(len(key_table), 12)
+        self.assertEqual(len(np.unique(key_table['permutation_seed'])), 12)
+        self.assertEqual(len({row.tobytes() for row in key_table['keystream_seed']}), 12)
+    
+    def test_encrypt_decrypt_cycle(self):
+        """Test that a whole stack round-trips."""
+        encrypted, key_table = encrypt_batch(self.images, seed=42)
+        
+        self.assertEqual(encrypted.shape, self.images.shape)
+        self.assertFalse(np.array_equal(encrypted, self.images))
+        np.testing.assert_array_equal(decrypt_batch(encrypted, key_table), self.images)
+    
+    def test_rows_decrypt_independently(self):
+        """Test that each key table row works with ImageEncryptor on its own."""
+        encrypted, key_table = encrypt_batch(self.images, seed=42)
+        
+        for index in [0, 5, 11]:
+            with self.subTest(index=index):
+                key = decode_key(encode_key(key_from_table(key_table, index, (16, 20))))
+                encryptor = ImageEncryptor.from_key(key)
+                
+                np.testing.assert_array_equal(encryptor.encrypt_image(self.images[index]), encrypted[index])
+                np.testing.assert_array_equal(encryptor.decrypt_image(encrypted[index]), self.images[index])
+    
+    def test_uint16_batch(self):
+        """Test that non-uint8 stacks keep their dtype and match per-image keys."""
+        images = np.random.randint(0, 65536, (4, 8, 10), dtype=np.uint16)
+        encrypted, key_table = encrypt_batch(images, seed=3)
+        
+        self.assertEqual(encrypted.dtype, np.uint16)
+        np.testing.assert_array_equal(decrypt_batch(encrypted, key_table), images)
+        
+        encryptor = ImageEncryptor.from_key(key_from_table(key_table, 2, (8, 10), dtype=np.uint16))
+        np.testing.assert_array_equal(encryptor.encrypt_image(images[2]), encrypted[2])
+    
+    def test_legacy_permutation_rng(self):
+        """Test batches using the legacy permutation RNG."""
+        encrypted, key_table = encrypt_batch(self.images, seed=7, permutation_rng='legacy')
+        
+        np.testing.assert_array_equal(
+            decrypt_batch(encrypted, key_table, permutation_rng='legacy'),
+            self.images
+        )
+    
+    def test_empty_batch(self):
+        """Test that a stack of zero images gives empty results."""
+        images = np.zeros((0, 16, 20), dtype=np.uint16)
+        encrypted, key_table = encrypt_batch(images, seed=42)
+        
+        self.assertEqual(encrypted.shape, images.shape)
+        self.assertEqual(encrypted.dtype, np.uint16)
+        self.assertEqual(len(key_table), 0)
+        decrypted = decrypt_batch(encrypted, key_table)
+        self.assertEqual(decrypted.shape, images.shape)
+        with self.assertRaises(ValueError):
+            encrypt_batch(images, key_table=generate_key_table(1, seed=1))
+    
+    def test_key_table_size_mismatch(self):
+        """Test that a key table of the wrong length is rejected."""
+        key_table = generate_key_table(3, seed=1)
+        
+        with self.assertRaises(ValueError):
+            encrypt_batch(self.images, key_table=key_table)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+"""
+Tests for the raw ciphertext container format
+"""
+
+import unittest
+import numpy as np
+import io
+import os
+import sys
+import tempfile
+
+# Add parent directory to path to import from root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ciphertext_container import (
+    DATA_ALIGNMENT,
+    allocate_container,
+    check_key,
+    decode_header,
+    encode_header,
+    load_container,
+    open_container,
+    read_header,
+    write_container
+)
+from image_encryptor import ImageEncryptor, PermutationCache
+from key_format import create_key, key_id
+
+
+class TestCiphertextContainer(unittest.TestCase):
+    """Test cases for writing and memory-mapping containers."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'image.enc.qsc')
+        self.image = np.random.randint(0, 256, (37, 41, 3), dtype=np.uint8)
+        self.key = create_key(self.image.shape, 1234, keystream_seed=2 ** 100 + 7,
+                              options={'permutation_rng': 'pcg64'})
+        self.encryptor = ImageEncryptor.from_key(self.key)
+        self.encrypted = self.encryptor.encrypt_image(self.image)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_header_round_trip(self):
+        """Test header encoding, alignment and key id."""
+        header = encode_header((3, 4, 5), np.uint16, key_id(self.key))
+        self.assertEqual(len(header) % DATA_ALIGNMENT, 0)
+        
+        decoded = decode_header(header)
+        self.assertEqual(decoded['shape'], (3, 4, 5))
+        self.assertEqual(decoded['dtype'], np.dtype(np.uint16))
+        self.assertEqual(decoded['key_id'], key_id(self.key))
+        self.assertEqual(decoded['offset'], len(header))
+        
+        self.assertIsNone(decode_header(encode_header((2, 2), np.uint8))['key_id'])
+    
+    def test_write_and_memmap(self):
+        """Test that a written container maps back to the same array."""
+        for array in [self.encrypted, np.random.randint(0, 65536, (20, 30), dtype=np.uint16)]:
+            with self.subTest(dtype=array.dtype):
+                write_container(self.path, array, self.key)
+                mapped, header = open_container(self.path)
+                
+                self.assertIsInstance(mapped, np.memmap)
+                self.assertEqual(mapped.dtype, array.dtype)
+                np.testing.assert_array_equal(mapped, array)
+                self.assertEqual(os.path.getsize(self.path), header['offset'] + array.nbytes)
+                del mapped
+    
+    def test_file_objects_and_bytes(self):
+        """Test writing to a file object and viewing the bytes without a copy."""
+        buffer = io.BytesIO()
+        write_container(buffer, self.encrypted)
+        
+        buffer.seek(0)
+        self.assertEqual(read_header(buffer)['shape'], self.encrypted.shape)
+        array, _ = load_container(buffer.getvalue())
+        np.testing.assert_array_equal(array, self.encrypted)
+        
+        with self.assertRaises(ValueError):
+            load_container(buffer.getvalue()[:-1])
+        with self.assertRaises(ValueError):
+            load_container(b'\x89PNG\r\n\x1a\n')
+    
+    def test_encrypt_into_container(self):
+        """Test encrypting straight into an allocated container buffer."""
+        container, data = allocate_container(self.image.shape, self.image.dtype, self.key)
+        self.encryptor.encrypt_into(self.image, data)
+        
+        with open(self.path, 'wb') as f:
+            f.write(container)
+        mapped, header = open_container(self.path)
+        check_key(header, self.key)
+        
+        np.testing.assert_array_equal(mapped, self.encrypted)
+        np.testing.assert_array_equal(self.encryptor.decrypt_image(mapped), self.image)
+        del mapped
+    
+    def test_check_key(self):
+        """Test that a mismatched key is rejected before decryption."""
+        header = decode_header(encode_header(self.image.shape, np.uint8, key_id(self.key)))
+        other_key = create_key(self.image.shape, 99, keystream_seed=1)
+        
+        with self.assertRaises(ValueError):
+            check_key(header, other_key)
+        with self.assertRaises(ValueError):
+            check_key(header, create_key((37, 41), 1234, keystream_seed=1))
+        
+        # Without a recorded key id only shape and dtype are checked
+        check_key(decode_header(encode_header(self.image.shape, np.uint8)), other_key)
+
+
+class TestDecryptRegion(unittest.TestCase):
+    """Test cases for ImageEncryptor.decrypt_region."""
+    
+    def test_regions_match_full_decryption(self):
+        """Test regions of several shapes, dtypes and permute units."""
+        images = [
+            np.random.randint(0, 256, (40, 50), dtype=np.uint8),
+            np.random.randint(0, 256, (40, 50, 3), dtype=np.uint8),
+            np.random.randint(0, 65536, (40, 50), dtype=np.uint16),
+        ]
+        regions = [
+            (slice(None), slice(None)),
+            (slice(5, 17), slice(30, 50)),
+            (slice(0, 40, 3), slice(49, 0, -7)),
+            (slice(10, 10), slice(0, 5)),
+        ]
+        for image in images:
+            for permute_unit in ['byte', 'pixel']:
+                encryptor = ImageEncryptor(
+                    np.random.randint(0, 256, image.nbytes, dtype=np.uint8), 77,
+                    permutation_rng='pcg64', permute_unit=permute_unit,
+                    permutation_cache=PermutationCache()
+                )
+                encrypted = encryptor.encrypt_image(image)
+                for rows, cols in regions:
+                    with self.subTest(shape=image.shape, dtype=image.dtype,
+                                      permute_unit=permute_unit, rows=rows, cols=cols):
+                        np.testing.assert_array_equal(
+                            encryptor.decrypt_region(encrypted, rows, cols),
+                            image[rows, cols]
+                        )
+    
+    def test_region_from_memmap(self):
+        """Test decrypting a region straight from a memory-mapped container."""
+        image = np.random.randint(0, 256, (64, 64), dtype=np.uint8)
+        encryptor = ImageEncryptor(np.random.randint(0, 256, image.size, dtype=np.uint8), 5)
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'image.enc.qsc')
+            write_container(path, encryptor.encrypt_image(image))
+            mapped, _ = open_container(path)
+            
+            np.testing.assert_array_equal(
+                encryptor.decrypt_region(mapped, slice(8, 24), slice(40, 64)),
+                image[8:24, 40:64]
+            )
+            del mapped
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,15 +5,34 @@ Tests for Image Encryption and Decryption modules
 import unittest
 import numpy as np
 from PIL import Image
+import io
 import os
 import tempfile
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 # Add parent directory to path to import from root
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from image_encryptor import ImageEncryptor, load_image_as_grayscale, save_image_array
-from quantum_key_generator import generate_quantum_key
+from image_encryptor import (
+    ImageEncryptor,
+    array_to_image_bytes,
+    check_image_format,
+    check_image_for_key,
+    load_ciphertext,
+    load_preview,
+    probe_image,
+    PermutationCache,
+    generate_permutation,
+    create_encryptor,
+    invert_permutation,
+    load_image,
+    load_image_as_grayscale,
+    save_image_array
+)
+from ciphertext_container import write_container
+from key_format import create_key
+from quantum_key_generator import expand_keystream, generate_quantum_key
 
 
 class TestEncryptionDecryption(unittest.TestCase):
@@ -166,5 +185,614 @@ class TestEncryptionDecryption(unittest.TestCase):
                 np.testing.assert_array_equal(original_array, decrypted_array)
 
 
+
+class TestEncryptInto(unittest.TestCase):
+    """Test cases for the preallocated-buffer encrypt/decrypt API."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.image = np.random.randint(0, 256, (40, 50), dtype=np.uint8)
+        keystream, permutation_seed = generate_quantum_key(self.image.size, seed=42)
+        self.encryptor = ImageEncryptor(keystream, permutation_seed)
+        self.encryptor.chunk_size = 256  # exercise multiple chunks
+        self.expected = self.encryptor.encrypt_image(self.image)
+    
+    def test_matches_encrypt_image(self):
+        """Test that encrypt_into writes the same ciphertext as encrypt_image."""
+        out = np.empty_like(self.image)
+        result = self.encryptor.encrypt_into(self.image, out)
+        
+        np.testing.assert_array_equal(out, self.expected)
+        self.assertTrue(np.shares_memory(result, out))
+    
+    def test_decrypt_into(self):
+        """Test decryption into a preallocated buffer."""
+        out = np.empty_like(self.image)
+        self.encryptor.decrypt_into(self.expected, out)
+        
+        np.testing.assert_array_equal(out, self.image)
+    
+    def test_memmap_buffers(self):
+        """Test encryption between memory-mapped files."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            src = np.memmap(os.path.join(temp_dir, 'src.raw'), dtype=np.uint8, mode='w+', shape=self.image.shape)
+            src[:] = self.image
+            out = np.memmap(os.path.join(temp_dir, 'out.raw'), dtype=np.uint8, mode='w+', shape=self.image.shape)
+            
+            self.encryptor.encrypt_into(src, out)
+            np.testing.assert_array_equal(out, self.expected)
+            del src, out
+    
+    def test_memoryview_output(self):
+        """Test writing into a flat writable memoryview."""
+        buffer = bytearray(self.image.size)
+        result = self.encryptor.encrypt_into(self.image, memoryview(buffer))
+        
+        self.assertEqual(result.shape, self.image.shape)
+        np.testing.assert_array_equal(
+            np.frombuffer(buffer, dtype=np.uint8).reshape(self.image.shape),
+            self.expected
+        )
+    
+    def test_non_contiguous_input(self):
+        """Test that strided inputs are accepted."""
+        wide = np.zeros((40, 100), dtype=np.uint8)
+        wide[:, ::2] = self.image
+        out = np.empty_like(self.image)
+        
+        self.encryptor.encrypt_into(wide[:, ::2], out)
+        np.testing.assert_array_equal(out, self.expected)
+    
+    def test_invalid_buffers(self):
+        """Test that mismatched or overlapping buffers are rejected."""
+        with self.assertRaises(ValueError):
+            self.encryptor.encrypt_into(self.image, np.empty(10, dtype=np.uint8))
+        with self.assertRaises(ValueError):
+            self.encryptor.encrypt_into(self.image, np.empty(self.image.shape, dtype=np.float32))
+        with self.assertRaises(ValueError):
+            self.encryptor.encrypt_into(self.image, self.image)
+        with self.assertRaises(ValueError):
+            self.encryptor.encrypt_into(self.image, np.empty((50, 80), dtype=np.uint8)[:, ::2])
+
+
+class TestParallelEncryption(unittest.TestCase):
+    """Test cases for multi-threaded encryption."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.image = np.random.randint(0, 256, (100, 123), dtype=np.uint8)
+        self.keystream, self.permutation_seed = generate_quantum_key(self.image.size, seed=42)
+        self.serial = ImageEncryptor(self.keystream, self.permutation_seed)
+        self.serial.chunk_size = 1000
+    
+    def test_bit_identical_to_serial(self):
+        """Test that any worker count produces the serial ciphertext."""
+        expected = self.serial.encrypt_image(self.image)
+        
+        for workers in [2, 3, 8]:
+            with self.subTest(workers=workers):
+                encryptor = ImageEncryptor(self.keystream, self.permutation_seed, workers=workers)
+                encryptor.chunk_size = 1000
+                encrypted = encryptor.encrypt_image(self.image)
+                
+                np.testing.assert_array_equal(encrypted, expected)
+                np.testing.assert_array_equal(encryptor.decrypt_image(encrypted), self.image)
+    
+    def test_invalid_worker_count(self):
+        """Test that a worker count below one is rejected."""
+        with self.assertRaises(ValueError):
+            ImageEncryptor(self.keystream, self.permutation_seed, workers=0)
+
+
+class TestPermutationRNG(unittest.TestCase):
+    """Test cases for isolated permutation RNGs."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.image = np.random.randint(0, 256, (64, 64), dtype=np.uint8)
+        self.keystream, self.permutation_seed = generate_quantum_key(self.image.size, seed=42)
+    
+    def test_legacy_matches_global_seeding(self):
+        """Test that legacy mode reproduces the original global-RNG permutation."""
+        np.random.seed(self.permutation_seed)
+        expected = np.random.permutation(self.image.size)
+        
+        np.testing.assert_array_equal(
+            generate_permutation(self.permutation_seed, self.image.size, 'legacy'),
+            expected
+        )
+    
+    def test_legacy_ciphertext_still_decrypts(self):
+        """Test decrypting a ciphertext produced the original way."""
+        np.random.seed(self.permutation_seed)
+        permutation = np.random.permutation(self.image.size)
+        legacy_encrypted = np.bitwise_xor(self.image.flatten(), self.keystream)[permutation]
+        legacy_encrypted = legacy_encrypted.reshape(self.image.shape)
+        
+        encryptor = ImageEncryptor(self.keystream, self.permutation_seed, permutation_cache=PermutationCache())
+        np.testing.assert_array_equal(encryptor.decrypt_image(legacy_encrypted), self.image)
+    
+    def test_global_random_state_untouched(self):
+        """Test that encryption does not reseed the global NumPy RNG."""
+        np.random.seed(2024)
+        expected = np.random.random(5)
+        
+        np.random.seed(2024)
+        for rng in ['legacy', 'pcg64']:
+            encryptor = ImageEncryptor(
+                self.keystream, self.permutation_seed,
+                permutation_cache=PermutationCache(), permutation_rng=rng
+            )
+            encryptor.encrypt_image(self.image)
+        
+        np.testing.assert_array_equal(np.random.random(5), expected)
+    
+    def test_pcg64_round_trip(self):
+        """Test encryption/decryption with the Generator-based permutation."""
+        encryptor = ImageEncryptor(self.keystream, self.permutation_seed, permutation_rng='pcg64')
+        encrypted = encryptor.encrypt_image(self.image)
+        
+        np.testing.assert_array_equal(encryptor.decrypt_image(encrypted), self.image)
+        self.assertFalse(np.array_equal(
+            generate_permutation(self.permutation_seed, self.image.size, 'pcg64'),
+            generate_permutation(self.permutation_seed, self.image.size, 'legacy')
+        ))
+    
+    def test_concurrent_encryption(self):
+        """Test that many threads can encrypt with different seeds in parallel."""
+        seeds = list(range(16))
+        
+        def encrypt(seed):
+            encryptor = ImageEncryptor(self.keystream, seed, permutation_cache=PermutationCache())
+            return encryptor.encrypt_image(self.image)
+        
+        expected = [encrypt(seed) for seed in seeds]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(encrypt, seeds * 4))
+        
+        for index, result in enumerate(results):
+            np.testing.assert_array_equal(result, expected[index % len(seeds)])
+    
+    def test_unknown_rng_rejected(self):
+        """Test that an unknown permutation RNG is rejected."""
+        with self.assertRaises(ValueError):
+            ImageEncryptor(self.keystream, self.permutation_seed, permutation_rng='mt')
+
+
+class TestPermutationCache(unittest.TestCase):
+    """Test cases for PermutationCache class."""
+    
+    def test_hits_and_misses(self):
+        """Test that repeated lookups are served from the cache."""
+        cache = PermutationCache()
+        
+        first = cache.get_permutation(42, 1000)
+        second = cache.get_permutation(42, 1000)
+        
+        self.assertIs(first, second)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+    
+    def test_inverse_permutation(self):
+        """Test that the cached inverse undoes the forward permutation."""
+        cache = PermutationCache()
+        forward = cache.get_permutation(7, 500)
+        inverse = cache.get_inverse_permutation(7, 500)
+        
+        np.testing.assert_array_equal(forward[inverse], np.arange(500))
+        self.assertEqual(cache.stats()['current_bytes'], forward.nbytes + inverse.nbytes)
+    
+    def test_matches_legacy_permutation(self):
+        """Test that cached permutations match the seeded global RNG."""
+        np.random.seed(1234)
+        expected = np.random.permutation(300)
+        
+        np.testing.assert_array_equal(PermutationCache().get_permutation(1234, 300), expected)
+    
+    def test_eviction_is_bounded_by_bytes(self):
+        """Test LRU eviction once the byte budget is exceeded."""
+        entry_bytes = np.arange(100).nbytes
+        cache = PermutationCache(max_bytes=2 * entry_bytes)
+        
+        cache.get_permutation(1, 100)
+        cache.get_permutation(2, 100)
+        cache.get_permutation(1, 100)  # refresh seed 1
+        cache.get_permutation(3, 100)  # evicts seed 2
+        
+        stats = cache.stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertLessEqual(stats['current_bytes'], stats['max_bytes'])
+        
+        cache.get_permutation(1, 100)
+        self.assertEqual(cache.stats()['hits'], 2)
+        cache.get_permutation(2, 100)
+        self.assertEqual(cache.stats()['misses'], 4)
+    
+    def test_oversized_entries_are_not_cached(self):
+        """Test that arrays larger than the budget bypass the cache."""
+        cache = PermutationCache(max_bytes=16)
+        cache.get_permutation(1, 100)
+        
+        self.assertEqual(cache.stats()['entries'], 0)
+        self.assertEqual(cache.stats()['current_bytes'], 0)
+    
+    def test_cached_arrays_are_read_only(self):
+        """Test that callers cannot corrupt shared cache entries."""
+        permutation = PermutationCache().get_permutation(5, 10)
+        
+        with self.assertRaises(ValueError):
+            permutation[0] = 0
+    
+    def test_repeated_decrypt_uses_cache(self):
+        """Test that decrypting the same asset again hits the cache."""
+        image = np.random.randint(0, 256, (32, 32), dtype=np.uint8)
+        keystream, permutation_seed = generate_quantum_key(image.size, seed=42)
+        cache = PermutationCache()
+        encryptor = ImageEncryptor(keystream, permutation_seed, permutation_cache=cache)
+        encrypted = encryptor.encrypt_image(image)
+        
+        for _ in range(3):
+            np.testing.assert_array_equal(encryptor.decrypt_image(encrypted), image)
+        
+        # Encryption computes the forward and inverse permutations in one
+        # lookup; decryption scatters with the cached forward permutation
+        self.assertEqual(cache.stats()['misses'], 1)
+        self.assertEqual(cache.stats()['hits'], 3)
+    
+    def test_invert_permutation_matches_argsort(self):
+        """Test the O(n) scatter-based inverse against argsort."""
+        np.random.seed(99)
+        permutation = np.random.permutation(1000)
+        
+        np.testing.assert_array_equal(invert_permutation(permutation), np.argsort(permutation))
+
+
+
+class TestMultichannel(unittest.TestCase):
+    """Test cases for H x W x C images."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.rgb = np.random.randint(0, 256, (30, 40, 3), dtype=np.uint8)
+        self.keystream = expand_keystream(12345, self.rgb.size)
+    
+    def test_encrypt_decrypt_cycle(self):
+        """Test round trips for RGB/RGBA images with both permute units."""
+        rgba = np.random.randint(0, 256, (30, 40, 4), dtype=np.uint8)
+        for image in [self.rgb, rgba]:
+            for permute_unit in ['byte', 'pixel']:
+                for workers in [1, 3]:
+                    with self.subTest(channels=image.shape[2], permute_unit=permute_unit, workers=workers):
+                        encryptor = ImageEncryptor(
+                            expand_keystream(1, image.size), 7,
+                            permute_unit=permute_unit, workers=workers
+                        )
+                        encryptor.chunk_size = 100
+                        encrypted = encryptor.encrypt_image(image)
+                        
+                        self.assertEqual(encrypted.shape, image.shape)
+                        self.assertFalse(np.array_equal(encrypted, image))
+                        np.testing.assert_array_equal(encryptor.decrypt_image(encrypted), image)
+    
+    def test_byte_unit_matches_flat_encryption(self):
+        """Test that byte-unit encryption of H x W x C equals encrypting the flat bytes."""
+        encryptor = ImageEncryptor(self.keystream, 7)
+        np.testing.assert_array_equal(
+            encryptor.encrypt_image(self.rgb).ravel(),
+            encryptor.encrypt_image(self.rgb.ravel())
+        )
+    
+    def test_pixel_unit_moves_whole_pixels(self):
+        """Test that the pixel permutation keeps the channels of a pixel together."""
+        encryptor = ImageEncryptor(np.zeros(self.rgb.size, dtype=np.uint8), 7, permute_unit='pixel')
+        encrypted = encryptor.encrypt_image(self.rgb)
+        
+        permutation = generate_permutation(7, 30 * 40)
+        np.testing.assert_array_equal(encrypted.reshape(-1, 3), self.rgb.reshape(-1, 3)[permutation])
+    
+    def test_permute_unit_from_key(self):
+        """Test that the permute unit is read from the key options."""
+        key = create_key(self.rgb.shape, 7, keystream_seed=12345, options={'permute_unit': 'pixel'})
+        encryptor = create_encryptor(key)
+        
+        self.assertEqual(encryptor.permute_unit, 'pixel')
+        self.assertEqual(key['channels'], 3)
+        np.testing.assert_array_equal(encryptor.decrypt_image(encryptor.encrypt_image(self.rgb)), self.rgb)
+        
+        with self.assertRaises(ValueError):
+            create_encryptor(dict(key, options={'permute_unit': 'pixel', 'mode': 'tiled'}))
+        with self.assertRaises(ValueError):
+            ImageEncryptor(self.keystream, 7, permute_unit='channel')
+    
+    def test_load_and_save_color(self):
+        """Test that color images survive load/save without grayscale conversion."""
+        rgba = np.random.randint(0, 256, (30, 40, 4), dtype=np.uint8)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for image in [self.rgb, rgba, self.rgb[:, :, 0]]:
+                with self.subTest(shape=image.shape):
+                    path = os.path.join(temp_dir, 'image.png')
+                    save_image_array(image, path)
+                    np.testing.assert_array_equal(load_image(path), image)
+            
+            # Palette images are expanded to RGB
+            Image.fromarray(self.rgb).quantize(16).save(path)
+            self.assertEqual(load_image(path).shape, self.rgb.shape)
+            self.assertEqual(load_image_as_grayscale(path).shape, self.rgb.shape[:2])
+
+
+class TestDtypes(unittest.TestCase):
+    """Test cases for images with dtypes other than uint8."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.images = [
+            np.random.randint(0, 65536, (20, 30), dtype=np.uint16),
+            np.random.randint(0, 2 ** 32, (20, 30), dtype=np.uint32),
+            np.random.standard_normal((20, 30)).astype(np.float32),
+            np.random.randint(0, 65536, (20, 30, 3), dtype=np.uint16),
+        ]
+    
+    def test_encrypt_decrypt_cycle(self):
+        """Test that each dtype round-trips exactly with both permute units."""
+        for image in self.images:
+            for permute_unit in ['byte', 'pixel']:
+                with self.subTest(dtype=image.dtype, shape=image.shape, permute_unit=permute_unit):
+                    encryptor = ImageEncryptor(
+                        expand_keystream(5, image.nbytes), 9, permute_unit=permute_unit
+                    )
+                    encryptor.chunk_size = 128
+                    encrypted = encryptor.encrypt_image(image)
+                    decrypted = encryptor.decrypt_image(encrypted)
+                    
+                    self.assertEqual(encrypted.dtype, image.dtype)
+                    self.assertNotEqual(encrypted.tobytes(), image.tobytes())
+                    self.assertEqual(decrypted.dtype, image.dtype)
+                    self.assertEqual(decrypted.tobytes(), image.tobytes())
+    
+    def test_xor_covers_every_byte(self):
+        """Test that XOR is applied to the raw bytes, including high bytes."""
+        image = np.zeros((4, 5), dtype=np.uint16)
+        keystream = np.full(image.nbytes, 0xAB, dtype=np.uint8)
+        encrypted = ImageEncryptor(keystream, 1).encrypt_image(image)
+        
+        np.testing.assert_array_equal(encrypted, np.full(image.shape, 0xABAB, dtype=np.uint16))
+    
+    def test_float_bit_patterns_preserved(self):
+        """Test that NaN payloads and signed zeros survive encryption."""
+        image = np.array([[np.nan, -0.0], [np.inf, 1.5]], dtype=np.float32)
+        image.view(np.uint32)[0, 0] |= 0x1234
+        encryptor = ImageEncryptor(expand_keystream(1, image.nbytes), 3)
+        
+        decrypted = encryptor.decrypt_image(encryptor.encrypt_image(image))
+        self.assertEqual(decrypted.tobytes(), image.tobytes())
+    
+    def test_keystream_length_in_bytes(self):
+        """Test that keystreams are sized in bytes and keys expand accordingly."""
+        image = self.images[0]
+        with self.assertRaises(ValueError):
+            ImageEncryptor(expand_keystream(5, image.size), 9).encrypt_image(image)
+        
+        key = create_key(image.shape, 9, keystream_seed=5, dtype=image.dtype)
+        encryptor = ImageEncryptor.from_key(key)
+        self.assertEqual(len(encryptor.keystream), image.nbytes)
+        np.testing.assert_array_equal(encryptor.decrypt_image(encryptor.encrypt_image(image)), image)
+    
+    def test_load_and_save_exact_dtypes(self):
+        """Test lossless 16-bit PNG and 32-bit TIFF files."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for image, name in zip(self.images[:3], ['u16.png', 'u32.tiff', 'f32.tif']):
+                with self.subTest(dtype=image.dtype):
+                    path = os.path.join(temp_dir, name)
+                    save_image_array(image, path)
+                    loaded = load_image(path)
+                    
+                    self.assertEqual(loaded.dtype.itemsize, image.dtype.itemsize)
+                    self.assertEqual(loaded.tobytes(), image.tobytes())
+            
+            with self.assertRaises(ValueError):
+                save_image_array(self.images[2], os.path.join(temp_dir, 'f32.png'))
+    
+    def test_unsupported_arrays_rejected(self):
+        """Test that arrays no image file stores exactly raise instead of truncating."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for array, name in [
+                (np.array([[1000.5, 3.0], [-2.0, 5.0]]), 'f64.tiff'),
+                (np.array([[-1000, 3], [2, 5]], dtype=np.int16), 'i16.tiff'),
+                (self.images[3], 'u16_rgb.png'),
+                (self.images[3], 'u16_rgb.tiff'),
+            ]:
+                with self.subTest(dtype=array.dtype, name=name):
+                    with self.assertRaises(ValueError):
+                        save_image_array(array, os.path.join(temp_dir, name))
+                    with self.assertRaises(ValueError):
+                        array_to_image_bytes(array, image_format='TIFF')
+                    self.assertEqual(os.listdir(temp_dir), [])
+        
+        with self.assertRaises(ValueError):
+            check_image_format((20, 30, 3), np.uint16, 'PNG')
+        with self.assertRaises(ValueError):
+            check_image_format((20, 30), np.float32, 'PNG')
+        check_image_format((20, 30), np.float32, 'TIFF')
+        check_image_format((20, 30, 4), np.uint8, 'PNG')
+    
+    def test_big_endian_16bit_round_trip(self):
+        """Test big-endian 16-bit sources through PNG ciphertext."""
+        values = np.arange(0, 37 * 12, 37).reshape(3, 4)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source_path = os.path.join(temp_dir, 'big_endian.tiff')
+            source = Image.new('I;16B', (4, 3))
+            source.putdata(values.ravel().tolist())
+            source.save(source_path)
+            
+            image = load_image(source_path)
+            np.testing.assert_array_equal(image, values)
+            self.assertTrue(image.dtype.isnative)
+            self.assertEqual(probe_image(source_path)['dtype'], image.dtype)
+            
+            # Keys recorded for a big-endian array read PNG values back too
+            cipher_path = os.path.join(temp_dir, 'encrypted.png')
+            for dtype in [image.dtype, np.dtype('>u2')]:
+                with self.subTest(dtype=dtype.str):
+                    plain = image.astype(dtype)
+                    key = create_key(plain.shape, 4, keystream_seed=8, dtype=dtype)
+                    encryptor = ImageEncryptor.from_key(key)
+                    save_image_array(encryptor.encrypt_image(plain), cipher_path, role='ciphertext')
+                    
+                    encrypted = load_ciphertext(cipher_path, key)
+                    np.testing.assert_array_equal(encryptor.decrypt_image(encrypted), values)
+
+
+class TestOutputPolicy(unittest.TestCase):
+    """Test cases for role-dependent image encoding."""
+    
+    def test_ciphertext_png_round_trip(self):
+        """Test that uncompressed ciphertext PNGs decode exactly."""
+        arrays = [
+            np.random.randint(0, 256, (31, 17), dtype=np.uint8),
+            np.random.randint(0, 256, (31, 17, 2), dtype=np.uint8),
+            np.random.randint(0, 256, (31, 17, 3), dtype=np.uint8),
+            np.random.randint(0, 256, (31, 17, 4), dtype=np.uint8),
+            np.random.randint(0, 65536, (31, 17), dtype=np.uint16),
+        ]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'encrypted.png')
+            for array in arrays:
+                with self.subTest(shape=array.shape, dtype=array.dtype):
+                    data = array_to_image_bytes(array, role='ciphertext')
+                    Image.open(io.BytesIO(data)).verify()
+                    np.testing.assert_array_equal(load_image(data), array)
+                    
+                    save_image_array(array, path, role='ciphertext')
+                    self.assertEqual(load_image(path).dtype, array.dtype)
+                    np.testing.assert_array_equal(load_image(path), array)
+    
+    def test_plaintext_is_compressed(self):
+        """Test that plaintext keeps compression while ciphertext is stored."""
+        gradient = np.tile(np.arange(256, dtype=np.uint8), (64, 1))
+        plaintext = array_to_image_bytes(gradient)
+        stored = array_to_image_bytes(gradient, role='ciphertext')
+        
+        self.assertLess(len(plaintext), gradient.nbytes // 4)
+        self.assertGreater(len(stored), gradient.nbytes)
+        self.assertLess(len(array_to_image_bytes(gradient, role='ciphertext', compress_level=9)),
+                        gradient.nbytes // 4)
+    
+    def test_other_formats(self):
+        """Test uncompressed TIFF/BMP output and role validation."""
+        array = np.random.randint(0, 256, (20, 30, 3), dtype=np.uint8)
+        for image_format in ['TIFF', 'BMP']:
+            with self.subTest(image_format=image_format):
+                data = array_to_image_bytes(array, role='ciphertext', image_format=image_format)
+                np.testing.assert_array_equal(load_image(data), array)
+        
+        with self.assertRaises(ValueError):
+            array_to_image_bytes(array, role='preview')
+
+
+class TestImageProbing(unittest.TestCase):
+    """Test cases for header-only probing and key validation."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.gray = np.random.randint(0, 256, (30, 40), dtype=np.uint8)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def save(self, array, name, **kwargs):
+        path = os.path.join(self.temp_dir.name, name)
+        if isinstance(array, Image.Image):
+            array.save(path, **kwargs)
+        else:
+            save_image_array(array, path)
+        return path
+    
+    def test_probe_matches_load_image(self):
+        """Test that probed shape and dtype match what load_image returns."""
+        rgb = np.random.randint(0, 256, (30, 40, 3), dtype=np.uint8)
+        paths = [
+            self.save(self.gray, 'gray.png'),
+            self.save(rgb, 'rgb.png'),
+            self.save(np.random.randint(0, 256, (30, 40, 4), dtype=np.uint8), 'rgba.png'),
+            self.save(Image.fromarray(rgb).quantize(8), 'palette.png'),
+            self.save(Image.fromarray(self.gray).convert('1'), 'bilevel.png'),
+            self.save(np.random.randint(0, 65536, (30, 40), dtype=np.uint16), 'deep.png'),
+            self.save(np.random.standard_normal((30, 40)).astype(np.float32), 'float.tif'),
+            self.save(Image.fromarray(rgb), 'photo.jpg'),
+        ]
+        for path in paths:
+            with self.subTest(path=os.path.basename(path)):
+                info = probe_image(path)
+                loaded = load_image(path)
+                
+                self.assertEqual(info['shape'], loaded.shape)
+                self.assertEqual(info['dtype'], loaded.dtype)
+                self.assertEqual((info['height'], info['width']), (30, 40))
+                with open(path, 'rb') as f:
+                    self.assertEqual(probe_image(f.read())['shape'], loaded.shape)
+    
+    def test_probe_does_not_decode(self):
+        """Test that probing only needs the header of a file."""
+        with open(self.save(np.zeros((500, 600), dtype=np.uint8), 'big.png'), 'rb') as f:
+            header = f.read(64)
+        
+        info = probe_image(header)
+        self.assertEqual(info['shape'], (500, 600))
+        self.assertEqual(info['bit_depth'], 8)
+    
+    def test_probe_container(self):
+        """Test probing ciphertext containers."""
+        path = os.path.join(self.temp_dir.name, 'image.enc.qsc')
+        write_container(path, np.zeros((12, 13, 3), dtype=np.uint16))
+        
+        info = probe_image(path)
+        self.assertEqual(info['format'], 'QISC')
+        self.assertEqual(info['shape'], (12, 13, 3))
+        self.assertEqual(info['dtype'], np.dtype(np.uint16))
+    
+    def test_check_image_for_key(self):
+        """Test validation of probed images against key metadata."""
+        info = probe_image(self.save(self.gray, 'gray.png'))
+        rgb_info = probe_image(self.save(np.zeros((30, 40, 3), dtype=np.uint8), 'rgb.png'))
+        
+        self.assertEqual(check_image_for_key(info, create_key((30, 40), 1, keystream_seed=1)), 'exact')
+        self.assertEqual(check_image_for_key(rgb_info, create_key((30, 40), 1, keystream_seed=1)), 'grayscale')
+        # Same number of bytes in a different layout is still a mismatch
+        with self.assertRaises(ValueError):
+            check_image_for_key(info, create_key((40, 30), 1, keystream_seed=1))
+        with self.assertRaises(ValueError):
+            check_image_for_key(rgb_info, create_key((30, 60), 1, keystream_seed=1, dtype=np.uint16))
+        with self.assertRaises(ValueError):
+            check_image_for_key(info, create_key((64, 64), 1, keystream_seed=1))
+        with self.assertRaises(ValueError):
+            check_image_for_key(info, create_key((30, 40), 1, keystream_seed=1, dtype=np.uint16))
+    
+    def test_load_ciphertext(self):
+        """Test decoding a validated ciphertext in the key's layout."""
+        key = create_key((30, 40), 5, keystream_seed=9, options={'permutation_rng': 'pcg64'})
+        encryptor = ImageEncryptor.from_key(key)
+        encrypted = encryptor.encrypt_image(self.gray)
+        png_path = self.save(encrypted, 'encrypted.png')
+        container_path = os.path.join(self.temp_dir.name, 'encrypted.qsc')
+        write_container(container_path, encrypted, key)
+        
+        for source in [png_path, container_path]:
+            with self.subTest(source=os.path.basename(source)):
+                loaded = load_ciphertext(source, key)
+                np.testing.assert_array_equal(encryptor.decrypt_image(loaded), self.gray)
+                
+                with self.assertRaises(ValueError):
+                    load_ciphertext(source, create_key((10, 10), 5, keystream_seed=9))
+    
+    def test_load_preview(self):
+        """Test that previews are bounded and JPEG previews use draft decoding."""
+        jpeg = self.save(Image.fromarray(np.zeros((800, 1200, 3), dtype=np.uint8)), 'photo.jpg')
+        preview = load_preview(jpeg, max_size=(150, 100))
+        
+        self.assertLessEqual(preview.width, 150)
+        self.assertLessEqual(preview.height, 100)
+        self.assertLessEqual(load_preview(self.save(self.gray, 'gray.png'), (20, 20)).width, 20)
+
 if __name__ == '__main__':
     unittest.main()
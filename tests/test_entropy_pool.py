@@ -0,0 +1,97 @@
+"""
+Tests for Entropy Pool module
+"""
+
+import unittest
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path to import from root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from entropy_pool import EntropyPool
+from quantum_key_generator import QuantumKeyGenerator, generate_quantum_key
+
+
+class TestEntropyPool(unittest.TestCase):
+    """Test cases for EntropyPool class."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.pool = EntropyPool(
+            QuantumKeyGenerator(seed=42),
+            capacity=256,
+            low_water=64,
+            refill_chunk=64
+        )
+    
+    def tearDown(self):
+        """Stop the background refill thread."""
+        self.pool.close()
+    
+    def test_generate_keystream(self):
+        """Test keystream generation from the pool."""
+        keystream = self.pool.generate_keystream(100)
+        
+        self.assertEqual(len(keystream), 100)
+        self.assertEqual(keystream.dtype, np.uint8)
+    
+    def test_stream_matches_generator_chunks(self):
+        """Test that the pool serves harvested chunks in FIFO order."""
+        served = np.concatenate([
+            self.pool.generate_keystream(50),
+            self.pool.generate_keystream(200),
+            self.pool.generate_keystream(70),
+        ])
+        
+        generator = QuantumKeyGenerator(seed=42)
+        expected = np.concatenate([generator.generate_keystream(64) for _ in range(5)])
+        
+        np.testing.assert_array_equal(served, expected[:len(served)])
+    
+    def test_request_larger_than_capacity(self):
+        """Test that oversized requests are served as the pool refills."""
+        keystream = self.pool.generate_keystream(1000)
+        
+        self.assertEqual(len(keystream), 1000)
+        self.assertLessEqual(self.pool.level, self.pool.capacity)
+    
+    def test_memory_is_bounded(self):
+        """Test that the pool never holds more than its capacity."""
+        self.pool.generate_keystream(1)
+        stats = self.pool.stats()
+        
+        self.assertLessEqual(stats['level'], stats['capacity'])
+        self.assertEqual(stats['bytes_served'], 1)
+    
+    def test_generate_quantum_key_from_pool(self):
+        """Test that the pool can be used as a key source."""
+        keystream, permutation_seed = generate_quantum_key(128, generator=self.pool)
+        
+        self.assertEqual(len(keystream), 128)
+        self.assertGreaterEqual(permutation_seed, 0)
+        self.assertLess(permutation_seed, 2 ** 32)
+    
+    def test_generate_random_bits(self):
+        """Test random bit generation from the pool."""
+        bits = self.pool.generate_random_bits(20)
+        
+        self.assertEqual(len(bits), 20)
+        self.assertTrue(np.all((bits == 0) | (bits == 1)))
+    
+    def test_closed_pool_raises(self):
+        """Test that a drained, closed pool refuses requests."""
+        self.pool.close()
+        
+        with self.assertRaises(RuntimeError):
+            self.pool.generate_keystream(self.pool.capacity + 1)
+    
+    def test_invalid_configuration(self):
+        """Test that inconsistent watermarks are rejected."""
+        with self.assertRaises(ValueError):
+            EntropyPool(capacity=100, low_water=80, refill_chunk=50, start=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
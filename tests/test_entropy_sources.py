@@ -0,0 +1,177 @@
+"""
+Tests for Entropy Sources module
+"""
+
+import unittest
+import numpy as np
+import os
+import sys
+import tempfile
+
+# Add parent directory to path to import from root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from entropy_sources import (
+    AerEntropySource,
+    EntropySource,
+    OSEntropySource,
+    ReplayEntropySource,
+    _memory_to_bits,
+    create_entropy_source,
+    record_entropy
+)
+from quantum_key_generator import QuantumKeyGenerator, bits_to_bytes, generate_quantum_seeds
+
+
+class CountingSource(EntropySource):
+    """Source producing 0, 1, 2, ... as bytes."""
+    
+    name = 'counting'
+    
+    def __init__(self):
+        self.next = 0
+    
+    def random_bytes(self, num_bytes):
+        values = (np.arange(self.next, self.next + num_bytes) % 256).astype(np.uint8)
+        self.next += num_bytes
+        return values
+
+
+class TestEntropySources(unittest.TestCase):
+    """Test cases for entropy source implementations."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_default_generator_uses_aer(self):
+        """Test that the default source reproduces seeded Aer harvesting."""
+        generator = QuantumKeyGenerator(seed=11)
+        source = AerEntropySource(seed=11)
+        
+        self.assertIsInstance(generator.source, AerEntropySource)
+        np.testing.assert_array_equal(generator.generate_random_bits(300), source.random_bits(300))
+        np.testing.assert_array_equal(generator.generate_keystream(40), source.random_bytes(40))
+    
+    def test_aer_methods(self):
+        """Test statevector and stabilizer simulation methods."""
+        for method in ['statevector', 'stabilizer']:
+            with self.subTest(method=method):
+                source = create_entropy_source(f'aer:{method}', seed=3)
+                bits = source.random_bits(1000)
+                
+                self.assertEqual(source.simulator.options.method, method)
+                self.assertEqual(len(bits), 1000)
+                self.assertTrue(np.all((bits == 0) | (bits == 1)))
+                self.assertGreater(bits.mean(), 0.4)
+                self.assertLess(bits.mean(), 0.6)
+    
+    def test_wide_stabilizer_circuits(self):
+        """Test wide circuits harvest the same bit count in fewer jobs."""
+        narrow = AerEntropySource(seed=4, method='stabilizer')
+        wide = create_entropy_source('aer:stabilizer:500', seed=4)
+        narrow_bits = narrow.random_bits(20000)
+        wide_bits = wide.random_bits(20000)
+        
+        self.assertEqual(wide.num_qubits, 500)
+        self.assertEqual(len(wide_bits), 20000)
+        self.assertTrue(np.all((wide_bits == 0) | (wide_bits == 1)))
+        self.assertGreater(wide_bits.mean(), 0.45)
+        self.assertLess(wide_bits.mean(), 0.55)
+        self.assertLessEqual(wide._jobs_run, narrow._jobs_run)
+        self.assertEqual(len(narrow_bits), 20000)
+        
+        with self.assertRaises(ValueError):
+            AerEntropySource(num_qubits=0)
+    
+    def test_memory_decoding_qubit_order(self):
+        """Test that decoded shots list qubit 0 first."""
+        from qiskit import QuantumCircuit
+        
+        # X on qubits 0 and 9 of a 12-qubit register
+        circuit = QuantumCircuit(12, 12)
+        circuit.x([0, 9])
+        circuit.measure(range(12), range(12))
+        source = AerEntropySource(seed=1)
+        memory = source.simulator.run(circuit, shots=2, memory=True).result().data(0)['memory']
+        
+        expected = np.zeros(12, dtype=np.uint8)
+        expected[[0, 9]] = 1
+        np.testing.assert_array_equal(_memory_to_bits(memory, 12), np.tile(expected, 2))
+    
+    def test_bits_and_bytes_agree(self):
+        """Test that the default conversions pack bits MSB first."""
+        bits = CountingSource().random_bits(20)
+        np.testing.assert_array_equal(bits_to_bytes(bits), [0, 1, 2 & 0xF0])
+    
+    def test_generator_delegates_to_source(self):
+        """Test that keys and seeds come from a custom source."""
+        generator = QuantumKeyGenerator(source=CountingSource())
+        
+        np.testing.assert_array_equal(generator.generate_keystream(4), [0, 1, 2, 3])
+        self.assertEqual(generator.generate_permutation_seed(), 0x04050607)
+        keystream_seed, permutation_seed = generate_quantum_seeds(source=CountingSource())
+        self.assertEqual(keystream_seed, int.from_bytes(bytes(range(32)), 'big'))
+        self.assertEqual(permutation_seed, 0x20212223)
+        
+        with self.assertRaises(ValueError):
+            QuantumKeyGenerator(source=CountingSource(), bulk=False)
+    
+    def test_replay_source(self):
+        """Test recording bytes and replaying them sequentially."""
+        path = os.path.join(self.temp_dir.name, 'entropy.bin')
+        record_entropy(CountingSource(), path, 100, chunk_bytes=30)
+        
+        source = ReplayEntropySource(path)
+        np.testing.assert_array_equal(source.random_bytes(10), np.arange(10))
+        np.testing.assert_array_equal(source.random_bits(12), np.unpackbits(np.array([10, 11], np.uint8))[:12])
+        self.assertEqual(source.remaining, 88)
+        
+        with self.assertRaises(RuntimeError):
+            source.random_bytes(89)
+        np.testing.assert_array_equal(ReplayEntropySource(path, offset=98).random_bytes(2), [98, 99])
+    
+    def test_replay_offset_persists(self):
+        """Test that successive sources never return overlapping bytes."""
+        path = os.path.join(self.temp_dir.name, 'entropy.bin')
+        record_entropy(CountingSource(), path, 100)
+        
+        first = ReplayEntropySource(path)
+        np.testing.assert_array_equal(first.random_bytes(30), np.arange(30))
+        # A restarted service, and a second consumer of the same file
+        second = create_entropy_source('replay:' + path)
+        np.testing.assert_array_equal(second.random_bytes(30), np.arange(30, 60))
+        np.testing.assert_array_equal(first.random_bytes(10), np.arange(60, 70))
+        self.assertEqual(second.remaining, 30)
+        
+        # An explicit offset cannot go back to used bytes
+        np.testing.assert_array_equal(ReplayEntropySource(path, offset=0).random_bytes(5), np.arange(70, 75))
+        with open(path + '.offset') as f:
+            self.assertEqual(int(f.read()), 75)
+    
+    def test_replay_recorded_quantum_bits(self):
+        """Test that a replayed recording matches the generator that made it."""
+        path = os.path.join(self.temp_dir.name, 'quantum.bin')
+        record_entropy(QuantumKeyGenerator(seed=21), path, 64)
+        
+        replayed = QuantumKeyGenerator(source=create_entropy_source('replay:' + path))
+        np.testing.assert_array_equal(
+            replayed.generate_keystream(64), QuantumKeyGenerator(seed=21).generate_keystream(64)
+        )
+    
+    def test_os_source(self):
+        """Test the os.urandom source."""
+        source = create_entropy_source('os')
+        
+        self.assertIsInstance(source, OSEntropySource)
+        self.assertEqual(len(source.random_bytes(1000)), 1000)
+        self.assertEqual(len(source.random_bits(13)), 13)
+        with self.assertRaises(ValueError):
+            create_entropy_source('dice')
+
+
+if __name__ == '__main__':
+    unittest.main()
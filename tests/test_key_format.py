@@ -0,0 +1,121 @@
+"""
+Tests for Key File Format module
+"""
+
+import unittest
+import numpy as np
+import io
+import os
+import sys
+import tempfile
+
+# Add parent directory to path to import from root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from key_format import KEY_ID_BYTES, create_key, encode_key, decode_key, key_id, save_key, load_key
+from image_encryptor import ImageEncryptor
+from quantum_key_generator import generate_quantum_key, generate_quantum_seeds
+
+
+class TestKeyFormat(unittest.TestCase):
+    """Test cases for compact and legacy key files."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.image = np.random.randint(0, 256, (48, 64), dtype=np.uint8)
+        keystream_seed, permutation_seed = generate_quantum_seeds(seed=42)
+        self.key = create_key(
+            self.image.shape,
+            permutation_seed,
+            keystream_seed=keystream_seed
+        )
+    
+    def test_compact_round_trip(self):
+        """Test that a seed-expanded key survives encode/decode."""
+        decoded = decode_key(encode_key(self.key))
+        
+        self.assertEqual(decoded['algorithm'], 'seed-expanded')
+        self.assertEqual(decoded['keystream_seed'], self.key['keystream_seed'])
+        self.assertEqual(decoded['permutation_seed'], self.key['permutation_seed'])
+        self.assertEqual(decoded['shape'], (48, 64))
+        self.assertEqual(decoded['dtype'], np.uint8)
+        self.assertEqual(decoded['channels'], 1)
+        self.assertIsNone(decoded['keystream'])
+    
+    def test_compact_key_is_small(self):
+        """Test that the compact key does not grow with the image."""
+        large_key = create_key((4000, 4000), 1, keystream_seed=2 ** 255)
+        
+        self.assertLess(len(encode_key(large_key)), 128)
+    
+    def test_raw_keystream_round_trip(self):
+        """Test that full keystreams can also be stored."""
+        keystream, permutation_seed = generate_quantum_key(self.image.size, seed=42)
+        key = create_key(self.image.shape, permutation_seed, keystream=keystream)
+        
+        decoded = decode_key(encode_key(key))
+        
+        self.assertEqual(decoded['algorithm'], 'raw')
+        np.testing.assert_array_equal(decoded['keystream'], keystream)
+    
+    def test_encryptor_from_key_file(self):
+        """Test encryption with a key and decryption from the saved file."""
+        encrypted = ImageEncryptor.from_key(self.key).encrypt_image(self.image)
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            key_path = os.path.join(temp_dir, 'keys.qkey')
+            save_key(self.key, key_path)
+            decrypted = ImageEncryptor.from_key_file(key_path).decrypt_image(encrypted)
+        
+        np.testing.assert_array_equal(decrypted, self.image)
+    
+    def test_permutation_rng_option(self):
+        """Test that the permutation RNG recorded in the key is used."""
+        self.key['options']['permutation_rng'] = 'pcg64'
+        decoded = decode_key(encode_key(self.key))
+        
+        encryptor = ImageEncryptor.from_key(decoded)
+        
+        self.assertEqual(encryptor.permutation_rng, 'pcg64')
+        np.testing.assert_array_equal(
+            encryptor.decrypt_image(encryptor.encrypt_image(self.image)),
+            self.image
+        )
+    
+    def test_legacy_npz_fallback(self):
+        """Test that .npz key files written by earlier versions still load."""
+        keystream, permutation_seed = generate_quantum_key(self.image.size, seed=42)
+        encrypted = ImageEncryptor(keystream, permutation_seed).encrypt_image(self.image)
+        
+        buf = io.BytesIO()
+        np.savez_compressed(
+            buf,
+            xor_key=keystream,
+            permutation_key=permutation_seed,
+            shape=np.array(self.image.shape)
+        )
+        key = load_key(buf.getvalue())
+        
+        self.assertEqual(key['algorithm'], 'raw')
+        self.assertEqual(key['shape'], self.image.shape)
+        decrypted = ImageEncryptor.from_key(key).decrypt_image(encrypted)
+        np.testing.assert_array_equal(decrypted, self.image)
+    
+    def test_invalid_key_files(self):
+        """Test that unknown or truncated files are rejected."""
+        with self.assertRaises(ValueError):
+            load_key(b'not a key file')
+        with self.assertRaises(ValueError):
+            load_key(encode_key(self.key)[:-6])
+    
+    def test_key_id(self):
+        """Test that key ids are stable across serialization and differ per key."""
+        self.assertEqual(len(key_id(self.key)), KEY_ID_BYTES)
+        self.assertEqual(key_id(decode_key(encode_key(self.key))), key_id(self.key))
+        
+        other_key = dict(self.key, permutation_seed=self.key['permutation_seed'] + 1)
+        self.assertNotEqual(key_id(other_key), key_id(self.key))
+
+
+if __name__ == '__main__':
+    unittest.main()
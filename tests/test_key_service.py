@@ -0,0 +1,197 @@
+"""
+Tests for Key Service module
+"""
+
+import unittest
+import asyncio
+import numpy as np
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+
+# Add parent directory to path to import from root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from key_service import KeyService, KeyServiceBusy, KeyServiceClient, start_server
+from quantum_key_generator import QuantumKeyGenerator, bits_to_int
+
+
+class GatedGenerator:
+    """Key source that records harvest sizes and blocks until released."""
+    
+    def __init__(self):
+        self.lengths = []
+        self.gate = threading.Event()
+        self.started = threading.Event()
+        self._next = 0
+    
+    def generate_keystream(self, length):
+        self.lengths.append(length)
+        self.started.set()
+        self.gate.wait()
+        values = (np.arange(self._next, self._next + length) % 256).astype(np.uint8)
+        self._next += length
+        return values
+
+
+class FailingGenerator:
+    """Key source whose harvests always fail."""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    def generate_keystream(self, length):
+        self.calls += 1
+        raise RuntimeError("backend unavailable")
+
+
+class TestKeyService(unittest.TestCase):
+    """Test cases for KeyService class."""
+    
+    def test_concurrent_requests_are_coalesced(self):
+        """Test that requests queued during a harvest share the next one."""
+        generator = GatedGenerator()
+        
+        async def run():
+            async with KeyService(generator) as service:
+                first = asyncio.ensure_future(service.generate_keystream(10))
+                await asyncio.to_thread(generator.started.wait)
+                others = [asyncio.ensure_future(service.generate_keystream(n)) for n in (5, 20, 7)]
+                await asyncio.sleep(0)
+                self.assertEqual(service.pending, 3)
+                generator.gate.set()
+                return await first, await asyncio.gather(*others), service.stats()
+        
+        first, others, stats = asyncio.run(run())
+        self.assertEqual(generator.lengths, [10, 32])
+        self.assertEqual(stats['harvests'], 2)
+        self.assertEqual(stats['requests_served'], 4)
+        # Waiters get consecutive, disjoint slices of the shared harvest
+        np.testing.assert_array_equal(
+            np.concatenate([first] + others), np.arange(42, dtype=np.uint8)
+        )
+    
+    def test_batch_size_limit(self):
+        """Test that batches are split at max_batch_bytes."""
+        generator = GatedGenerator()
+        generator.gate.set()
+        
+        async def run():
+            async with KeyService(generator, max_batch_bytes=16, batch_window=0.01) as service:
+                return await asyncio.gather(*[service.generate_keystream(n) for n in (8, 8, 8, 40)])
+        
+        results = asyncio.run(run())
+        self.assertEqual([len(r) for r in results], [8, 8, 8, 40])
+        self.assertEqual(generator.lengths, [16, 8, 40])
+    
+    def test_backpressure(self):
+        """Test that a full queue rejects requests instead of growing."""
+        generator = GatedGenerator()
+        
+        async def run():
+            async with KeyService(generator, max_pending=2, max_request_bytes=100) as service:
+                first = asyncio.ensure_future(service.generate_keystream(1))
+                await asyncio.to_thread(generator.started.wait)
+                queued = [asyncio.ensure_future(service.generate_keystream(1)) for _ in range(2)]
+                await asyncio.sleep(0)
+                with self.assertRaises(KeyServiceBusy):
+                    await service.generate_keystream(1)
+                with self.assertRaises(ValueError):
+                    await service.generate_keystream(101)
+                generator.gate.set()
+                await asyncio.gather(first, *queued)
+                return service.stats()
+        
+        stats = asyncio.run(run())
+        self.assertEqual(stats['requests_rejected'], 1)
+        self.assertEqual(stats['requests_served'], 3)
+    
+    def test_seeds_match_generator_encoding(self):
+        """Test that seeds decode harvested bytes like QuantumKeyGenerator."""
+        async def run():
+            async with KeyService(QuantumKeyGenerator(seed=7)) as service:
+                return await service.generate_keystream_seed(), await service.generate_permutation_seed()
+        
+        keystream_seed, permutation_seed = asyncio.run(run())
+        generator = QuantumKeyGenerator(seed=7)
+        self.assertEqual(keystream_seed, bits_to_int(generator.generate_random_bits(256)))
+        self.assertEqual(permutation_seed, bits_to_int(generator.generate_random_bits(32)))
+
+
+class TestKeyServer(unittest.TestCase):
+    """Test cases for the HTTP server and client."""
+    
+    def serve(self, generator, client_calls, **server_args):
+        """Run ``client_calls(url)`` in a thread against a running server."""
+        async def run():
+            async with KeyService(generator) as service:
+                server = await start_server(service, port=0, **server_args)
+                async with server:
+                    if 'path' in server_args:
+                        url = 'unix://' + server_args['path']
+                    else:
+                        url = 'http://127.0.0.1:%d' % server.sockets[0].getsockname()[1]
+                    return await asyncio.to_thread(client_calls, url)
+        
+        return asyncio.run(run())
+    
+    def test_tcp_client(self):
+        """Test fetching keys over TCP with a reused connection."""
+        def calls(url):
+            with KeyServiceClient(url) as client:
+                keystream = client.generate_keystream(100)
+                seed = client.generate_keystream_seed()
+                bits = client.generate_random_bits(12)
+                return keystream, seed, bits, client.stats()
+        
+        keystream, seed, bits, stats = self.serve(QuantumKeyGenerator(seed=3), calls)
+        self.assertEqual(len(keystream), 100)
+        self.assertEqual(keystream.dtype, np.uint8)
+        self.assertLess(seed, 2 ** 256)
+        self.assertEqual(len(bits), 12)
+        self.assertEqual(stats['requests_served'], 3)
+    
+    def test_unix_socket_and_errors(self):
+        """Test the Unix socket transport and error responses."""
+        def calls(url):
+            client = KeyServiceClient(url)
+            keystream = client.generate_keystream(16)
+            with self.assertRaises(RuntimeError):
+                client._get('/unknown')
+            with self.assertRaises(RuntimeError):
+                client._get('/keystream?length=oops')
+            client.close()
+            return keystream
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'keys.sock')
+            keystream = self.serve(QuantumKeyGenerator(seed=3), calls, path=path)
+        self.assertEqual(len(keystream), 16)
+    
+    def test_generator_failure_returns_500(self):
+        """Test that a failed harvest is answered with 500 and not retried."""
+        def calls(url):
+            with KeyServiceClient(url, retries=3) as client:
+                with self.assertRaisesRegex(RuntimeError, '500.*backend unavailable'):
+                    client.generate_keystream(16)
+                return client.stats()
+        
+        generator = FailingGenerator()
+        stats = self.serve(generator, calls)
+        self.assertEqual(generator.calls, 1)
+        self.assertEqual(stats['requests_served'], 0)
+    
+    def test_client_does_not_import_qiskit(self):
+        """Test that workers using the client never load Qiskit."""
+        code = "import key_service, sys; print('qiskit' in sys.modules)"
+        output = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout
+        self.assertEqual(output.strip(), 'False')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+"""
+Tests for the qshield directory encryption CLI
+"""
+
+import unittest
+import numpy as np
+import os
+import sys
+import tempfile
+from PIL import Image
+
+# Add parent directory to path to import from root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import qshield
+from ciphertext_container import open_container
+from image_encryptor import load_image
+from key_format import load_key
+
+
+def _crashing_task(rel):
+    """Worker task that kills its process for items named 'crash'."""
+    if rel.startswith('crash'):
+        os._exit(1)
+    return {'source': rel, 'bytes_in': 1, 'bytes_out': 1}
+
+
+class TestDirectoryEncryption(unittest.TestCase):
+    """Test cases for encrypt_directory/decrypt_directory."""
+    
+    def setUp(self):
+        """Create a small directory tree of images."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.temp_dir.name, 'in')
+        self.encrypted_dir = os.path.join(self.temp_dir.name, 'enc')
+        self.decrypted_dir = os.path.join(self.temp_dir.name, 'dec')
+        os.makedirs(os.path.join(self.input_dir, 'nested'))
+        
+        self.images = {}
+        for index, rel in enumerate(['a.png', 'b.bmp', os.path.join('nested', 'c.png')]):
+            image = np.random.randint(0, 256, (20 + index, 30), dtype=np.uint8)
+            Image.fromarray(image).save(os.path.join(self.input_dir, rel))
+            self.images[rel] = image
+        rgb = np.random.randint(0, 256, (16, 12, 3), dtype=np.uint8)
+        Image.fromarray(rgb).save(os.path.join(self.input_dir, 'color.png'))
+        self.images['color.png'] = rgb
+        deep = np.random.randint(0, 65536, (10, 14), dtype=np.uint16)
+        Image.fromarray(deep).save(os.path.join(self.input_dir, 'deep.png'))
+        self.images['deep.png'] = deep
+        with open(os.path.join(self.input_dir, 'notes.txt'), 'w') as f:
+            f.write("not an image")
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def assert_round_trip(self):
+        for rel, image in self.images.items():
+            decrypted = load_image(
+                os.path.join(self.decrypted_dir, qshield.decrypted_name(rel))
+            )
+            self.assertEqual(decrypted.dtype, image.dtype)
+            np.testing.assert_array_equal(decrypted, image)
+    
+    def test_round_trip(self):
+        """Test encrypting and decrypting a tree, in-process and with a pool."""
+        for workers in [1, 2]:
+            with self.subTest(workers=workers):
+                stats = qshield.encrypt_directory(self.input_dir, self.encrypted_dir, workers=workers)
+                self.assertEqual(stats['processed'], 5)
+                self.assertEqual(stats['failed'], [])
+                self.assertGreater(stats['bytes_in'], 0)
+                
+                encrypted, _ = open_container(os.path.join(self.encrypted_dir, 'a.png.enc.qsc'))
+                self.assertFalse(np.array_equal(encrypted, self.images['a.png']))
+                del encrypted
+                
+                stats = qshield.decrypt_directory(self.encrypted_dir, self.decrypted_dir, workers=workers)
+                self.assertEqual(stats['processed'], 5)
+                self.assert_round_trip()
+                
+                self.temp_dir.cleanup()
+                self.setUp()
+    
+    def test_resume_skips_completed_files(self):
+        """Test that a restarted run only processes files missing from the manifest."""
+        qshield.encrypt_directory(self.input_dir, self.encrypted_dir, workers=1)
+        
+        # Simulate a run killed while recording the last file
+        manifest_path = os.path.join(self.encrypted_dir, qshield.MANIFEST_NAME)
+        with open(manifest_path) as f:
+            lines = f.readlines()
+        with open(manifest_path, 'w') as f:
+            f.writelines(lines[:-1])
+            f.write(lines[-1][:10])
+        
+        stats = qshield.encrypt_directory(self.input_dir, self.encrypted_dir, workers=1)
+        self.assertEqual(stats['skipped'], 4)
+        self.assertEqual(stats['processed'], 1)
+        self.assertEqual(qshield.read_manifest(self.encrypted_dir), set(self.images))
+        
+        qshield.decrypt_directory(self.encrypted_dir, self.decrypted_dir, workers=1)
+        self.assert_round_trip()
+    
+    def test_failures_are_retried(self):
+        """Test that a failing file is reported and not recorded as done."""
+        with open(os.path.join(self.input_dir, 'broken.png'), 'wb') as f:
+            f.write(b'not a png')
+        
+        stats = qshield.encrypt_directory(self.input_dir, self.encrypted_dir, workers=1)
+        self.assertEqual(stats['processed'], 5)
+        self.assertEqual([rel for rel, _ in stats['failed']], ['broken.png'])
+        self.assertNotIn('broken.png', qshield.read_manifest(self.encrypted_dir))
+    
+    def test_dead_worker_does_not_abort_run(self):
+        """Test that a worker dying mid-task fails only the pool's items."""
+        items = ['crash'] + ['item%02d' % i for i in range(20)]
+        stats = qshield._run_tasks(_crashing_task, items, self.encrypted_dir, 2)
+        
+        failed = [rel for rel, _ in stats['failed']]
+        self.assertIn('crash', failed)
+        self.assertEqual(stats['processed'] + len(failed), len(items))
+        self.assertGreater(stats['processed'], 0)
+        self.assertEqual(
+            qshield.read_manifest(self.encrypted_dir), set(items) - set(failed)
+        )
+    
+    def test_tiff_only_images_round_trip(self):
+        """Test that float32 and int32 TIFFs decrypt to TIFF files."""
+        images = {
+            'f.tiff': np.random.standard_normal((6, 7)).astype(np.float32),
+            'i.tif': np.random.randint(-2 ** 31, 2 ** 31, (5, 9), dtype=np.int32),
+        }
+        tiff_dir = os.path.join(self.temp_dir.name, 'tiff')
+        os.makedirs(tiff_dir)
+        for rel, image in images.items():
+            Image.fromarray(image).save(os.path.join(tiff_dir, rel))
+        
+        for mode in ['whole', 'tiled']:
+            with self.subTest(mode=mode):
+                encrypted_dir = os.path.join(self.temp_dir.name, 'enc-' + mode)
+                decrypted_dir = os.path.join(self.temp_dir.name, 'dec-' + mode)
+                qshield.encrypt_directory(tiff_dir, encrypted_dir, workers=1, mode=mode)
+                stats = qshield.decrypt_directory(encrypted_dir, decrypted_dir, workers=1)
+                self.assertEqual(stats['failed'], [])
+                for rel, image in images.items():
+                    key = load_key(os.path.join(encrypted_dir, rel + qshield.KEY_SUFFIX))
+                    self.assertEqual(qshield.decrypted_name(rel, key), rel)
+                    decrypted = load_image(os.path.join(decrypted_dir, rel))
+                    self.assertEqual(decrypted.dtype, image.dtype)
+                    np.testing.assert_array_equal(decrypted, image)
+    
+    def test_png_output_rejects_unsupported_images(self):
+        """Test that images PNG cannot hold fail before a key is written."""
+        src_path = os.path.join(self.temp_dir.name, 'float.tiff')
+        Image.fromarray(np.random.standard_normal((6, 7)).astype(np.float32)).save(src_path)
+        cipher_path = os.path.join(self.encrypted_dir, 'float.tiff.enc.png')
+        key_path = os.path.join(self.encrypted_dir, 'float.tiff.qkey')
+        
+        with self.assertRaises(ValueError):
+            qshield.encrypt_file(src_path, cipher_path, key_path, output_format='png')
+        self.assertFalse(os.path.exists(key_path))
+        self.assertFalse(os.path.exists(cipher_path))
+    
+    def test_nested_output_directory_is_excluded(self):
+        """Test that an output directory inside the input tree is not re-encrypted."""
+        nested_output = os.path.join(self.input_dir, 'encrypted')
+        qshield.encrypt_directory(self.input_dir, nested_output, workers=1)
+        stats = qshield.encrypt_directory(self.input_dir, nested_output, workers=1)
+        
+        self.assertEqual(stats['total'], 5)
+        self.assertEqual(stats['skipped'], 5)
+    
+    def test_main(self):
+        """Test the command line entry point."""
+        self.assertEqual(qshield.main(['encrypt', self.input_dir, self.encrypted_dir,
+                                       '--workers', '1', '--mode', 'tiled',
+                                       '--block-size', '64', '--format', 'png', '--quiet']), 0)
+        self.assertTrue(os.path.exists(os.path.join(self.encrypted_dir, 'a.png.enc.png')))
+        self.assertEqual(qshield.main(['decrypt', self.encrypted_dir, self.decrypted_dir,
+                                       '--workers', '1', '--quiet']), 0)
+        self.assert_round_trip()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,13 +4,22 @@ Tests for Quantum Key Generator module
 
 import unittest
 import numpy as np
+import subprocess
 import sys
 import os
 
 # Add parent directory to path to import from root
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from quantum_key_generator import QuantumKeyGenerator, generate_quantum_key
+from quantum_key_generator import (
+    CircuitCache,
+    QuantumKeyGenerator,
+    bits_to_bytes,
+    bits_to_int,
+    expand_keystream,
+    generate_quantum_key,
+    generate_quantum_seeds
+)
 
 
 class TestQuantumKeyGenerator(unittest.TestCase):
@@ -83,7 +92,223 @@ class TestQuantumKeyGenerator(unittest.TestCase):
         
         # Arrays should be different
         self.assertFalse(np.array_equal(keystream1, keystream2))
+    
+    def test_bulk_harvest_spans_multiple_shots(self):
+        """Test that bulk harvesting returns exactly the requested bits."""
+        num_bits = 10 * QuantumKeyGenerator.max_qubits_per_circuit + 7
+        bits = self.qkg.generate_random_bits(num_bits)
+        
+        self.assertEqual(len(bits), num_bits)
+        self.assertEqual(bits.dtype, np.uint8)
+        self.assertTrue(np.all((bits == 0) | (bits == 1)))
+    
+    def test_bulk_harvest_is_balanced(self):
+        """Test that every shot contributes bits with no outcome collapsing."""
+        bits = self.qkg.generate_random_bits(20000)
+        
+        # With per-shot memory, duplicate outcomes are kept, so the ones
+        # fraction stays close to 0.5 even for large requests
+        self.assertAlmostEqual(bits.mean(), 0.5, delta=0.02)
+    
+    def test_bulk_successive_calls_differ(self):
+        """Test that a seeded generator does not repeat bits across calls."""
+        bits1 = self.qkg.generate_random_bits(256)
+        bits2 = self.qkg.generate_random_bits(256)
+        
+        self.assertFalse(np.array_equal(bits1, bits2))
+    
+    def test_legacy_harvest_mode(self):
+        """Test that the legacy counts-based harvesting is still available."""
+        qkg1 = QuantumKeyGenerator(seed=123, bulk=False)
+        qkg2 = QuantumKeyGenerator(seed=123, bulk=False)
+        
+        bits1 = qkg1.generate_random_bits(64)
+        bits2 = qkg2.generate_random_bits(64)
+        
+        self.assertEqual(len(bits1), 64)
+        np.testing.assert_array_equal(bits1, bits2)
+
 
+class TestKeystreamExpansion(unittest.TestCase):
+    """Test cases for seed-expanded keystreams."""
+    
+    def test_generate_keystream_seed(self):
+        """Test that keystream seeds are 256-bit integers."""
+        seed = QuantumKeyGenerator(seed=42).generate_keystream_seed()
+        
+        self.assertIsInstance(seed, int)
+        self.assertGreaterEqual(seed, 0)
+        self.assertLess(seed, 2 ** 256)
+    
+    def test_expand_keystream_length(self):
+        """Test expansion to arbitrary lengths."""
+        for length in [0, 1, 31, 32, 33, 1000]:
+            keystream = expand_keystream(12345, length)
+            self.assertEqual(len(keystream), length)
+            self.assertEqual(keystream.dtype, np.uint8)
+    
+    def test_expand_keystream_is_deterministic(self):
+        """Test that the same seed always expands to the same keystream."""
+        np.testing.assert_array_equal(
+            expand_keystream(2 ** 200 + 7, 500),
+            expand_keystream(2 ** 200 + 7, 500)
+        )
+        self.assertFalse(np.array_equal(
+            expand_keystream(1, 500),
+            expand_keystream(2, 500)
+        ))
+    
+    def test_expand_keystream_is_seekable(self):
+        """Test that any byte range can be produced without the prefix."""
+        full = expand_keystream(98765, 4096)
+        
+        for offset, length in [(0, 10), (1, 31), (32, 64), (45, 1000), (4000, 96)]:
+            with self.subTest(offset=offset, length=length):
+                np.testing.assert_array_equal(
+                    expand_keystream(98765, length, offset=offset),
+                    full[offset:offset + length]
+                )
+    
+    def test_generate_quantum_seeds(self):
+        """Test that seeds are reproducible with a fixed simulator seed."""
+        self.assertEqual(generate_quantum_seeds(seed=42), generate_quantum_seeds(seed=42))
+        
+        keystream_seed, permutation_seed = generate_quantum_seeds(seed=42)
+        self.assertLess(keystream_seed, 2 ** 256)
+        self.assertLess(permutation_seed, 2 ** 32)
+
+
+def _legacy_keystream(bits, length):
+    """Pack bits one byte at a time, as generate_keystream originally did."""
+    keystream = np.zeros(length, dtype=np.uint8)
+    for i in range(length):
+        byte_bits = bits[i*8:(i+1)*8]
+        keystream[i] = int(''.join(map(str, byte_bits)), 2)
+    return keystream
+
+
+class TestBitPacking(unittest.TestCase):
+    """Regression tests for the vectorized bit packing helpers."""
+    
+    def test_keystream_matches_legacy_packing(self):
+        """Test byte-for-byte equality with the string-join packing."""
+        for seed in [0, 42, 123]:
+            with self.subTest(seed=seed):
+                bits = QuantumKeyGenerator(seed=seed).generate_random_bits(8 * 500)
+                np.testing.assert_array_equal(
+                    bits_to_bytes(bits),
+                    _legacy_keystream(bits, 500)
+                )
+    
+    def test_generate_keystream_matches_legacy_packing(self):
+        """Test that generate_keystream packs the same bits the legacy way."""
+        bits = QuantumKeyGenerator(seed=7).generate_random_bits(8 * 64)
+        keystream = QuantumKeyGenerator(seed=7).generate_keystream(64)
+        
+        np.testing.assert_array_equal(keystream, _legacy_keystream(bits, 64))
+    
+    def test_permutation_seed_matches_legacy_packing(self):
+        """Test that integer packing matches int(''.join(bits), 2)."""
+        for seed in [0, 42, 123]:
+            with self.subTest(seed=seed):
+                bits = QuantumKeyGenerator(seed=seed).generate_random_bits(32)
+                self.assertEqual(bits_to_int(bits), int(''.join(map(str, bits)), 2))
+        
+        # Lengths that are not a multiple of 8 are not zero-padded
+        self.assertEqual(bits_to_int(np.array([1, 0, 1])), 5)
+    
+    def test_legacy_bits_pack_identically(self):
+        """Test packing of bits from the legacy harvesting mode."""
+        bits = QuantumKeyGenerator(seed=42, bulk=False).generate_random_bits(8 * 32)
+        np.testing.assert_array_equal(bits_to_bytes(bits), _legacy_keystream(bits, 32))
+
+
+class TestCircuitCache(unittest.TestCase):
+    """Test cases for the shared simulator and circuit cache."""
+    
+    def setUp(self):
+        """Set up a private cache for each test."""
+        self.cache = CircuitCache()
+    
+    def test_generators_share_simulator_and_circuits(self):
+        """Test that a second generator does not transpile again."""
+        first = QuantumKeyGenerator(seed=1, circuit_cache=self.cache)
+        first.generate_random_bits(100)
+        second = QuantumKeyGenerator(seed=2, circuit_cache=self.cache)
+        second.generate_random_bits(100)
+        second.generate_random_bits(100)
+        
+        self.assertIs(first.simulator, second.simulator)
+        stats = self.cache.stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['circuits'], 1)
+        self.assertAlmostEqual(stats['hit_rate'], 2 / 3)
+    
+    def test_keyed_by_backend_options(self):
+        """Test that different backend options get their own entries."""
+        default = QuantumKeyGenerator(circuit_cache=self.cache)
+        statevector = QuantumKeyGenerator(circuit_cache=self.cache, backend_options={'method': 'statevector'})
+        
+        self.assertIsNot(default.simulator, statevector.simulator)
+        self.assertIsNot(
+            self.cache.get_harvest_circuit(4),
+            self.cache.get_harvest_circuit(4, {'method': 'statevector'})
+        )
+        self.assertEqual(self.cache.stats()['simulators'], 2)
+    
+    def test_warm_up(self):
+        """Test that requests after warm-up are all cache hits."""
+        self.cache.warm_up()
+        misses = self.cache.stats()['misses']
+        
+        generator = QuantumKeyGenerator(seed=3, circuit_cache=self.cache)
+        generator.generate_keystream(64)
+        generator.generate_permutation_seed()
+        
+        self.assertEqual(self.cache.stats()['misses'], misses)
+    
+    def test_warm_up_without_widths(self):
+        """Test that warming up no widths only creates the simulator."""
+        self.cache.warm_up(widths=[])
+        self.assertEqual(self.cache.stats()['simulators'], 1)
+        self.assertEqual(self.cache.stats()['circuits'], 0)
+    
+    def test_legacy_path_uses_cache(self):
+        """Test that legacy harvesting reuses circuits and keeps its output."""
+        generator = QuantumKeyGenerator(seed=5, bulk=False, circuit_cache=self.cache)
+        bits = generator.generate_random_bits(4500)
+        
+        self.assertEqual(self.cache.stats()['misses'], 1)
+        np.testing.assert_array_equal(
+            bits, QuantumKeyGenerator(seed=5, bulk=False, circuit_cache=CircuitCache()).generate_random_bits(4500)
+        )
+
+
+class TestLazyImports(unittest.TestCase):
+    """Test that heavy dependencies are only loaded on first use."""
+    
+    def loaded_after(self, code):
+        """Run ``code`` in a fresh interpreter and return the heavy modules it loaded."""
+        report = "\nimport sys; print(' '.join(m for m in ('qiskit', 'matplotlib', 'scipy') if m in sys.modules))"
+        return subprocess.run(
+            [sys.executable, '-c', code + report], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout.split()
+    
+    def test_decrypt_and_analysis_imports_are_light(self):
+        """Test that decrypt-only and analysis-only imports skip Qiskit, matplotlib and SciPy."""
+        self.assertEqual(self.loaded_after("import quantum_key_generator, image_encryptor, qshield"), [])
+        self.assertEqual(self.loaded_after("import image_analysis"), [])
+    
+    def test_heavy_modules_load_on_use(self):
+        """Test that Qiskit and SciPy are imported when they are needed."""
+        code = (
+            "import numpy as np, quantum_key_generator, image_analysis\n"
+            "quantum_key_generator.QuantumKeyGenerator(seed=1).generate_keystream(2)\n"
+            "image_analysis.calculate_entropy(np.arange(256, dtype=np.uint8))"
+        )
+        self.assertEqual(self.loaded_after(code), ['qiskit', 'scipy'])
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,134 @@
+"""
+Tests for Randomness Tests module
+"""
+
+import unittest
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path to import from root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from entropy_pool import EntropyPool
+from entropy_sources import AerEntropySource
+from quantum_key_generator import QuantumKeyGenerator
+from randomness_tests import (
+    RandomnessTestSuite,
+    check_entropy_source,
+    format_results,
+    run_randomness_tests
+)
+
+
+def parse_bits(text):
+    return np.array([int(c) for c in text], dtype=np.uint8)
+
+
+class ConstantSource:
+    """Source returning only ones."""
+    
+    def random_bits(self, num_bits):
+        return np.ones(num_bits, dtype=np.uint8)
+
+
+class TestRandomnessTests(unittest.TestCase):
+    """Test cases for the NIST SP 800-22 test subset."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.bits = np.random.default_rng(7).integers(0, 2, 300000, dtype=np.uint8)
+    
+    def test_nist_examples(self):
+        """Test against the worked examples of NIST SP 800-22."""
+        longest_run_sample = (
+            '11001100000101010110110001001100111000000000001001001101010100010001'
+            '001111010110100000001101011111001100111001101101100010110010'
+        )
+        examples = [
+            ('frequency', '1011010101', {}, [0.527089]),
+            ('block_frequency', '0110011010', {'block_size': 3}, [0.801252]),
+            ('runs', '1001101011', {}, [0.147232]),
+            ('longest_run', longest_run_sample, {'longest_run_block': 8}, [0.180609]),
+            ('serial', '0011011101', {'serial_m': 3}, [0.808792, 0.670320]),
+            ('approximate_entropy', '0100110101', {'apen_m': 3}, [0.261961]),
+        ]
+        for name, text, options, expected in examples:
+            with self.subTest(test=name):
+                options = {'serial_m': 2, 'apen_m': 1, **options}
+                result = run_randomness_tests(parse_bits(text), **options)['tests'][name]
+                # The published longest run p-value is only accurate to about 1e-5
+                np.testing.assert_allclose(result['p_values'], expected, atol=2e-5)
+    
+    def test_chunking_does_not_change_results(self):
+        """Test that streamed chunks give the same results as one sample."""
+        expected = run_randomness_tests(self.bits)
+        
+        suite = RandomnessTestSuite()
+        start = 0
+        for size in [1, 2, 3, 15, 127, 9999, 100003]:
+            suite.update(self.bits[start:start + size])
+            start += size
+        suite.update(self.bits[start:])
+        self.assertEqual(suite.results(), expected)
+        
+        suite = RandomnessTestSuite()
+        suite.update_bytes(np.packbits(self.bits[:299992]).tobytes())
+        self.assertEqual(suite.results(), run_randomness_tests(self.bits[:299992]))
+    
+    def test_random_bits_pass(self):
+        """Test that uniformly random bits pass every test."""
+        results = run_randomness_tests(self.bits, alpha=0.001)
+        
+        self.assertTrue(results['passed'])
+        self.assertEqual(results['num_bits'], 300000)
+        self.assertEqual(
+            set(results['tests']),
+            {'frequency', 'block_frequency', 'runs', 'longest_run', 'serial', 'approximate_entropy'}
+        )
+        self.assertIn('PASS', format_results(results))
+    
+    def test_defects_are_detected(self):
+        """Test that biased, periodic and sticky bits fail."""
+        rng = np.random.default_rng(8)
+        biased = (rng.random(100000) < 0.52).astype(np.uint8)
+        periodic = np.tile(rng.integers(0, 2, 64, dtype=np.uint8), 1600)
+        # Each bit repeats the previous one 60% of the time
+        sticky = np.cumsum(rng.random(100000) < 0.4) % 2
+        
+        results = run_randomness_tests(biased)
+        self.assertFalse(results['tests']['frequency']['passed'])
+        results = run_randomness_tests(periodic)
+        self.assertFalse(results['tests']['serial']['passed'])
+        self.assertFalse(results['tests']['approximate_entropy']['passed'])
+        results = run_randomness_tests(sticky)
+        self.assertTrue(results['tests']['frequency']['passed'])
+        self.assertFalse(results['tests']['runs']['passed'])
+        self.assertFalse(results['passed'])
+    
+    def test_check_entropy_source(self):
+        """Test health checks of generators, pools and entropy sources."""
+        with EntropyPool(QuantumKeyGenerator(seed=3), capacity=1 << 14) as pool:
+            sources = [QuantumKeyGenerator(seed=3), pool, AerEntropySource(seed=3)]
+            for source in sources:
+                with self.subTest(source=type(source).__name__):
+                    results = check_entropy_source(source, num_bits=100000, chunk_bits=30000)
+                    self.assertEqual(results['num_bits'], 100000)
+                    self.assertTrue(results['passed'])
+        
+        self.assertFalse(check_entropy_source(ConstantSource(), num_bits=20000)['passed'])
+    
+    def test_invalid_parameters(self):
+        """Test parameter validation and too-short samples."""
+        with self.assertRaises(ValueError):
+            RandomnessTestSuite(longest_run_block=100)
+        with self.assertRaises(ValueError):
+            RandomnessTestSuite(serial_m=1)
+        with self.assertRaises(ValueError):
+            RandomnessTestSuite(serial_m=30)
+        with self.assertRaises(ValueError):
+            run_randomness_tests(self.bits[:10])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+Tests for Stream Encryption module
+"""
+
+import unittest
+import asyncio
+import io
+import numpy as np
+import os
+import socket
+import sys
+import threading
+
+# Add parent directory to path to import from root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stream_encryptor import StreamEncryptor
+from tiled_encryptor import TiledImageEncryptor
+from key_format import create_key
+
+
+class _AsyncWriter:
+    """Minimal asyncio.StreamWriter stand-in collecting written bytes."""
+    
+    def __init__(self):
+        self.buffer = io.BytesIO()
+        self.drains = 0
+    
+    def write(self, data):
+        self.buffer.write(data)
+    
+    async def drain(self):
+        self.drains += 1
+
+
+class TestStreamEncryptor(unittest.TestCase):
+    """Test cases for StreamEncryptor class."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.data = np.random.randint(0, 256, 10_000, dtype=np.uint8).tobytes()
+        self.encryptor = StreamEncryptor(2 ** 200 + 7, 4242, block_size=1024)
+    
+    def chunked(self, data, size):
+        return [data[i:i + size] for i in range(0, len(data), size)]
+    
+    def test_round_trip_independent_of_chunking(self):
+        """Test that ciphertext does not depend on how input is chunked."""
+        expected = b''.join(self.encryptor.encrypt_chunks([self.data]))
+        self.assertEqual(len(expected), len(self.data))
+        self.assertNotEqual(expected, self.data)
+        
+        for size in [1, 7, 1000, 1024, 3000, 20000]:
+            with self.subTest(chunk_size=size):
+                encrypted = b''.join(self.encryptor.encrypt_chunks(self.chunked(self.data, size)))
+                self.assertEqual(encrypted, expected)
+                decrypted = b''.join(self.encryptor.decrypt_chunks(self.chunked(encrypted, size)))
+                self.assertEqual(decrypted, self.data)
+    
+    def test_blocks_match_tiled_encryptor(self):
+        """Test that each block is encrypted like a tiled block at the same offset."""
+        tiled = TiledImageEncryptor(None, 4242, block_size=1024, keystream_seed=2 ** 200 + 7)
+        blocks = list(self.encryptor.encrypt_chunks([self.data]))
+        plain = np.frombuffer(self.data, dtype=np.uint8)
+        
+        self.assertEqual([len(block) for block in blocks], [1024] * 9 + [784])
+        for index, block in enumerate(blocks):
+            start = index * 1024
+            np.testing.assert_array_equal(
+                np.frombuffer(block, dtype=np.uint8),
+                tiled.encrypt_block(plain[start:start + 1024], index, start)
+            )
+    
+    def test_empty_stream(self):
+        """Test that an empty stream produces no output."""
+        self.assertEqual(list(self.encryptor.encrypt_chunks([])), [])
+        self.assertEqual(self.encryptor.encrypt_stream(io.BytesIO(), io.BytesIO()), 0)
+    
+    def test_file_streams(self):
+        """Test encrypting between file objects with small reads."""
+        encrypted = io.BytesIO()
+        written = self.encryptor.encrypt_stream(io.BytesIO(self.data), encrypted, chunk_size=333)
+        self.assertEqual(written, len(self.data))
+        
+        decrypted = io.BytesIO()
+        self.encryptor.decrypt_stream(io.BytesIO(encrypted.getvalue()), decrypted)
+        self.assertEqual(decrypted.getvalue(), self.data)
+    
+    def test_socket_stream(self):
+        """Test encrypting data received from a socket."""
+        sender, receiver = socket.socketpair()
+        
+        def send():
+            with sender:
+                sender.sendall(self.data)
+        
+        thread = threading.Thread(target=send)
+        thread.start()
+        encrypted = io.BytesIO()
+        with receiver, receiver.makefile('rb') as src:
+            self.encryptor.encrypt_stream(src, encrypted, chunk_size=4096)
+        thread.join()
+        
+        self.assertEqual(b''.join(self.encryptor.decrypt_chunks([encrypted.getvalue()])), self.data)
+    
+    def test_async_streams(self):
+        """Test the asyncio variant against the synchronous result."""
+        expected = b''.join(self.encryptor.encrypt_chunks([self.data]))
+        
+        async def run():
+            reader = asyncio.StreamReader()
+            reader.feed_data(self.data)
+            reader.feed_eof()
+            writer = _AsyncWriter()
+            written = await self.encryptor.encrypt_stream_async(reader, writer, chunk_size=500)
+            
+            async def chunks():
+                for chunk in self.chunked(writer.buffer.getvalue(), 999):
+                    yield chunk
+            
+            decrypted = [bytes(block) async for block in self.encryptor.decrypt_chunks_async(chunks())]
+            return written, writer, b''.join(decrypted)
+        
+        written, writer, decrypted = asyncio.run(run())
+        self.assertEqual(written, len(self.data))
+        self.assertEqual(writer.buffer.getvalue(), expected)
+        self.assertGreater(writer.drains, 0)
+        self.assertEqual(decrypted, self.data)
+    
+    def test_from_key(self):
+        """Test building a stream encryptor from a key dictionary."""
+        key = create_key((0,), 4242, keystream_seed=2 ** 200 + 7, options={'block_size': 1024})
+        encryptor = StreamEncryptor.from_key(key)
+        self.assertEqual(
+            b''.join(encryptor.encrypt_chunks([self.data])),
+            b''.join(self.encryptor.encrypt_chunks([self.data]))
+        )
+        
+        raw_key = create_key((4,), 1, keystream=np.zeros(4, dtype=np.uint8))
+        with self.assertRaises(ValueError):
+            StreamEncryptor.from_key(raw_key)
+
+
+if __name__ == '__main__':
+    unittest.main()
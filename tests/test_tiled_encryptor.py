@@ -0,0 +1,136 @@
+"""
+Tests for Tiled Image Encryption module
+"""
+
+import unittest
+import numpy as np
+import os
+import sys
+import tempfile
+
+# Add parent directory to path to import from root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tiled_encryptor import TiledImageEncryptor
+from image_encryptor import ImageEncryptor, create_encryptor
+from key_format import create_key, decode_key, encode_key
+from quantum_key_generator import expand_keystream
+
+
+class TestTiledImageEncryptor(unittest.TestCase):
+    """Test cases for TiledImageEncryptor class."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.image = np.random.randint(0, 256, (60, 70), dtype=np.uint8)
+        self.keystream_seed = 2 ** 200 + 12345
+        self.permutation_seed = 987654
+    
+    def test_encrypt_decrypt_cycle(self):
+        """Test round trips for block sizes with and without a partial tail."""
+        for block_size in [1, 100, 700, 4200, 10000]:
+            with self.subTest(block_size=block_size):
+                encryptor = TiledImageEncryptor(
+                    None, self.permutation_seed,
+                    block_size=block_size, keystream_seed=self.keystream_seed
+                )
+                encrypted = encryptor.encrypt_image(self.image)
+                self.assertEqual(encrypted.shape, self.image.shape)
+                np.testing.assert_array_equal(encryptor.decrypt_image(encrypted), self.image)
+    
+    def test_in_memory_keystream_matches_seed(self):
+        """Test that an explicit keystream and its seed give the same ciphertext."""
+        keystream = expand_keystream(self.keystream_seed, self.image.size)
+        from_array = TiledImageEncryptor(keystream, self.permutation_seed, block_size=512)
+        from_seed = TiledImageEncryptor(
+            None, self.permutation_seed, block_size=512, keystream_seed=self.keystream_seed
+        )
+        
+        np.testing.assert_array_equal(
+            from_array.encrypt_image(self.image),
+            from_seed.encrypt_image(self.image)
+        )
+    
+    def test_blocks_are_shuffled(self):
+        """Test that the block-level permutation moves full blocks."""
+        encryptor = TiledImageEncryptor(None, self.permutation_seed, block_size=100, keystream_seed=1)
+        block_permutation = encryptor.block_permutation(self.image.size)
+        
+        self.assertEqual(sorted(block_permutation), list(range(42)))
+        self.assertFalse(np.array_equal(block_permutation, np.arange(42)))
+        
+        # A partial tail block always stays last
+        block_permutation = encryptor.block_permutation(4250)
+        self.assertEqual(block_permutation[-1], 42)
+    
+    def test_memmap_streaming(self):
+        """Test block-wise encryption between memory-mapped files."""
+        encryptor = TiledImageEncryptor(
+            None, self.permutation_seed, block_size=333, keystream_seed=self.keystream_seed
+        )
+        expected = encryptor.encrypt_image(self.image)
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            src = np.memmap(os.path.join(temp_dir, 'src.raw'), dtype=np.uint8, mode='w+', shape=self.image.shape)
+            src[:] = self.image
+            enc = np.memmap(os.path.join(temp_dir, 'enc.raw'), dtype=np.uint8, mode='w+', shape=self.image.shape)
+            dec = np.memmap(os.path.join(temp_dir, 'dec.raw'), dtype=np.uint8, mode='w+', shape=self.image.shape)
+            
+            encryptor.encrypt_into(src, enc)
+            encryptor.decrypt_into(enc, dec)
+            
+            np.testing.assert_array_equal(enc, expected)
+            np.testing.assert_array_equal(dec, self.image)
+            del src, enc, dec
+    
+    def test_mode_selected_from_key(self):
+        """Test that create_encryptor picks the mode recorded in the key."""
+        key = create_key(
+            self.image.shape, self.permutation_seed,
+            keystream_seed=self.keystream_seed,
+            options={'mode': 'tiled', 'block_size': 256}
+        )
+        key = decode_key(encode_key(key))
+        
+        encryptor = create_encryptor(key)
+        self.assertIsInstance(encryptor, TiledImageEncryptor)
+        self.assertEqual(encryptor.block_size, 256)
+        np.testing.assert_array_equal(
+            encryptor.decrypt_image(encryptor.encrypt_image(self.image)),
+            self.image
+        )
+        
+        with self.assertRaises(ValueError):
+            ImageEncryptor.from_key(key)
+        
+        del key['options']['mode']
+        self.assertIsInstance(create_encryptor(key), ImageEncryptor)
+    
+    def test_non_uint8_dtypes(self):
+        """Test that uint16/float32 images round-trip through their bytes."""
+        for image in [np.random.randint(0, 65536, (30, 25), dtype=np.uint16),
+                      np.random.standard_normal((30, 25)).astype(np.float32)]:
+            with self.subTest(dtype=image.dtype):
+                encryptor = TiledImageEncryptor(
+                    None, self.permutation_seed, block_size=333, keystream_seed=self.keystream_seed
+                )
+                encrypted = encryptor.encrypt_image(image)
+                decrypted = encryptor.decrypt_image(encrypted)
+                
+                self.assertEqual(encrypted.dtype, image.dtype)
+                self.assertEqual(decrypted.tobytes(), image.tobytes())
+                
+                # A keystream sized in pixels rather than bytes is rejected
+                with self.assertRaises(ValueError):
+                    TiledImageEncryptor(np.zeros(image.size, dtype=np.uint8), 1).encrypt_image(image)
+    
+    def test_keystream_length_mismatch(self):
+        """Test that a keystream of the wrong length is rejected."""
+        encryptor = TiledImageEncryptor(np.zeros(10, dtype=np.uint8), 1, block_size=4)
+        
+        with self.assertRaises(ValueError):
+            encryptor.encrypt_image(self.image)
+
+
+if __name__ == '__main__':
+    unittest.main()
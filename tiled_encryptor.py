@@ -0,0 +1,253 @@
+"""
+Tiled Image Encryption Module
+
+This module implements a block-wise variant of the XOR + permutation
+scheme for images that do not fit in memory. The raw bytes of the image
+are split into fixed-size blocks; each block is XORed with its slice of the
+keystream and permuted internally, and the blocks themselves are shuffled
+by a block-level permutation. Blocks are processed one at a time, so
+memory use is bounded by the block size rather than the image size.
+"""
+
+import numpy as np
+from quantum_key_generator import expand_keystream
+
+
+# Default number of bytes per block (1 MiB)
+DEFAULT_BLOCK_SIZE = 1 << 20
+
+
+class TiledImageEncryptor:
+    """
+    Encrypts and decrypts images block by block.
+    
+    Block j of the ciphertext holds source block ``block_permutation[j]``,
+    XORed with the keystream at that block's original offset and permuted
+    within the block. A trailing partial block is permuted internally but
+    always stays last.
+    """
+    
+    def __init__(self, keystream, permutation_seed, block_size=DEFAULT_BLOCK_SIZE,
+                 keystream_seed=None):
+        """
+        Initialize the encryptor with keys.
+        
+        Args:
+            keystream: numpy array (or np.memmap) of random bytes for XOR
+                operation, or None when ``keystream_seed`` is given
+            permutation_seed: seed for block and pixel permutations
+            block_size: Number of bytes per block
+            keystream_seed: Seed for expand_keystream(); the keystream for
+                each block is then expanded on demand instead of being held
+                in memory
+        """
+        if (keystream is None) == (keystream_seed is None):
+            raise ValueError("Exactly one of keystream or keystream_seed must be given")
+        if block_size <= 0:
+            raise ValueError("block_size must be positive")
+        self.keystream = keystream
+        self.keystream_seed = keystream_seed
+        self.permutation_seed = permutation_seed
+        self.block_size = block_size
+    
+    @classmethod
+    def from_key(cls, key):
+        """
+        Create an encryptor from a key dictionary.
+        
+        Args:
+            key: Key dictionary (see key_format.create_key) whose options
+                may set 'block_size'
+                
+        Returns:
+            TiledImageEncryptor instance
+        """
+        if key['options'].get('permute_unit', 'byte') != 'byte':
+            raise ValueError("Tiled encryption only supports permute_unit='byte'")
+        return cls(
+            key['keystream'],
+            key['permutation_seed'],
+            block_size=key['options'].get('block_size', DEFAULT_BLOCK_SIZE),
+            keystream_seed=key['keystream_seed']
+        )
+    
+    def _block_bounds(self, num_bytes):
+        """Return (number of blocks, number of full blocks)."""
+        num_blocks = -(-num_bytes // self.block_size)
+        return num_blocks, num_bytes // self.block_size
+    
+    def block_permutation(self, num_bytes):
+        """
+        Get the block-level permutation for an image size.
+        
+        Args:
+            num_bytes: Total number of bytes of image data
+            
+        Returns:
+            numpy array mapping ciphertext block index to source block index
+        """
+        num_blocks, num_full = self._block_bounds(num_bytes)
+        rng = np.random.default_rng(np.random.SeedSequence(self.permutation_seed, spawn_key=(0,)))
+        permutation = np.arange(num_blocks)
+        permutation[:num_full] = rng.permutation(num_full)
+        return permutation
+    
+    def _pixel_permutation(self, block_index, length):
+        """Permutation of the bytes within one source block."""
+        seed_sequence = np.random.SeedSequence(self.permutation_seed, spawn_key=(1, int(block_index)))
+        return np.random.default_rng(seed_sequence).permutation(length)
+    
+    def _keystream_block(self, start, stop):
+        """Keystream bytes for bytes [start, stop) of the source image."""
+        if self.keystream is not None:
+            return np.asarray(self.keystream[start:stop])
+        return expand_keystream(self.keystream_seed, stop - start, offset=start)
+    
+    def _check_keystream(self, num_bytes):
+        """Reject in-memory keystreams that do not cover the image exactly."""
+        if self.keystream is not None and len(self.keystream) != num_bytes:
+            raise ValueError(
+                f"Keystream length {len(self.keystream)} does not match image size {num_bytes} bytes"
+            )
+    
+    def encrypt_image(self, image_array):
+        """
+        Encrypt an image block by block.
+        
+        Args:
+            image_array: numpy array (or np.memmap) of pixel values
+            
+        Returns:
+            numpy array of encrypted pixel values with the same shape
+        """
+        image_array = np.asarray(image_array)
+        encrypted = np.empty(image_array.shape, dtype=image_array.dtype)
+        return self.encrypt_into(image_array, encrypted)
+    
+    def decrypt_image(self, encrypted_array):
+        """
+        Decrypt an image block by block.
+        
+        Args:
+            encrypted_array: numpy array (or np.memmap) of encrypted pixel values
+            
+        Returns:
+            numpy array of decrypted pixel values with the same shape
+        """
+        encrypted_array = np.asarray(encrypted_array)
+        decrypted = np.empty(encrypted_array.shape, dtype=encrypted_array.dtype)
+        return self.decrypt_into(encrypted_array, decrypted)
+    
+    def encrypt_into(self, src, out):
+        """
+        Encrypt ``src`` into ``out`` one block at a time.
+        
+        Both buffers may be np.memmap arrays larger than memory; only one
+        block of each is touched at a time and output blocks are written
+        sequentially.
+        
+        Args:
+            src: Array of pixel values (ndarray or np.memmap)
+            out: Writable C-contiguous array with the same shape and dtype
+            
+        Returns:
+            ``out`` reshaped to the shape of ``src``
+        """
+        flat_src, flat_out, result = self._flat_buffers(src, out)
+        for _, start, block in self.iter_encrypted_blocks(flat_src):
+            flat_out[start:start + len(block)] = block
+        return result
+    
+    def decrypt_into(self, src, out):
+        """
+        Decrypt ``src`` into ``out`` one block at a time.
+        
+        Args:
+            src: Array of encrypted pixel values (ndarray or np.memmap)
+            out: Writable C-contiguous array with the same shape and dtype
+            
+        Returns:
+            ``out`` reshaped to the shape of ``src``
+        """
+        flat_src, flat_out, result = self._flat_buffers(src, out)
+        num_bytes = len(flat_src)
+        self._check_keystream(num_bytes)
+        block_permutation = self.block_permutation(num_bytes)
+        
+        for cipher_index, source_index in enumerate(block_permutation):
+            cipher_start = cipher_index * self.block_size
+            source_start = source_index * self.block_size
+            length = min(self.block_size, num_bytes - cipher_start)
+            flat_out[source_start:source_start + length] = self.decrypt_block(
+                flat_src[cipher_start:cipher_start + length], source_index, source_start
+            )
+        return result
+    
+    def iter_encrypted_blocks(self, flat_src):
+        """
+        Yield encrypted blocks in ciphertext order.
+        
+        Args:
+            flat_src: 1D uint8 array (or np.memmap) of image bytes
+            
+        Yields:
+            tuple: (ciphertext block index, ciphertext offset, encrypted block)
+        """
+        num_bytes = len(flat_src)
+        self._check_keystream(num_bytes)
+        block_permutation = self.block_permutation(num_bytes)
+        
+        for cipher_index, source_index in enumerate(block_permutation):
+            source_start = source_index * self.block_size
+            length = min(self.block_size, num_bytes - source_start)
+            block = self.encrypt_block(
+                flat_src[source_start:source_start + length], source_index, source_start
+            )
+            yield cipher_index, cipher_index * self.block_size, block
+    
+    def encrypt_block(self, block, block_index, offset):
+        """
+        Encrypt one source block: XOR with its keystream slice, then permute.
+        
+        Args:
+            block: 1D uint8 array of the source block
+            block_index: Index of the block in the source image
+            offset: Byte offset of the block in the source image
+            
+        Returns:
+            numpy array of encrypted bytes
+        """
+        encrypted = np.bitwise_xor(block, self._keystream_block(offset, offset + len(block)))
+        return encrypted[self._pixel_permutation(block_index, len(block))]
+    
+    def decrypt_block(self, block, block_index, offset):
+        """
+        Decrypt one block: undo the in-block permutation, then XOR.
+        
+        Args:
+            block: 1D uint8 array of encrypted bytes
+            block_index: Index of the block in the source image
+            offset: Byte offset of the block in the source image
+            
+        Returns:
+            numpy array of decrypted bytes
+        """
+        depermuted = np.empty_like(block)
+        depermuted[self._pixel_permutation(block_index, len(block))] = block
+        np.bitwise_xor(depermuted, self._keystream_block(offset, offset + len(block)), out=depermuted)
+        return depermuted
+    
+    def _flat_buffers(self, src, out):
+        """Validate src/out and return flat byte views of both plus ``out``."""
+        src = np.asarray(src)
+        out = np.asarray(out)
+        if out.size != src.size:
+            raise ValueError(f"Output buffer has {out.size} elements, expected {src.size}")
+        if out.dtype != src.dtype:
+            raise ValueError(f"Output buffer dtype must be {src.dtype}, got {out.dtype}")
+        if not out.flags.c_contiguous or not out.flags.writeable:
+            raise ValueError("Output buffer must be writable and C-contiguous")
+        if np.may_share_memory(src, out):
+            raise ValueError("Output buffer must not overlap the input")
+        src_bytes = np.ascontiguousarray(src).reshape(-1).view(np.uint8)
+        return src_bytes, out.reshape(-1).view(np.uint8), out.reshape(src.shape)